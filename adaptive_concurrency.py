@@ -0,0 +1,174 @@
+import time
+import asyncio
+import contextvars
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from metrics import CONCURRENCY_LIMIT
+
+# Bounds used by --adaptive when given without a range
+DEFAULT_MIN_LIMIT = 1
+DEFAULT_MAX_LIMIT = 32
+
+# Multiply the limit by this on a 429 or 5xx from eBay
+THROTTLE_BACKOFF = 0.5
+# ...and by this when recent latency climbs well above its long-run level
+LATENCY_BACKOFF = 0.9
+# Recent latency this many times the long-run latency counts as rising
+LATENCY_TOLERANCE = 1.5
+
+# Shortest gap between decreases, for when responses come back faster than this
+MIN_DECREASE_INTERVAL = 0.1
+
+# Smoothing of the recent and long-run latency averages
+_SHORT_ALPHA = 0.3
+_LONG_ALPHA = 0.05
+
+class AdaptiveConcurrency:
+    """AIMD concurrency limit for batch pricing, driven by eBay responses.
+
+    Each time `limit` responses in a row come back healthy while every slot
+    is busy, the limit grows by one. A 429 or 5xx halves it, and recent
+    latency rising past LATENCY_TOLERANCE times its long-run average trims
+    it by 10%, always within [min_limit, max_limit]. Decreases are spaced at
+    least one recent round trip apart, so the burst of errors from requests
+    already in flight counts as one signal.
+    """
+
+    _clock = staticmethod(time.monotonic)
+
+    def __init__(self, initial: int = 3, min_limit: int = DEFAULT_MIN_LIMIT, max_limit: int = DEFAULT_MAX_LIMIT):
+        if min_limit < 1 or max_limit < min_limit:
+            raise ValueError("Concurrency bounds must satisfy 1 <= min <= max")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = min(max(initial, min_limit), max_limit)
+        self.in_flight = 0
+        self.short_latency: Optional[float] = None
+        self.long_latency: Optional[float] = None
+        self.increases = 0
+        self.decreases = 0
+        self.throttled = 0
+        self.server_errors = 0
+        self.peak_limit = self.limit
+        self._healthy = 0
+        self._last_decrease = float("-inf")
+        self._waiters: deque = deque()
+        CONCURRENCY_LIMIT.set(self.limit)
+
+    def observe(self, status: int, latency: float) -> None:
+        """Adjust the limit for one eBay response"""
+        if status == 429 or status >= 500:
+            if status == 429:
+                self.throttled += 1
+            else:
+                self.server_errors += 1
+            self._decrease(THROTTLE_BACKOFF)
+            return
+        if status >= 400:
+            # A bad request says nothing about eBay's capacity
+            return
+
+        if self.short_latency is None:
+            self.short_latency = self.long_latency = latency
+        else:
+            self.short_latency += _SHORT_ALPHA * (latency - self.short_latency)
+            self.long_latency += _LONG_ALPHA * (latency - self.long_latency)
+
+        self._healthy += 1
+        if self._healthy < self.limit:
+            return
+        self._healthy = 0
+        if self.short_latency > self.long_latency * LATENCY_TOLERANCE:
+            self._decrease(LATENCY_BACKOFF)
+        elif self.in_flight >= self.limit and self.limit < self.max_limit:
+            # Only grow a limit that is actually being used
+            self._set_limit(self.limit + 1)
+            self.increases += 1
+
+    def _decrease(self, factor: float) -> None:
+        now = self._clock()
+        if now - self._last_decrease < max(self.short_latency or 0.0, MIN_DECREASE_INTERVAL):
+            return
+        self._last_decrease = now
+        self._healthy = 0
+        limit = max(self.min_limit, int(self.limit * factor))
+        if limit < self.limit:
+            self._set_limit(limit)
+            self.decreases += 1
+
+    def _set_limit(self, limit: int) -> None:
+        self.limit = limit
+        self.peak_limit = max(self.peak_limit, limit)
+        CONCURRENCY_LIMIT.set(limit)
+        self._wake()
+
+    def _wake(self) -> None:
+        free = self.limit - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    async def acquire(self) -> None:
+        """Wait for a free slot under the current limit"""
+        while self.in_flight >= self.limit:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                elif waiter.done() and not waiter.cancelled():
+                    # Pass a wake-up this task can no longer use to the next waiter
+                    self._wake()
+                raise
+        self.in_flight += 1
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold a slot for one card; eBay responses seen while pricing it adjust this limit"""
+        await self.acquire()
+        token = _current_concurrency.set(self)
+        try:
+            yield
+        finally:
+            _current_concurrency.reset(token)
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "peak_limit": self.peak_limit,
+            "in_flight": self.in_flight,
+            "increases": self.increases,
+            "decreases": self.decreases,
+            "throttled": self.throttled,
+            "server_errors": self.server_errors,
+            "recent_latency_ms": round(self.short_latency * 1000, 1) if self.short_latency is not None else None,
+            "baseline_latency_ms": round(self.long_latency * 1000, 1) if self.long_latency is not None else None
+        }
+
+_current_concurrency: contextvars.ContextVar = contextvars.ContextVar("adaptive_concurrency", default=None)
+
+def current_concurrency() -> Optional[AdaptiveConcurrency]:
+    """Return the adaptive limit the card being priced in this task runs under, if any"""
+    return _current_concurrency.get()
+
+def parse_range(text: str) -> Tuple[int, int]:
+    """Parse MIN:MAX concurrency bounds, e.g. "2:32" """
+    try:
+        low, high = (int(part) for part in text.split(":"))
+    except ValueError:
+        raise ValueError(f"Invalid concurrency range '{text}', expected MIN:MAX such as 1:32")
+    if low < 1 or high < low:
+        raise ValueError(f"Invalid concurrency range '{text}': need 1 <= MIN <= MAX")
+    return low, high
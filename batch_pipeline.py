@@ -0,0 +1,128 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+from adaptive_concurrency import AdaptiveConcurrency
+
+# Rows buffered by the writer before it flushes, and the longest a row may wait
+DEFAULT_FLUSH_ROWS = 100
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+# Marks the end of a queue
+_DONE = object()
+
+async def run_pipeline(rows: Iterable[Any],
+                       process: Callable[[Any], Awaitable[Optional[Any]]],
+                       write_rows: Callable[[List[Any]], None],
+                       workers: int = 3,
+                       queue_size: Optional[int] = None,
+                       flush_rows: int = DEFAULT_FLUSH_ROWS,
+                       flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                       concurrency: Optional[AdaptiveConcurrency] = None) -> Dict[str, int]:
+    """Stream rows through a fixed pool of workers into a single batching writer.
+
+    A reader pulls rows lazily from `rows` into a bounded queue, so only a few
+    rows are held in memory however large the input is. Each of `workers`
+    tasks awaits `process(row)`; results other than None go to one writer task,
+    which hands them to `write_rows` in batches of `flush_rows`, or sooner once
+    the oldest buffered result has waited `flush_interval` seconds.
+
+    With `concurrency`, the pool has concurrency.max_limit workers but only
+    as many rows as the adaptive limit currently allows are processed at once.
+    
+    `process` should handle its own per-row errors; an exception escaping it
+    stops the whole pipeline and is re-raised here after buffered results are
+    written. Returns counts of rows read, results written and flushes made.
+    """
+    workers = max(1, workers if concurrency is None else concurrency.max_limit)
+    input_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size or workers * 2)
+    output_queue: asyncio.Queue = asyncio.Queue(maxsize=max(flush_rows, workers) * 2)
+    stats = {"read": 0, "written": 0, "flushes": 0}
+
+    async def read():
+        for row in rows:
+            await input_queue.put(row)
+            stats["read"] += 1
+        for _ in range(workers):
+            await input_queue.put(_DONE)
+
+    async def work():
+        while True:
+            row = await input_queue.get()
+            if row is _DONE:
+                return
+            if concurrency is None:
+                result = await process(row)
+            else:
+                async with concurrency.slot():
+                    result = await process(row)
+            if result is not None:
+                await output_queue.put(result)
+
+    async def write():
+        buffer = []
+        deadline = None
+
+        def flush():
+            nonlocal buffer, deadline
+            batch, buffer, deadline = buffer, [], None
+            if batch:
+                write_rows(batch)
+                stats["written"] += len(batch)
+                stats["flushes"] += 1
+
+        try:
+            while True:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                getter = asyncio.ensure_future(output_queue.get())
+                try:
+                    await asyncio.wait([getter], timeout=timeout)
+                except BaseException:
+                    if getter.done():
+                        output_queue.put_nowait(getter.result())
+                    else:
+                        getter.cancel()
+                    raise
+                if not getter.done():
+                    getter.cancel()
+                    flush()
+                    continue
+                result = getter.result()
+                if result is _DONE:
+                    return
+                buffer.append(result)
+                if deadline is None:
+                    deadline = time.monotonic() + flush_interval
+                if len(buffer) >= flush_rows:
+                    flush()
+        finally:
+            # Keep whatever was already priced, even if the pipeline is failing
+            while not output_queue.empty():
+                result = output_queue.get_nowait()
+                if result is not _DONE:
+                    buffer.append(result)
+            flush()
+
+    producers = [asyncio.ensure_future(read())] + [asyncio.ensure_future(work()) for _ in range(workers)]
+
+    async def finish():
+        await asyncio.gather(*producers)
+        await output_queue.put(_DONE)
+
+    finisher = asyncio.ensure_future(finish())
+    writer = asyncio.ensure_future(write())
+    tasks = producers + [finisher, writer]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            if not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+    finally:
+        # Stop the reader and workers, then let the writer drain what was already priced
+        for task in producers + [finisher]:
+            task.cancel()
+        await asyncio.gather(*producers, finisher, return_exceptions=True)
+        if not writer.done():
+            await output_queue.put(_DONE)
+        await asyncio.gather(writer, return_exceptions=True)
+
+    return stats
@@ -0,0 +1,258 @@
+import os
+import csv
+import json
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import multiprocessing
+from typing import Any, Dict, List, Optional
+import numpy as np
+from aiohttp import web
+from mock_ebay import MockEbay, MockEbayServer, add_mock_arguments, mock_from_args
+
+SCENARIOS = ("batch", "api")
+
+# How often peak memory is sampled while a scenario runs
+RSS_SAMPLE_INTERVAL = 0.02
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # Not Linux: fall back to the lifetime peak (kilobytes on Linux, bytes on macOS)
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+class RssSampler:
+    """Tracks the peak resident set size while a scenario runs"""
+
+    def __init__(self, interval: float = RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _sample(self) -> None:
+        while True:
+            self.peak = max(self.peak, current_rss())
+            await asyncio.sleep(self.interval)
+
+    def __enter__(self) -> "RssSampler":
+        self.peak = current_rss()
+        self._task = asyncio.ensure_future(self._sample())
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._task.cancel()
+        self.peak = max(self.peak, current_rss())
+
+def make_cards(count: int) -> List[Dict[str, str]]:
+    """Distinct synthetic cards, so no scenario is served from an earlier one's results"""
+    return [
+        {
+            "brand": "Topps",
+            "set_name": "Chrome",
+            "year": str(1990 + i % 30),
+            "player_name": f"Bench Player {i}",
+            "card_number": str(i),
+            "card_variation": "",
+            "condition": ""
+        }
+        for i in range(count)
+    ]
+
+def summarize(scenario: str, concurrency: int, latencies: List[float], failed: int,
+              elapsed: float, peak_rss: int) -> Dict[str, Any]:
+    cards = len(latencies)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if latencies else (0.0, 0.0, 0.0)
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "cards": cards,
+        "failed": failed,
+        "seconds": round(elapsed, 3),
+        "cards_per_second": round(cards / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(p50 * 1000, 1),
+        "p95_ms": round(p95 * 1000, 1),
+        "p99_ms": round(p99 * 1000, 1),
+        "peak_rss_mb": round(peak_rss / (1024 * 1024), 1)
+    }
+
+async def bench_batch(cards: List[Dict[str, str]], concurrency: int, workdir: str) -> Dict[str, Any]:
+    """Price a CSV of cards with card_pricer.process_cards_from_csv"""
+    import card_pricer
+
+    input_path = os.path.join(workdir, f"cards-{concurrency}.csv")
+    output_path = os.path.join(workdir, f"prices-{concurrency}.csv")
+    with open(input_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(cards[0]))
+        writer.writeheader()
+        writer.writerows(cards)
+
+    # Time each card by wrapping the pricing call the pipeline makes
+    latencies = []
+    get_card_price = card_pricer.get_card_price
+
+    async def timed_get_card_price(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await get_card_price(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    card_pricer.get_card_price = timed_get_card_price
+    try:
+        with RssSampler() as rss:
+            start = time.perf_counter()
+            results = await card_pricer.process_cards_from_csv(input_path, output_path, max_concurrent=concurrency)
+            elapsed = time.perf_counter() - start
+    finally:
+        card_pricer.get_card_price = get_card_price
+    return summarize("batch", concurrency, latencies, results["failed"], elapsed, rss.peak)
+
+async def bench_api(cards: List[Dict[str, str]], concurrency: int) -> Dict[str, Any]:
+    """Price cards through the API's main.get_card_price, `concurrency` requests at a time"""
+    import main
+
+    latencies = []
+    failed = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def price(card):
+        nonlocal failed
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                # max_age=0 bypasses the price index so every card is priced from eBay
+                await main.get_card_price(**card, max_age=0)
+            except Exception:
+                failed += 1
+            finally:
+                latencies.append(time.perf_counter() - start)
+
+    with RssSampler() as rss:
+        start = time.perf_counter()
+        await asyncio.gather(*(price(card) for card in cards))
+        elapsed = time.perf_counter() - start
+    return summarize("api", concurrency, latencies, failed, elapsed, rss.peak)
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _serve_mock(mock: MockEbay, port: int) -> None:
+    web.run_app(mock.create_app(), host="127.0.0.1", port=port, print=None, access_log=None)
+
+async def _wait_for_port(port: int, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Mock eBay server did not start on port {port}")
+            await asyncio.sleep(0.05)
+
+def configure_environment(base_url: str, rate_limit: float) -> None:
+    """Point the pricer at the mock server, with caches and stored history switched off"""
+    os.environ["EBAY_API_BASE"] = base_url
+    os.environ["EBAY_CACHE_PATH"] = ""
+    os.environ["EBAY_SALES_DB"] = ""
+    os.environ["EBAY_DAILY_QUOTA"] = ""
+    os.environ["EBAY_RATE_LIMIT"] = str(rate_limit)
+    os.environ["EBAY_RATE_BURST"] = str(max(1, int(rate_limit)))
+    os.environ.setdefault("EBAY_APP_ID", "benchmark")
+    os.environ.setdefault("EBAY_CERT_ID", "benchmark")
+
+async def run_benchmarks(scenarios: List[str], concurrency_levels: List[int], card_count: int,
+                         base_url: str, rate_limit: float) -> List[Dict[str, Any]]:
+    # Must run before card_pricer or main is imported; both read their settings at import time
+    configure_environment(base_url, rate_limit)
+    cards = make_cards(card_count)
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for scenario in scenarios:
+            for concurrency in concurrency_levels:
+                if scenario == "batch":
+                    result = await bench_batch(cards, concurrency, workdir)
+                else:
+                    result = await bench_api(cards, concurrency)
+                print_result(result)
+                results.append(result)
+    if "api" in scenarios:
+        import main
+        await main.http_pool.close()
+    return results
+
+def print_header() -> None:
+    print(f"{'scenario':<9}{'conc':>5}{'cards':>7}{'failed':>7}{'cards/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'RSS MB':>8}")
+
+def print_result(result: Dict[str, Any]) -> None:
+    print(f"{result['scenario']:<9}{result['concurrency']:>5}{result['cards']:>7}{result['failed']:>7}"
+          f"{result['cards_per_second']:>9}{result['p50_ms']:>9}{result['p95_ms']:>9}{result['p99_ms']:>9}"
+          f"{result['peak_rss_mb']:>8}")
+
+async def main():
+    """
+    Measure pricing throughput against a local mock eBay API, without using real quota.
+    """
+    parser = argparse.ArgumentParser(description='Benchmark card pricing against a mock eBay API')
+    parser.add_argument('--scenario', choices=SCENARIOS, action='append',
+                        help='Scenario to run; repeat for several (default: all)')
+    parser.add_argument('--cards', type=int, default=200, help='Cards priced per run (default: 200)')
+    parser.add_argument('--concurrency', type=str, default='1,4,16',
+                        help='Comma-separated concurrency levels (default: 1,4,16)')
+    parser.add_argument('--rate-limit', type=float, default=10000,
+                        help='eBay calls per second allowed by the rate limiter (default: 10000, effectively off)')
+    parser.add_argument('--api-base', type=str, default=None,
+                        help='Use an already running mock server at this URL instead of starting one')
+    parser.add_argument('--in-process', action='store_true',
+                        help='Run the mock server on the benchmark\'s own event loop instead of a separate process')
+    parser.add_argument('--json', type=str, default=None, help='Also write the results to this JSON file')
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    scenarios = args.scenario or list(SCENARIOS)
+    concurrency_levels = [int(level) for level in args.concurrency.split(",")]
+
+    server = None
+    process = None
+    base_url = args.api_base
+    if base_url is None and args.in_process:
+        server = MockEbayServer(mock_from_args(args))
+        base_url = await server.start()
+    elif base_url is None:
+        # A separate process keeps the mock's own work out of the measurements
+        port = _free_port()
+        process = multiprocessing.get_context("spawn").Process(
+            target=_serve_mock, args=(mock_from_args(args), port), daemon=True
+        )
+        process.start()
+        await _wait_for_port(port)
+        base_url = f"http://127.0.0.1:{port}"
+
+    print(f"Mock eBay API: {base_url}")
+    print_header()
+    try:
+        results = await run_benchmarks(scenarios, concurrency_levels, args.cards, base_url, args.rate_limit)
+    finally:
+        if server is not None:
+            await server.close()
+        if process is not None:
+            process.terminate()
+            process.join()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults have been written to {args.json}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
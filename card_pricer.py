@@ -10,57 +10,78 @@ from typing import List, Dict, Any, Optional, Tuple
 from dotenv import load_dotenv
 import argparse
 import statistics
-from urllib.parse import quote
+import logging
+from contextlib import nullcontext
+from ebay_cache import get_search_cache
+from ebay_search import iter_search_pages, EBAY_OAUTH_URL, SOLD_MAX_ITEMS, ACTIVE_MAX_ITEMS
+from ebay_transport import get_transport
+from http_pool import HttpPool
+from rate_limiter import RateLimiter
+from shared_state import SharedState, shared_state_dir
+from sales_store import CLI_SALES_SCOPE, SoldRefresh, get_sales_store, history_days
+from filter_trace import current_trace, tracing
+from adaptive_concurrency import AdaptiveConcurrency, DEFAULT_MAX_LIMIT, DEFAULT_MIN_LIMIT, parse_range
+from batch_pipeline import run_pipeline
+from checkpoint import CheckpointJournal, journal_path_for, keyed_cards
+from output_writers import create_writer, open_text, supports_append
+from shards import merge_shard_outputs, parse_shard, run_sharded, shard_output_path
+from keyword_filter import EXCLUDED_KEYWORDS, filter_by_keywords, get_matcher
+from metrics import ITEMS_FILTERED, pricing_card, stage, write_metrics
+from profiling import DEFAULT_PROFILE_DIR, profiling
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # eBay API credentials
 EBAY_APP_ID = os.getenv("EBAY_APP_ID")
 EBAY_CERT_ID = os.getenv("EBAY_CERT_ID")
 EBAY_DEV_ID = os.getenv("EBAY_DEV_ID")
 
-# Keywords to exclude from listings
-EXCLUDED_KEYWORDS = [
-    "lot",
-    "complete your set",
-    "you pick",
-    "u pick",
-    "pick your",
-    "complete set",
-    "bulk",
-    "pick a card",
-    "pick your card"
-]
-
 # Add token caching
 _oauth_token = None
 _token_expiry = None
 _token_lock = None
 
-# Rate limiter class
-class RateLimiter:
-    def __init__(self, calls_per_second):
-        self.calls_per_second = calls_per_second
-        self.last_call = 0
-        self.lock = None
-    
-    async def acquire(self):
-        if self.lock is None:
-            self.lock = asyncio.Lock()
-        
-        async with self.lock:
-            now = time.time()
-            time_since_last_call = now - self.last_call
-            if time_since_last_call < 1.0 / self.calls_per_second:
-                await asyncio.sleep(1.0 / self.calls_per_second - time_since_last_call)
-            self.last_call = time.time()
+def _shared_token_state():
+    """Token cache shared with other batch worker processes, if configured"""
+    state_dir = shared_state_dir()
+    return SharedState(os.path.join(state_dir, "oauth_token.json")) if state_dir else None
 
-# Create global rate limiter
-rate_limiter = RateLimiter(calls_per_second=2)
+# Create global rate limiter (token bucket per eBay API family)
+rate_limiter = RateLimiter.from_env()
 
-async def get_ebay_oauth_token():
-    """Get eBay OAuth token with caching"""
+async def _request_oauth_token(session, base64_auth):
+    """Request a new OAuth token and update the token cache"""
+    global _oauth_token, _token_expiry
+    
+    await rate_limiter.acquire("identity")
+    
+    response = await get_transport().request(
+        session,
+        "POST",
+        EBAY_OAUTH_URL,
+        headers={
+            "Content-Type": "application/x-www-form-urlencoded",
+            "Authorization": f"Basic {base64_auth}"
+        },
+        data={
+            "grant_type": "client_credentials",
+            "scope": "https://api.ebay.com/oauth/api_scope"
+        }
+    )
+    if response.status != 200:
+        raise Exception("Failed to get eBay OAuth token")
+    
+    response_data = response.json()
+    _oauth_token = response_data["access_token"]
+    # Set token expiry to 1 hour before actual expiry to be safe
+    _token_expiry = datetime.now() + timedelta(seconds=response_data["expires_in"] - 3600)
+    return _oauth_token
+
+async def get_ebay_oauth_token(session=None):
+    """Get eBay OAuth token with caching, reusing the caller's session if given"""
     global _oauth_token, _token_expiry, _token_lock
     
     if _token_lock is None:
@@ -70,32 +91,30 @@ async def get_ebay_oauth_token():
         # Check if we have a valid cached token
         if _oauth_token and _token_expiry and datetime.now() < _token_expiry:
             return _oauth_token
+        
+        # Reuse a token another worker process already fetched
+        shared_tokens = _shared_token_state()
+        if shared_tokens is not None:
+            shared = await asyncio.to_thread(shared_tokens.read)
+            if shared.get("token") and time.time() < shared.get("expires_at", 0):
+                _oauth_token = shared["token"]
+                _token_expiry = datetime.fromtimestamp(shared["expires_at"])
+                return _oauth_token
             
         # Get new token
         auth_string = f"{EBAY_APP_ID}:{EBAY_CERT_ID}"
         auth_bytes = auth_string.encode('ascii')
         base64_auth = base64.b64encode(auth_bytes).decode('ascii')
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                "https://api.ebay.com/identity/v1/oauth2/token",
-                headers={
-                    "Content-Type": "application/x-www-form-urlencoded",
-                    "Authorization": f"Basic {base64_auth}"
-                },
-                data={
-                    "grant_type": "client_credentials",
-                    "scope": "https://api.ebay.com/oauth/api_scope"
-                }
-            ) as response:
-                if response.status != 200:
-                    raise Exception("Failed to get eBay OAuth token")
-                
-                response_data = await response.json()
-                _oauth_token = response_data["access_token"]
-                # Set token expiry to 1 hour before actual expiry to be safe
-                _token_expiry = datetime.now() + timedelta(seconds=response_data["expires_in"] - 3600)
-                return _oauth_token
+        if session is None:
+            async with aiohttp.ClientSession() as token_session:
+                token = await _request_oauth_token(token_session, base64_auth)
+        else:
+            token = await _request_oauth_token(session, base64_auth)
+        
+        if shared_tokens is not None:
+            await asyncio.to_thread(shared_tokens.update, {"token": token, "expires_at": _token_expiry.timestamp()})
+        return token
 
 def build_search_query(brand: str, set_name: str, year: str, 
                       player_name: Optional[str] = None,
@@ -245,12 +264,18 @@ def filter_price_outliers(items: List[Dict[str, Any]], price_key: str = "price")
         upper_bound = q3 + (2.5 * iqr)
         filtered_items = [item for item in items if lower_bound <= item[price_key] <= upper_bound]
     
-    # Print debug information about filtered items
-    print(f"\nFiltered out {len(items) - len(filtered_items)} price outliers")
-    print(f"Price bounds: ${lower_bound:.2f} - ${upper_bound:.2f}")
-    for item in items:
-        if item[price_key] < lower_bound or item[price_key] > upper_bound:
-            print(f"  EXCLUDED: {item.get('title', '')} - ${item[price_key]}")
+    excluded = len(items) - len(filtered_items)
+    logger.debug("Filtered out %d price outliers (bounds $%.2f - $%.2f)", excluded, lower_bound, upper_bound)
+    
+    # Only walk the excluded items again when someone will see them
+    trace = current_trace()
+    if excluded and (trace is not None or logger.isEnabledFor(logging.DEBUG)):
+        for item in items:
+            if item[price_key] < lower_bound or item[price_key] > upper_bound:
+                logger.debug("  EXCLUDED: %s - $%s", item.get('title', ''), item[price_key])
+                if trace is not None:
+                    trace.record("outlier", "rejected", item.get('title', ''), item[price_key],
+                                 f"outside ${lower_bound:.2f} - ${upper_bound:.2f}")
     
     return filtered_items
 
@@ -259,28 +284,258 @@ def filter_by_title_keywords(items: List[Dict[str, Any]], title_key: str = "titl
     if not items or not exclude_keywords:
         return items
     
-    # Convert keywords to lowercase for case-insensitive matching
-    exclude_keywords = [kw.lower() for kw in exclude_keywords]
+    # One compiled, word-bounded pass; rejections are logged and traced with the keyword that matched
+    return filter_by_keywords(items, exclude_keywords, title_key)
+
+def condition_mismatch(condition, condition_display):
+    """Return the condition a sale should have had if it fails the requested condition, else None"""
+    if not condition:
+        return None
+    # Special handling for "Ungraded" and "Graded" conditions
+    if condition.lower() == "ungraded":
+        # For "Ungraded", allow any condition that doesn't contain "Graded" or is explicitly "Ungraded"
+        if "graded" in condition_display.lower() and "ungraded" not in condition_display.lower():
+            return "Ungraded"
+    elif condition.lower() == "graded":
+        # For "Graded", only allow conditions containing "Graded"
+        if "graded" not in condition_display.lower():
+            return "Graded"
+    # For all other conditions, exact match required
+    elif condition.lower() != condition_display.lower():
+        return condition
+    return None
+
+async def fetch_sold_sales(session, headers, search_query, filter_string, condition, refresh=None):
+    """Fetch sold items for a card page by page and filter them down to usable sales"""
+    sold_params = {
+        "q": search_query,
+        "filter": filter_string,
+        "sort": "-endDate"  # Most recent first, so an incremental refresh can stop at the first known item
+    }
+    refresh = refresh or SoldRefresh(None, search_query)
+    
+    # Only format per-item details when someone will see them
+    debug = logger.isEnabledFor(logging.DEBUG)
+    trace = current_trace()
+    keyword_matcher = get_matcher(EXCLUDED_KEYWORDS)
+    
+    candidates = []
+    sales_data = []
+    filtered_out = 0
+    total_items = 0
+    
+    # Stream sold items page by page (served from the search cache when possible)
+    # (only sales newer than the card's watermark when it has been fetched before)
+    async for sold_items in iter_search_pages(session, headers, refresh.kind, sold_params, rate_limiter,
+                                              max_items=SOLD_MAX_ITEMS, **refresh.page_options()):
+        total_items += len(sold_items)
+        logger.debug("Found %d sold items on this page before filtering", len(sold_items))
+        reached_known = refresh.see_page(sold_items)
+        
+        # Process sold items with less strict filtering
+        for item in sold_items:
+            if not isinstance(item, dict):
+                logger.warning("Invalid item format: %s", item)
+                filtered_out += 1
+                ITEMS_FILTERED.inc(reason="invalid")
+                if trace is not None:
+                    trace.record("sold", "rejected", str(item), reason="Invalid format")
+                continue
+            
+            # Skip items with excluded keywords
+            keyword = keyword_matcher.match(item.get('title', ''))
+            if keyword is not None:
+                filtered_out += 1
+                ITEMS_FILTERED.inc(reason="keyword")
+                if debug:
+                    logger.debug("  - FILTERED: Excluded keyword '%s': %s", keyword, item.get('title', ''))
+                if trace is not None:
+                    trace.record("keyword", "rejected", item.get('title', ''), reason=keyword)
+                continue
+            
+            # Get sale date
+            sale_date = item.get('itemEndDate') or item.get('soldDate')
+            if not sale_date:
+                sale_date = datetime.now(timezone.utc).isoformat()
+            
+            # Get price safely
+            price_info = item.get('price', {})
+            if not isinstance(price_info, dict):
+                filtered_out += 1
+                ITEMS_FILTERED.inc(reason="invalid")
+                if trace is not None:
+                    trace.record("sold", "rejected", item.get('title', ''), reason="Invalid price format")
+                continue
+            
+            try:
+                price = float(price_info.get('value', 0))
+            except (ValueError, TypeError):
+                filtered_out += 1
+                ITEMS_FILTERED.inc(reason="invalid")
+                if trace is not None:
+                    trace.record("sold", "rejected", item.get('title', ''), price_info.get('value'), "Invalid price value")
+                continue
+            
+            if price > 0:  # Only include items with valid prices
+                # Get condition info
+                condition_info = item.get('condition', {})
+                condition_display = 'Unknown'
+                condition_id = 'Unknown'
+                
+                # Handle both dictionary and string condition formats
+                if isinstance(condition_info, dict):
+                    condition_display = condition_info.get('conditionDisplayName', 'Unknown')
+                    condition_id = condition_info.get('conditionId', 'Unknown')
+                elif isinstance(condition_info, str):
+                    condition_display = condition_info
+                    condition_id = condition_info
+                
+                if debug:
+                    logger.debug("Processing %s - $%s - Condition: %s (ID %s)",
+                                 item.get('title'), price, condition_display, condition_id)
+                
+                candidates.append({
+                    'item_id': item.get('itemId'),
+                    'sale_date': sale_date,
+                    'price': price,
+                    'condition': condition_display,
+                    'condition_id': condition_id,
+                    'title': item.get('title', '')
+                })
+            else:
+                filtered_out += 1
+                ITEMS_FILTERED.inc(reason="invalid")
+                if trace is not None:
+                    trace.record("sold", "rejected", item.get('title', ''), price, "Zero or negative price")
+        
+        # Everything past the watermark is already in the sales history
+        if reached_known:
+            break
+    if refresh.incremental:
+        logger.debug("Incremental refresh of %s read %d page(s)", search_query, refresh.pages)
+    
+    # Keep every sale seen, then price from the card's accumulated history
+    store = get_sales_store()
+    if store is not None:
+        # The watermark advances in the same transaction, so a failed save leaves these sales to the next refresh
+        new_sales = store.add_sales(search_query, candidates, watermark=refresh.advanced_watermark(SOLD_MAX_ITEMS))
+        candidates = store.get_sales(search_query, since=datetime.now(timezone.utc) - timedelta(days=history_days()))
+        logger.debug("Stored %d new sales for %s; %d sales in history", new_sales, search_query, len(candidates))
+    
+    for sale in candidates:
+        # Filter by condition if specified
+        expected = condition_mismatch(condition, sale['condition'])
+        if expected is not None:
+            filtered_out += 1
+            ITEMS_FILTERED.inc(reason="condition")
+            if debug:
+                logger.debug("  - FILTERED: Condition mismatch - Expected: %s, Got: %s", expected, sale['condition'])
+            if trace is not None:
+                trace.record("condition", "rejected", sale['title'], sale['price'],
+                             f"Expected: {expected}, Got: {sale['condition']}")
+            continue
+        
+        if trace is not None:
+            trace.record("condition", "kept", sale['title'], sale['price'], sale['condition'])
+        
+        sales_data.append({
+            'price': sale['price'],
+            'date': sale['sale_date'],
+            'condition': sale['condition'],
+            'condition_id': sale['condition_id'],
+            'title': sale['title'],
+            'item_id': sale['item_id']
+        })
+    
+    logger.info("Sold items for %s: %d found, %d kept, %d filtered out",
+                search_query, total_items, len(sales_data), filtered_out)
+    
+    # Filter out extreme price outliers (keep more data points)
+    if sales_data and len(sales_data) > 2:
+        with stage("outlier_filter"):
+            prices = [sale['price'] for sale in sales_data]
+            mean_price = statistics.mean(prices)
+            std_dev = statistics.stdev(prices) if len(prices) > 1 else 0
+            # Use 3 standard deviations instead of 2 to keep more data points
+            outlier_threshold = 3 * std_dev
+            logger.debug("Price outlier filtering: mean $%.2f, std dev $%.2f, threshold ±$%.2f",
+                         mean_price, std_dev, outlier_threshold)
+        
+            filtered_sales = []
+            for sale in sales_data:
+                if abs(sale['price'] - mean_price) <= outlier_threshold:
+                    filtered_sales.append(sale)
+                else:
+                    if debug:
+                        logger.debug("  - OUTLIER: %s - $%s (diff: $%.2f)",
+                                     sale['title'], sale['price'], abs(sale['price'] - mean_price))
+                    if trace is not None:
+                        trace.record("outlier", "rejected", sale['title'], sale['price'],
+                                     f"more than ${outlier_threshold:.2f} from mean ${mean_price:.2f}")
+        
+            ITEMS_FILTERED.inc(len(sales_data) - len(filtered_sales), reason="outlier")
+            sales_data = filtered_sales
+        logger.debug("After outlier filtering: %d sales remaining", len(sales_data))
     
-    # Filter out items with matching keywords
-    filtered_items = [
-        item for item in items 
-        if not any(kw in item.get(title_key, "").lower() for kw in exclude_keywords)
-    ]
+    return sales_data
+
+async def fetch_active_listings(session, headers, search_query, condition):
+    """Fetch active listings for a card page by page and filter them by condition"""
+    # Get active listings with less strict filtering
+    active_filter = "buyingOptions:{FIXED_PRICE|AUCTION}"  # Include both Buy It Now and Auction listings
+    
+    active_params = {
+        "q": search_query,
+        "filter": active_filter,
+        "sort": "price"
+    }
     
-    # Print debug information about filtered items
-    print(f"\nFiltered out {len(items) - len(filtered_items)} items with keywords: {exclude_keywords}")
-    for item in items:
-        if any(kw in item.get(title_key, "").lower() for kw in exclude_keywords):
-            print(f"  EXCLUDED: {item.get(title_key, '')} - ${item.get('price', 0)}")
+    logger.debug("Using active listings filter: %s", active_filter)
     
-    return filtered_items
+    debug = logger.isEnabledFor(logging.DEBUG)
+    trace = current_trace()
+    
+    # Stream active listings page by page (served from the search cache when possible)
+    active_listings = []
+    async for page in iter_search_pages(session, headers, 'active', active_params, rate_limiter, max_items=ACTIVE_MAX_ITEMS):
+        logger.debug("Number of active listings on this page: %d", len(page))
+        
+        # Process active listings data
+        for item in page:
+            if "price" in item:
+                if debug:
+                    logger.debug("Found active listing: %s - $%s - Condition: %s",
+                                 item.get('title'), item['price']['value'], item.get('condition', 'Unknown'))
+                listing_type = "buy_it_now" if "FIXED_PRICE" in item.get("buyingOptions", []) else "auction"
+                
+                # Only include items with the specified condition
+                item_condition = item.get("condition", "Unknown")
+                if condition is None or item_condition == condition:
+                    active_listings.append({
+                        "price": float(item["price"]["value"]),
+                        "condition": item_condition,
+                        "listing_type": listing_type,
+                        "title": item.get("title", "")  # Add title to the active listings
+                    })
+                else:
+                    ITEMS_FILTERED.inc(reason="condition")
+                    if trace is not None:
+                        trace.record("active", "rejected", item.get('title', ''), item['price']['value'],
+                                     f"Expected: {condition}, Got: {item_condition}")
+    
+    logger.info("Active listings for %s: %d kept", search_query, len(active_listings))
+    return active_listings
 
-async def get_card_price(brand, set_name, year, condition, player_name='', card_number='', card_variation='', session=None):
-    """Get price data for a specific card from eBay."""
+async def get_card_price(brand, set_name, year, condition, player_name='', card_number='', card_variation='', session=None, trace=False):
+    """Get price data for a specific card from eBay.
+    
+    With trace=True, every filter decision for the card is recorded and
+    returned as a FilterTrace under 'filter_trace'.
+    """
     try:
         # Get OAuth token
-        oauth_token = await get_ebay_oauth_token()
+        with stage("token"):
+            oauth_token = await get_ebay_oauth_token(session)
         
         # Build search query - make it less strict
         search_query = f"{brand} {set_name} {year}"
@@ -291,11 +546,13 @@ async def get_card_price(brand, set_name, year, condition, player_name='', card_
         if card_variation and len(card_variation.strip()) > 0:
             search_query += f" {card_variation}"
         
-        print(f"Search query: {search_query}")
+        logger.info("Search query: %s", search_query)
         
         # Calculate date range for last 90 days
+        # (or only the sales since the last refresh when the card has a watermark)
         end_date = datetime.now(timezone.utc)
-        start_date = end_date - timedelta(days=90)
+        refresh = SoldRefresh(get_sales_store(), search_query, scope=CLI_SALES_SCOPE)
+        start_date = refresh.start_date(end_date - timedelta(days=90))
         
         # Format dates in ISO 8601 UTC format
         start_date_str = start_date.strftime('%Y-%m-%dT%H:%M:%S.000Z')
@@ -311,360 +568,279 @@ async def get_card_price(brand, set_name, year, condition, player_name='', card_
         # Build filter string - only filter by date range initially
         filter_string = f"soldItemsFilter:{{soldDateRange:{{startDate:'{start_date_str}',endDate:'{end_date_str}'}}}}"
         
-        # Apply rate limiting
-        await rate_limiter.acquire()
-        
-        # Make API call for sold items
-        sold_items_url = f"https://api.ebay.com/buy/browse/v1/item_summary/search?q={quote(search_query)}&filter={quote(filter_string)}&limit=100"
+        # Fetch sold items and active listings concurrently, filtering each as it arrives
+        # (optionally recording every filter decision for this card)
+        with (tracing(search_query) if trace else nullcontext()) as card_trace:
+            sales_data, active_listings = await asyncio.gather(
+                fetch_sold_sales(session, headers, search_query, filter_string, condition, refresh),
+                fetch_active_listings(session, headers, search_query, condition)
+            )
         
-        async with session.get(sold_items_url, headers=headers) as response:
-            if response.status != 200:
-                print(f"eBay API error: Status {response.status}")
-                response_text = await response.text()
-                print(f"Response: {response_text}")
-                raise Exception(f"eBay API call failed with status {response.status}")
-            
-            response_json = await response.json()
-            if not isinstance(response_json, dict):
-                print(f"Unexpected response format: {response_json}")
-                raise Exception("Invalid response format from eBay API")
-            
-            sold_items = response_json.get('itemSummaries', [])
-            if not isinstance(sold_items, list):
-                print(f"Invalid itemSummaries format: {sold_items}")
-                raise Exception("Invalid itemSummaries format in eBay API response")
-            
-            print(f"\nFound {len(sold_items)} sold items before filtering")
-            print("Initial sold items:")
-            for item in sold_items:
-                title = item.get('title', 'Unknown Title')
-                price = item.get('price', {}).get('value', 0)
-                condition_info = item.get('condition', {})
-                condition_display = condition_info.get('conditionDisplayName', 'Unknown') if isinstance(condition_info, dict) else 'Unknown'
-                print(f"  - {title} - ${price} - Condition: {condition_display}")
-            
-            # Process sold items with less strict filtering
-            sales_data = []
-            filtered_out = []
-            for item in sold_items:
-                if not isinstance(item, dict):
-                    print(f"Invalid item format: {item}")
-                    filtered_out.append(("Invalid format", item))
-                    continue
-                
-                # Skip items with excluded keywords
-                title = item.get('title', '').lower()
-                if any(keyword in title for keyword in ['reprint', 'proxy', 'custom', 'lot', 'bulk']):
-                    filtered_out.append(("Excluded keyword", title))
-                    continue
-                
-                # Get sale date
-                sale_date = item.get('itemEndDate') or item.get('soldDate')
-                if not sale_date:
-                    sale_date = datetime.now(timezone.utc).isoformat()
-                
-                # Get price safely
-                price_info = item.get('price', {})
-                if not isinstance(price_info, dict):
-                    filtered_out.append(("Invalid price format", item))
-                    continue
-                
-                try:
-                    price = float(price_info.get('value', 0))
-                except (ValueError, TypeError):
-                    filtered_out.append(("Invalid price value", price_info))
-                    continue
-                
-                if price > 0:  # Only include items with valid prices
-                    # Get condition info with detailed logging
-                    condition_info = item.get('condition', {})
-                    condition_display = 'Unknown'
-                    condition_id = 'Unknown'
-                    
-                    # Handle both dictionary and string condition formats
-                    if isinstance(condition_info, dict):
-                        condition_display = condition_info.get('conditionDisplayName', 'Unknown')
-                        condition_id = condition_info.get('conditionId', 'Unknown')
-                    elif isinstance(condition_info, str):
-                        condition_display = condition_info
-                        condition_id = condition_info
-                    
-                    print(f"Processing condition for {item.get('title')}:")
-                    print(f"  - Display Name: {condition_display}")
-                    print(f"  - Condition ID: {condition_id}")
-                    
-                    # Filter by condition if specified
-                    if condition:
-                        # Special handling for "Ungraded" and "Graded" conditions
-                        if condition.lower() == "ungraded":
-                            # For "Ungraded", allow any condition that doesn't contain "Graded" or is explicitly "Ungraded"
-                            if "graded" in condition_display.lower() and "ungraded" not in condition_display.lower():
-                                print(f"  - FILTERED: Condition mismatch - Expected: Ungraded, Got: {condition_display}")
-                                filtered_out.append(("Condition mismatch", f"{item.get('title')} - Expected: Ungraded, Got: {condition_display}"))
-                                continue
-                            # If we get here, the condition is acceptable (either "Ungraded" or any other non-graded condition)
-                            print(f"  - KEPT: Condition acceptable for Ungraded search: {condition_display}")
-                        elif condition.lower() == "graded":
-                            # For "Graded", only allow conditions containing "Graded"
-                            if "graded" not in condition_display.lower():
-                                print(f"  - FILTERED: Condition mismatch - Expected: Graded, Got: {condition_display}")
-                                filtered_out.append(("Condition mismatch", f"{item.get('title')} - Expected: Graded, Got: {condition_display}"))
-                                continue
-                            # If we get here, the condition contains "Graded"
-                            print(f"  - KEPT: Condition acceptable for Graded search: {condition_display}")
-                        # For all other conditions, exact match required
-                        elif condition.lower() != condition_display.lower():
-                            print(f"  - FILTERED: Condition mismatch - Expected: {condition}, Got: {condition_display}")
-                            filtered_out.append(("Condition mismatch", f"{item.get('title')} - Expected: {condition}, Got: {condition_display}"))
-                            continue
-                        else:
-                            print(f"  - KEPT: Exact condition match: {condition_display}")
-                    
-                    sales_data.append({
-                        'price': price,
-                        'date': sale_date,
-                        'condition': condition_display,
-                        'condition_id': condition_id,
-                        'title': item.get('title', '')
-                    })
-                else:
-                    filtered_out.append(("Zero or negative price", price))
-            
-            print(f"\nAfter initial filtering:")
-            print(f"  Kept: {len(sales_data)} sales")
-            print(f"  Filtered out: {len(filtered_out)} items")
-            print("\nFiltered out items:")
-            for reason, item in filtered_out:
-                print(f"  - {reason}: {item}")
-            
-            print("\nKept sales:")
-            for sale in sales_data:
-                print(f"  - {sale['title']} - ${sale['price']} - {sale['condition']}")
-            
-            # Filter out extreme price outliers (keep more data points)
-            if sales_data and len(sales_data) > 2:
-                prices = [sale['price'] for sale in sales_data]
-                mean_price = statistics.mean(prices)
-                std_dev = statistics.stdev(prices) if len(prices) > 1 else 0
-                # Use 3 standard deviations instead of 2 to keep more data points
-                outlier_threshold = 3 * std_dev
-                print(f"\nPrice outlier filtering:")
-                print(f"  Mean price: ${mean_price:.2f}")
-                print(f"  Standard deviation: ${std_dev:.2f}")
-                print(f"  Outlier threshold: ±${outlier_threshold:.2f}")
-                
-                filtered_sales = []
-                for sale in sales_data:
-                    if abs(sale['price'] - mean_price) <= outlier_threshold:
-                        filtered_sales.append(sale)
-                    else:
-                        print(f"  - OUTLIER: {sale['title']} - ${sale['price']} (diff: ${abs(sale['price'] - mean_price):.2f})")
-                
-                sales_data = filtered_sales
-                print(f"  After outlier filtering: {len(sales_data)} sales remaining")
-            
-            # Print remaining sales data
-            print("\nRemaining sales data:")
-            for sale in sales_data:
-                print(f"  {sale.get('title', '')} - ${sale['price']} - {sale['condition']}")
-            
-            # Get active listings with less strict filtering
-            active_filter = "buyingOptions:{FIXED_PRICE|AUCTION}"  # Include both Buy It Now and Auction listings
-            
-            active_params = {
-                "q": search_query,
-                "filter": active_filter,
-                "sort": "price",
-                "limit": 100
-            }
-            
-            print(f"Using active listings filter: {active_params['filter']}")  # Debug log
+        # Calculate market metrics
+        with stage("prediction"):
+            if sales_data or active_listings:
+                # Perform market analysis
+                market_analysis = analyze_market(sales_data, active_listings)
             
-            # Apply rate limiting before making the API call
-            await rate_limiter.acquire()
+                # Predict price based on available data
+                predicted_price = 0
+                confidence_score = 0
             
-            # Make requests to eBay API using aiohttp
-            active_url = f"https://api.ebay.com/buy/browse/v1/item_summary/search?q={quote(search_query)}&filter={quote(active_filter)}&limit=100"
-            
-            async with session.get(active_url, headers=headers) as response:
-                if response.status != 200:
-                    response_text = await response.text()
-                    print(f"eBay API error: Status {response.status}")
-                    print(f"Response: {response_text}")
-                    raise Exception(f"eBay API call failed with status {response.status}")
-                
-                active_data = await response.json()
-                print(f"Number of active listings found: {len(active_data.get('itemSummaries', []))}")  # Debug log
-                
-                # Process active listings data
-                active_listings = []
-                for item in active_data.get("itemSummaries", []):
-                    if "price" in item:
-                        print(f"Found active listing: {item.get('title')} - ${item['price']['value']} - Condition: {item.get('condition', 'Unknown')}")  # Debug log
-                        listing_type = "buy_it_now" if "FIXED_PRICE" in item.get("buyingOptions", []) else "auction"
-                        
-                        # Only include items with the specified condition
-                        item_condition = item.get("condition", "Unknown")
-                        if condition is None or item_condition == condition:
-                            active_listings.append({
-                                "price": float(item["price"]["value"]),
-                                "condition": item_condition,
-                                "listing_type": listing_type,
-                                "title": item.get("title", "")  # Add title to the active listings
-                            })
-                
-                # Calculate market metrics
-                if sales_data or active_listings:
-                    # Perform market analysis
-                    market_analysis = analyze_market(sales_data, active_listings)
-                    
-                    # Predict price based on available data
-                    predicted_price = 0
-                    confidence_score = 0
-                    
-                    if sales_data:
-                        recent_prices = [sale['price'] for sale in sales_data]
-                        predicted_price = statistics.mean(recent_prices)
-                        confidence_score = min(1.0, len(sales_data) / 10.0)  # Scale confidence based on number of data points
-                    elif active_listings:
-                        active_prices = [listing['price'] for listing in active_listings]
-                        predicted_price = statistics.mean(active_prices)
-                        confidence_score = min(0.5, len(active_listings) / 20.0)  # Lower confidence for active-only
-                else:
-                    market_analysis = {
-                        "market_trend": "unknown",
-                        "supply_level": "unknown",
-                        "price_trend": "unknown",
-                        "avg_sale_price": 0,
-                        "avg_active_price": 0,
-                        "active_listings_count": 0,
-                        "recent_sales_count": 0
-                    }
-                    predicted_price = 0
-                    confidence_score = 0
-                
-                return {
-                    'predicted_price': predicted_price,
-                    'confidence_score': confidence_score,
-                    'recent_sales': sales_data,
-                    'active_listings': active_listings,
-                    'market_analysis': market_analysis
+                if sales_data:
+                    recent_prices = [sale['price'] for sale in sales_data]
+                    predicted_price = statistics.mean(recent_prices)
+                    confidence_score = min(1.0, len(sales_data) / 10.0)  # Scale confidence based on number of data points
+                elif active_listings:
+                    active_prices = [listing['price'] for listing in active_listings]
+                    predicted_price = statistics.mean(active_prices)
+                    confidence_score = min(0.5, len(active_listings) / 20.0)  # Lower confidence for active-only
+            else:
+                market_analysis = {
+                    "market_trend": "unknown",
+                    "supply_level": "unknown",
+                    "price_trend": "unknown",
+                    "avg_sale_price": 0,
+                    "avg_active_price": 0,
+                    "active_listings_count": 0,
+                    "recent_sales_count": 0
                 }
-                
+                predicted_price = 0
+                confidence_score = 0
+        
+        result = {
+            'predicted_price': predicted_price,
+            'confidence_score': confidence_score,
+            'recent_sales': sales_data,
+            'active_listings': active_listings,
+            'market_analysis': market_analysis
+        }
+        if card_trace is not None:
+            result['filter_trace'] = card_trace
+        return result
+    
     except Exception as e:
-        print(f"Error in get_card_price: {str(e)}")
+        logger.error("Error in get_card_price: %s", e)
         raise
 
-async def process_cards_from_csv(input_csv_path, output_csv_path, max_concurrent=3):
-    """Process multiple cards from an input CSV file and write results to an output CSV file."""
+# Columns of the batch output CSV
+OUTPUT_COLUMNS = [
+    'Card Name', 'Set', 'Year', 'Player Name', 'Card Number', 
+    'Card Variation', 'Condition', 'Predicted Price', 'Confidence Score',
+    'Recent Sales', 'Active Listings', 'Market Trend', 'Supply Level',
+    'Price Trend', 'Average Sale Price', 'Average Active Price',
+    'Active Listings Count', 'Recent Sales Count'
+]
+
+# Columns of the per-card timings file written with --timings
+TIMING_COLUMNS = ['Card Name', 'Player Name', 'Card Number', 'Card Variation', 'Condition', 'Seconds', 'Success']
+
+# Column types for typed output formats (Parquet, NDJSON); other columns are strings
+OUTPUT_COLUMN_TYPES = {
+    'Row': 'int',
+    'Predicted Price': 'float',
+    'Confidence Score': 'float',
+    'Recent Sales': 'int',
+    'Active Listings': 'int',
+    'Average Sale Price': 'float',
+    'Average Active Price': 'float',
+    'Active Listings Count': 'int',
+    'Recent Sales Count': 'int'
+}
+
+def read_cards(f):
+    """Yield cards from an open input CSV one at a time, with values stripped"""
+    for row in csv.DictReader(f):
+        yield {key: str(value).strip() for key, value in row.items()}
+
+async def process_cards_from_csv(input_csv_path, output_csv_path, max_concurrent=3, trace_card=None, resume=False,
+                                 shard=None, timings_path=None, adaptive=None):
+    """Process multiple cards from an input CSV file and write results to an output file.
+    
+    The input may be gzip (.gz) or zstd (.zst) compressed. The output format
+    follows the output file name: CSV (optionally .gz/.zst), NDJSON (.ndjson,
+    .jsonl) or Parquet (.parquet).
+    
+    Cards are streamed from the input through max_concurrent pricing workers
+    to a single writer that flushes rows in batches, so memory use does not
+    grow with the size of the input file.
+    
+    If trace_card is given, the filter decisions for every card whose name
+    contains it are printed after that card is priced.
+    
+    Every card whose row is written is recorded in a journal next to the
+    output file. With resume=True, cards already in the journal are skipped
+    and new rows are appended to the existing output.
+    
+    shard=(i, n) prices only input rows whose index modulo n is i, and writes
+    each row prefixed with its input row index so shards can be merged back
+    into input order.
+    
+    If timings_path is given, how long each card took to price is written
+    there as CSV (see TIMING_COLUMNS), for comparing runs card by card.
+    
+    adaptive=(min, max) replaces the fixed worker count with a limit that
+    starts at max_concurrent and follows eBay's responses within those
+    bounds (see AdaptiveConcurrency); its final state is returned under
+    'concurrency'.
+    """
     results = {
         'total': 0,
+        'skipped': 0,
         'successful': 0,
         'failed': 0,
         'errors': []
     }
     
-    # Read the input CSV file
-    with open(input_csv_path, 'r') as f:
-        reader = csv.DictReader(f)
-        cards = [row for row in reader]
-    
-    # Convert all values to strings and strip whitespace
-    for card in cards:
-        for key in card:
-            card[key] = str(card[key]).strip()
-    
-    results['total'] = len(cards)
-    
-    # Create a semaphore to limit concurrent processes
-    sem = asyncio.Semaphore(max_concurrent)
-    
-    # Create a lock for writing to the CSV file
-    csv_lock = asyncio.Lock()
-    
-    # Create a single session for all requests
-    async with aiohttp.ClientSession() as session:
-        # Write header to output CSV
-        with open(output_csv_path, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                'Card Name', 'Set', 'Year', 'Player Name', 'Card Number', 
-                'Card Variation', 'Condition', 'Predicted Price', 'Confidence Score',
-                'Recent Sales', 'Active Listings', 'Market Trend', 'Supply Level',
-                'Price Trend', 'Average Sale Price', 'Average Active Price',
-                'Active Listings Count', 'Recent Sales Count'
+    async def process_card(pending_card):
+        index, key, card = pending_card
+        started = time.perf_counter()
+        try:
+            # Get optional card attributes with defaults
+            player_name = card.get('player_name', '')
+            card_number = card.get('card_number', '')
+            card_variation = card.get('card_variation', '')
+            
+            # Trace filter decisions for the card being debugged
+            card_label = " ".join(v for v in (card['brand'], card['set_name'], card['year'], player_name, card_number, card_variation) if v)
+            trace = bool(trace_card) and trace_card.lower() in card_label.lower()
+            
+            # Get card price data
+            with pricing_card():
+                price_data = await get_card_price(
+                    brand=card['brand'],
+                    set_name=card['set_name'],
+                    year=card['year'],
+                    condition=card['condition'],
+                    player_name=player_name,
+                    card_number=card_number,
+                    card_variation=card_variation,
+                    session=session,
+                    trace=trace
+                )
+            
+            if trace:
+                print(price_data['filter_trace'].format())
+            
+            # Extract market analysis data
+            market_analysis = price_data['market_analysis']
+            
+            results['successful'] += 1
+            logger.info("Successfully processed %s %s %s", card['brand'], card['set_name'], card['year'])
+            
+            # Hand the row to the writer task
+            row = [
+                f"{card['brand']} {card['set_name']} {card['year']}",
+                card['set_name'],
+                card['year'],
+                player_name,
+                card_number,
+                card_variation,
+                card['condition'],
+                price_data['predicted_price'],
+                price_data['confidence_score'],
+                len(price_data['recent_sales']),
+                len(price_data['active_listings']),
+                market_analysis['market_trend'],
+                market_analysis['supply_level'],
+                market_analysis['price_trend'],
+                market_analysis['avg_sale_price'],
+                market_analysis['avg_active_price'],
+                market_analysis['active_listings_count'],
+                market_analysis['recent_sales_count']
+            ]
+            if shard is not None:
+                row.insert(0, index)
+            record_timing(card, started, True)
+            return key, row
+            
+        except Exception as e:
+            results['failed'] += 1
+            logger.error("Error processing %s %s %s: %s", card.get('brand'), card.get('set_name'), card.get('year'), e)
+            results['errors'].append({
+                'card': f"{card.get('brand')} {card.get('set_name')} {card.get('year')}",
+                'error': str(e)
+            })
+            record_timing(card, started, False)
+            return None
+    
+    def record_timing(card, started, success):
+        if timings is not None:
+            timings.writerow([
+                f"{card.get('brand')} {card.get('set_name')} {card.get('year')}",
+                card.get('player_name', ''),
+                card.get('card_number', ''),
+                card.get('card_variation', ''),
+                card.get('condition', ''),
+                round(time.perf_counter() - started, 4),
+                success
             ])
+    
+    def pending_cards(infile):
+        for index, (key, card) in enumerate(keyed_cards(read_cards(infile))):
+            if shard is not None and index % shard[1] != shard[0]:
+                continue
+            results['total'] += 1
+            if journal.is_done(key):
+                results['skipped'] += 1
+                continue
+            yield index, key, card
+    
+    # Only append to an output file that already has its header
+    append = resume and os.path.exists(output_csv_path) and os.path.getsize(output_csv_path) > 0
+    if append and not supports_append(output_csv_path):
+        raise ValueError(f"Cannot resume into {output_csv_path}: its format does not support appending")
+    columns = (['Row'] if shard is not None else []) + OUTPUT_COLUMNS
+    
+    # Stream cards from the input file instead of loading it all up front
+    with CheckpointJournal(journal_path_for(output_csv_path)).open(resume=append) as journal, \
+            open_text(input_csv_path) as infile, \
+            create_writer(output_csv_path, columns, OUTPUT_COLUMN_TYPES, append=append) as writer, \
+            (open_text(timings_path, 'w') if timings_path else nullcontext()) as timings_file:
         
-        async def process_card(card):
-            async with sem:
-                try:
-                    # Get optional card attributes with defaults
-                    player_name = card.get('player_name', '')
-                    card_number = card.get('card_number', '')
-                    card_variation = card.get('card_variation', '')
-                    
-                    # Get card price data
-                    price_data = await get_card_price(
-                        brand=card['brand'],
-                        set_name=card['set_name'],
-                        year=card['year'],
-                        condition=card['condition'],
-                        player_name=player_name,
-                        card_number=card_number,
-                        card_variation=card_variation,
-                        session=session
-                    )
-                    
-                    # Extract market analysis data
-                    market_analysis = price_data['market_analysis']
-                    
-                    # Write results to output CSV
-                    async with csv_lock:
-                        with open(output_csv_path, 'a', newline='') as f:
-                            writer = csv.writer(f)
-                            writer.writerow([
-                                f"{card['brand']} {card['set_name']} {card['year']}",
-                                card['set_name'],
-                                card['year'],
-                                player_name,
-                                card_number,
-                                card_variation,
-                                card['condition'],
-                                price_data['predicted_price'],
-                                price_data['confidence_score'],
-                                len(price_data['recent_sales']),
-                                len(price_data['active_listings']),
-                                market_analysis['market_trend'],
-                                market_analysis['supply_level'],
-                                market_analysis['price_trend'],
-                                market_analysis['avg_sale_price'],
-                                market_analysis['avg_active_price'],
-                                market_analysis['active_listings_count'],
-                                market_analysis['recent_sales_count']
-                            ])
-                    
-                    results['successful'] += 1
-                    print(f"Successfully processed {card['brand']} {card['set_name']} {card['year']}")
-                    
-                except Exception as e:
-                    results['failed'] += 1
-                    error_msg = f"Error processing {card['brand']} {card['set_name']} {card['year']}: {str(e)}"
-                    print(error_msg)
-                    results['errors'].append({
-                        'card': f"{card['brand']} {card['set_name']} {card['year']}",
-                        'error': str(e)
-                    })
+        timings = csv.writer(timings_file) if timings_file is not None else None
+        if timings is not None:
+            timings.writerow(TIMING_COLUMNS)
+        
+        def write_rows(keyed_rows):
+            writer.write_rows([row for _, row in keyed_rows])
+            writer.flush()
+            # Rows are on disk, so the cards can be marked done
+            journal.mark_done(key for key, _ in keyed_rows)
         
-        # Process all cards concurrently
-        tasks = [process_card(card) for card in cards]
-        await asyncio.gather(*tasks)
+        # Create a single pooled session for all requests
+        concurrency = AdaptiveConcurrency(max_concurrent, *adaptive) if adaptive else None
+        async with HttpPool.from_env() as session:
+            await run_pipeline(
+                pending_cards(infile),
+                process_card,
+                write_rows,
+                workers=max_concurrent,
+                concurrency=concurrency
+            )
+    
     
     # Print summary
     print("\nProcessing complete!")
     print(f"Total cards: {results['total']}")
+    if results['skipped']:
+        print(f"Skipped (already priced): {results['skipped']}")
     print(f"Successful: {results['successful']}")
     print(f"Failed: {results['failed']}")
     
+    if concurrency is not None:
+        results['concurrency'] = concurrency.stats()
+        print(f"Adaptive concurrency: limit {concurrency.limit} at the end, {concurrency.peak_limit} at most "
+              f"(bounds {concurrency.min_limit}-{concurrency.max_limit}; {concurrency.throttled} throttled responses)")
+    
+    cache = get_search_cache()
+    if cache is not None:
+        cache_stats = cache.stats()
+        print(f"Search cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+    
+    results['remaining_quota'] = rate_limiter.remaining_quota()
+    if results['remaining_quota'] is not None:
+        print(f"Remaining daily eBay quota: {results['remaining_quota']}")
+    
     if results['errors']:
         print("\nErrors:")
         for error in results['errors']:
@@ -679,9 +855,58 @@ def main():
     parser.add_argument('--input', type=str, required=True, help='Path to the input CSV file')
     parser.add_argument('--output', type=str, default='card_prices.csv', help='Path to the output CSV file')
     parser.add_argument('--max-concurrent', type=int, default=3, help='Maximum number of concurrent processes')
+    parser.add_argument('--adaptive', type=str, nargs='?', const=f'{DEFAULT_MIN_LIMIT}:{DEFAULT_MAX_LIMIT}',
+                        default=None, metavar='MIN:MAX',
+                        help='Adjust concurrency to eBay\'s responses within MIN:MAX, starting from --max-concurrent '
+                             f'(default bounds: {DEFAULT_MIN_LIMIT}:{DEFAULT_MAX_LIMIT})')
+    parser.add_argument('--log-level', type=str, default='WARNING',
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help='Logging level; DEBUG shows every listing and filter decision (default: WARNING)')
+    parser.add_argument('--trace-card', type=str, default=None,
+                        help='Print the filter decisions for cards whose name contains this text')
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip cards already written to the output by an earlier run and append the rest')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Split the input across this many processes sharing one rate limit (default: 1)')
+    parser.add_argument('--shard', type=str, default=None,
+                        help='Price only shard i/n of the input (0-based), for running shards by hand')
+    parser.add_argument('--merge-shards', type=int, default=None, metavar='N',
+                        help='Merge the outputs of N hand-run shards into --output and exit')
+    parser.add_argument('--record', type=str, default=None, metavar='CASSETTE',
+                        help='Save every eBay response to this cassette file (.ndjson.gz) for later replay')
+    parser.add_argument('--replay', type=str, default=None, metavar='CASSETTE',
+                        help='Answer eBay requests from this cassette instead of the network')
+    parser.add_argument('--replay-speed', type=float, default=0.0,
+                        help='With --replay, wait this fraction of each recorded response time (default: 0, no waiting)')
+    parser.add_argument('--timings', type=str, default=None,
+                        help='Write how long each card took to this CSV file')
+    parser.add_argument('--metrics', type=str, default=None,
+                        help='Write stage latencies and counters in Prometheus text format to this file when done')
+    parser.add_argument('--profile', action='store_true',
+                        help='Capture a CPU profile and per-stage memory peaks of the run')
+    parser.add_argument('--profile-dir', type=str, default=DEFAULT_PROFILE_DIR,
+                        help=f'Directory for --profile output (default: {DEFAULT_PROFILE_DIR})')
     
     args = parser.parse_args()
     
+    if args.record and args.replay:
+        parser.error('--record and --replay cannot be used together')
+    try:
+        adaptive = parse_range(args.adaptive) if args.adaptive else None
+    except ValueError as e:
+        parser.error(str(e))
+    if (args.record or args.timings or args.metrics or args.profile) and args.workers > 1:
+        parser.error('--record, --timings, --metrics and --profile need a single process; drop --workers')
+    if args.record or args.replay:
+        # Recorded and replayed runs must send identical requests, so skip the sales history's incremental refresh;
+        # the environment carries the setting to --workers processes too
+        os.environ['EBAY_SALES_DB'] = ''
+        os.environ['EBAY_TRANSPORT'] = 'record' if args.record else 'replay'
+        os.environ['EBAY_CASSETTE'] = args.record or args.replay
+        os.environ['EBAY_REPLAY_TIME_SCALE'] = str(args.replay_speed)
+    
+    logging.basicConfig(level=args.log_level, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    
     print("eBay Card Pricer - Batch Processing")
     print("===================================")
     print(f"Input file: {args.input}")
@@ -689,13 +914,45 @@ def main():
     print(f"Concurrent processing: {args.max_concurrent}")
     print("\nProcessing cards... This may take a while depending on the number of cards.")
     
-    # Run the async function using asyncio
-    results = asyncio.run(process_cards_from_csv(args.input, args.output, args.max_concurrent))
+    if args.merge_shards:
+        merged = merge_shard_outputs(args.output, args.merge_shards, column_types=OUTPUT_COLUMN_TYPES)
+        print(f"Merged {merged} rows from {args.merge_shards} shards into {args.output}")
+        return
+    
+    if args.workers > 1:
+        # One process per shard, each with its own session and event loop
+        print(f"Worker processes: {args.workers}")
+        results = run_sharded(args.input, args.output, args.workers, args.max_concurrent,
+                              resume=args.resume, trace_card=args.trace_card, log_level=args.log_level,
+                              adaptive=adaptive)
+    elif args.shard:
+        index, count = parse_shard(args.shard)
+        shard_output = shard_output_path(args.output, index, count)
+        print(f"Shard {index}/{count}, writing to {shard_output}")
+        results = asyncio.run(process_cards_from_csv(args.input, shard_output, args.max_concurrent,
+                                                     trace_card=args.trace_card, resume=args.resume,
+                                                     shard=(index, count), adaptive=adaptive))
+    else:
+        # Run the async function using asyncio
+        with (profiling(args.input, args.profile_dir) if args.profile else nullcontext()) as profile:
+            results = asyncio.run(process_cards_from_csv(args.input, args.output, args.max_concurrent,
+                                                         trace_card=args.trace_card, resume=args.resume,
+                                                         timings_path=args.timings, adaptive=adaptive))
+        if profile is not None:
+            print(f"Profile has been written to {profile.paths['cpu']} and {profile.paths['memory']}")
     
     print("\nProcessing complete!")
     print(f"Total cards: {results['total']}")
     print(f"Successful: {results['successful']}")
     print(f"Failed: {results['failed']}")
+    if args.workers == 1 and args.record:
+        print(f"Recorded {get_transport().recorded} eBay responses to {args.record}")
+    if args.workers == 1 and args.replay:
+        transport = get_transport()
+        print(f"Replayed {transport.replayed} eBay responses from {args.replay} ({transport.missing} not in the cassette)")
+    if args.metrics:
+        write_metrics(args.metrics)
+        print(f"Metrics have been written to {args.metrics}")
     
     if results['errors']:
         print("\nErrors encountered:")
@@ -0,0 +1,67 @@
+import os
+import hashlib
+from typing import Dict, Iterable, Iterator, Set, Tuple
+
+# Card fields that identify a row of the input CSV
+CARD_KEY_FIELDS = ('brand', 'set_name', 'year', 'condition', 'player_name', 'card_number', 'card_variation')
+
+def journal_path_for(output_csv_path: str) -> str:
+    """Default journal location for an output file"""
+    return output_csv_path + ".journal"
+
+def card_key(card: Dict[str, str]) -> str:
+    """Stable identity for a card, independent of its row number and letter case"""
+    parts = [" ".join(str(card.get(field) or "").lower().split()) for field in CARD_KEY_FIELDS]
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+def keyed_cards(cards: Iterable[Dict[str, str]]) -> Iterator[Tuple[str, Dict[str, str]]]:
+    """Pair each card with its key; repeats of the same card get their own keys (key#2, key#3, ...)"""
+    seen: Dict[str, int] = {}
+    for card in cards:
+        key = card_key(card)
+        count = seen.get(key, 0) + 1
+        seen[key] = count
+        yield (key if count == 1 else f"{key}#{count}"), card
+
+class CheckpointJournal:
+    """Append-only record of cards whose output rows have been written"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done: Set[str] = set()
+        self._file = None
+
+    def open(self, resume: bool = False) -> "CheckpointJournal":
+        """Open the journal, loading finished keys when resuming and starting over otherwise"""
+        if resume and os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                # A torn last line from a crash has no newline and is ignored
+                self.done = {line[:-1] for line in f if line.endswith("\n")}
+        else:
+            self.done = set()
+        self._file = open(self.path, 'a' if resume else 'w')
+        return self
+
+    def is_done(self, key: str) -> bool:
+        return key in self.done
+
+    def mark_done(self, keys: Iterable[str]) -> None:
+        """Durably record keys; call only after their output rows are on disk"""
+        keys = list(keys)
+        if not keys:
+            return
+        self._file.write("".join(f"{key}\n" for key in keys))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.done.update(keys)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "CheckpointJournal":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
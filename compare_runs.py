@@ -0,0 +1,124 @@
+import csv
+import sys
+import argparse
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from output_writers import open_text
+
+# Output columns that identify a card
+IDENTITY_COLUMNS = ('Card Name', 'Player Name', 'Card Number', 'Card Variation', 'Condition')
+
+# Output columns compared between runs; numeric ones allow a small tolerance
+NUMERIC_COLUMNS = ('Predicted Price', 'Confidence Score', 'Recent Sales Count', 'Active Listings Count')
+TEXT_COLUMNS = ('Market Trend', 'Supply Level', 'Price Trend')
+
+def card_identity(row: Dict[str, str]) -> Tuple[str, ...]:
+    return tuple(" ".join((row.get(column) or "").lower().split()) for column in IDENTITY_COLUMNS)
+
+def read_keyed_rows(path: str) -> Dict[Tuple[str, ...], Dict[str, str]]:
+    """Rows of an output or timings CSV keyed by card; repeats of a card are numbered"""
+    rows = {}
+    with open_text(path) as f:
+        for row in csv.DictReader(f):
+            identity = card_identity(row)
+            key = identity + (1,)
+            while key in rows:
+                key = identity + (key[-1] + 1,)
+            rows[key] = row
+    return rows
+
+def _number(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def compare_outputs(old_path: str, new_path: str, tolerance: float = 0.01) -> Dict[str, Any]:
+    """Compare two batch outputs card by card; numbers differ when they are more than `tolerance` apart"""
+    old_rows = read_keyed_rows(old_path)
+    new_rows = read_keyed_rows(new_path)
+
+    changes = []
+    for key in old_rows.keys() & new_rows.keys():
+        old, new = old_rows[key], new_rows[key]
+        for column in NUMERIC_COLUMNS:
+            before, after = _number(old.get(column)), _number(new.get(column))
+            if before is None or after is None:
+                if old.get(column) != new.get(column):
+                    changes.append({"card": key, "column": column, "old": old.get(column), "new": new.get(column)})
+            elif abs(after - before) > tolerance:
+                changes.append({"card": key, "column": column, "old": before, "new": after})
+        for column in TEXT_COLUMNS:
+            if old.get(column) != new.get(column):
+                changes.append({"card": key, "column": column, "old": old.get(column), "new": new.get(column)})
+
+    return {
+        "matched": len(old_rows.keys() & new_rows.keys()),
+        "only_old": sorted(old_rows.keys() - new_rows.keys()),
+        "only_new": sorted(new_rows.keys() - old_rows.keys()),
+        "changes": sorted(changes, key=lambda change: (change["card"], change["column"]))
+    }
+
+def compare_timings(old_path: str, new_path: str) -> Dict[str, Any]:
+    """Compare two --timings files card by card"""
+    old_rows = read_keyed_rows(old_path)
+    new_rows = read_keyed_rows(new_path)
+    cards = []
+    for key in old_rows.keys() & new_rows.keys():
+        before, after = _number(old_rows[key].get('Seconds')), _number(new_rows[key].get('Seconds'))
+        if before is not None and after is not None:
+            cards.append({"card": key, "old": before, "new": after, "change": after - before})
+
+    old_total = sum(card["old"] for card in cards)
+    new_total = sum(card["new"] for card in cards)
+    return {
+        "cards": len(cards),
+        "old_seconds": round(old_total, 3),
+        "new_seconds": round(new_total, 3),
+        "speedup": round(old_total / new_total, 2) if new_total else None,
+        "slowest_regressions": [card for card in sorted(cards, key=lambda card: card["change"], reverse=True)
+                                if card["change"] > 0][:10]
+    }
+
+def _label(key: Tuple[Any, ...]) -> str:
+    label = " ".join(part for part in key[:-1] if part)
+    return label if key[-1] == 1 else f"{label} (#{key[-1]})"
+
+def _print_lines(changes: List[Dict[str, Any]]) -> Iterator[str]:
+    for change in changes:
+        yield f"  {_label(change['card'])}: {change['column']} {change['old']} -> {change['new']}"
+
+def main():
+    """
+    Compare two batch runs (e.g. a recording and its replay against a new build) card by card.
+    """
+    parser = argparse.ArgumentParser(description='Compare the outputs (and optionally timings) of two batch runs')
+    parser.add_argument('old', help='Output file of the baseline run')
+    parser.add_argument('new', help='Output file of the run being checked')
+    parser.add_argument('--old-timings', help='--timings file of the baseline run')
+    parser.add_argument('--new-timings', help='--timings file of the run being checked')
+    parser.add_argument('--tolerance', type=float, default=0.01,
+                        help='Largest difference between numbers treated as equal (default: 0.01)')
+    args = parser.parse_args()
+
+    outputs = compare_outputs(args.old, args.new, args.tolerance)
+    print(f"Cards in both runs: {outputs['matched']}")
+    print(f"Only in {args.old}: {len(outputs['only_old'])}")
+    print(f"Only in {args.new}: {len(outputs['only_new'])}")
+    print(f"Changed values: {len(outputs['changes'])}")
+    for line in _print_lines(outputs['changes']):
+        print(line)
+
+    if args.old_timings and args.new_timings:
+        timings = compare_timings(args.old_timings, args.new_timings)
+        print(f"\nTimed cards: {timings['cards']}")
+        print(f"Total card time: {timings['old_seconds']}s -> {timings['new_seconds']}s (speedup {timings['speedup']}x)")
+        if timings['slowest_regressions']:
+            print("Largest slowdowns:")
+            for card in timings['slowest_regressions']:
+                print(f"  {_label(card['card'])}: {card['old']:.3f}s -> {card['new']:.3f}s")
+
+    # Non-zero exit status when the outputs differ, for use in scripts
+    sys.exit(1 if outputs['changes'] or outputs['only_old'] or outputs['only_new'] else 0)
+
+if __name__ == "__main__":
+    main()
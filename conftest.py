@@ -0,0 +1,48 @@
+import pytest
+import card_pricer
+import ebay_cache
+import sales_store
+
+@pytest.fixture(autouse=True)
+def local_databases(tmp_path, monkeypatch):
+    """Point the search cache and sales history at tmp_path, so no test shares or leaves behind a database"""
+    monkeypatch.setenv("EBAY_CACHE_PATH", str(tmp_path / "ebay_cache.sqlite3"))
+    monkeypatch.setenv("EBAY_SALES_DB", str(tmp_path / "ebay_sales.sqlite3"))
+    # Reload both from the environment on first use
+    monkeypatch.setattr(ebay_cache, "_search_cache", None)
+    monkeypatch.setattr(ebay_cache, "_search_cache_loaded", False)
+    monkeypatch.setattr(sales_store, "_sales_store", None)
+    monkeypatch.setattr(sales_store, "_sales_store_loaded", False)
+
+# Market analysis returned for every card priced by the fake_pricer fixture
+FAKE_MARKET_ANALYSIS = {
+    "market_trend": "neutral", "supply_level": "moderate", "price_trend": "stable",
+    "avg_sale_price": 10.0, "avg_active_price": 10.0,
+    "active_listings_count": 0, "recent_sales_count": 0
+}
+
+class FakePricer:
+    """Stands in for card_pricer.get_card_price: prices every card at $10 and records who was priced"""
+
+    def __init__(self):
+        self.calls = []
+        # Player names whose pricing fails
+        self.failing = set()
+
+    async def __call__(self, brand, set_name, year, condition, player_name, card_number,
+                       card_variation, session=None, trace=False):
+        self.calls.append(player_name)
+        if player_name in self.failing:
+            raise RuntimeError("no data")
+        return {
+            "predicted_price": 10.0, "confidence_score": 0.5,
+            "recent_sales": [], "active_listings": [],
+            "market_analysis": dict(FAKE_MARKET_ANALYSIS)
+        }
+
+@pytest.fixture
+def fake_pricer(monkeypatch):
+    """Replace card_pricer.get_card_price with a FakePricer for batch tests"""
+    pricer = FakePricer()
+    monkeypatch.setattr(card_pricer, "get_card_price", pricer)
+    return pricer
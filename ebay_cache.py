@@ -0,0 +1,213 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from typing import Any, Dict, Optional
+from shared_state import DIR_MODE
+
+# Default time-to-live in seconds for each kind of search.
+# Sold pages only change when new sales close, so they can live much longer
+# than active listings, whose prices and counts move throughout the day.
+DEFAULT_TTLS = {
+    "sold": 12 * 60 * 60,
+    # Incremental searches for sales newer than a card's watermark exist to pick up
+    # fresh sales, so they are only reused briefly
+    "sold_new": 5 * 60,
+    "active": 15 * 60,
+}
+
+def user_cache_dir() -> str:
+    """Per-user directory for the local databases: $XDG_CACHE_HOME/card-pricer, or ~/.cache/card-pricer"""
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "card-pricer")
+
+# Kept out of the working directory, so running from a checkout never leaves databases in it
+DEFAULT_CACHE_PATH = os.path.join(user_cache_dir(), "ebay_cache.sqlite3")
+DEFAULT_MAX_ENTRIES = 50000
+
+# Check the entry count every N writes rather than on every write
+_EVICTION_CHECK_INTERVAL = 100
+
+# ISO 8601 timestamps as used in eBay filter strings (e.g. 2024-01-31T12:34:56.000Z)
+_TIMESTAMP_RE = re.compile(r"(\d{4}-\d{2}-\d{2})T\d{2}:\d{2}:\d{2}(?:\.\d+)?Z?")
+
+def normalize_query(query: str) -> str:
+    """Normalize a search query so equivalent queries share a cache entry"""
+    return " ".join(query.lower().split())
+
+def normalize_filter(filter_string: str) -> str:
+    """Normalize a filter string for use in a cache key.
+
+    Date ranges are rebuilt from the current time on every request, so the
+    time-of-day part of each timestamp is dropped. Otherwise no two sold
+    searches would ever share a key. The TTL bounds how stale an entry can get.
+    """
+    return _TIMESTAMP_RE.sub(r"\1", filter_string or "")
+
+class SearchCache:
+    """SQLite-backed cache of eBay Browse search responses"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH,
+                 ttls: Optional[Dict[str, float]] = None,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._writes_since_check = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), mode=DIR_MODE, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS search_cache ("
+            " cache_key TEXT PRIMARY KEY,"
+            " kind TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_search_cache_last_access ON search_cache (last_access)"
+        )
+
+    @classmethod
+    def from_env(cls) -> Optional["SearchCache"]:
+        """Create a cache from EBAY_CACHE_* environment variables, or None if disabled"""
+        path = os.getenv("EBAY_CACHE_PATH", DEFAULT_CACHE_PATH)
+        if not path or os.getenv("EBAY_CACHE_DISABLED", "").lower() in ("1", "true", "yes"):
+            return None
+        path = os.path.expanduser(path)
+
+        ttls = {}
+        for kind in DEFAULT_TTLS:
+            value = os.getenv(f"EBAY_CACHE_{kind.upper()}_TTL")
+            if value:
+                ttls[kind] = float(value)
+
+        max_entries = int(os.getenv("EBAY_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+        return cls(path, ttls=ttls, max_entries=max_entries)
+
+    @staticmethod
+    def make_key(kind: str, query: str, filter_string: str, marketplace: str, **params: Any) -> str:
+        """Build the cache key for a search request"""
+        parts = [kind, normalize_query(query), normalize_filter(filter_string), marketplace.upper().replace("-", "_")]
+        parts.extend(f"{name}={params[name]}" for name in sorted(params))
+        return "|".join(parts)
+
+    def get(self, kind: str, query: str, filter_string: str, marketplace: str, **params: Any) -> Optional[Dict[str, Any]]:
+        """Return the cached response for a search, or None on a miss or expired entry"""
+        key = self.make_key(kind, query, filter_string, marketplace, **params)
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, expires_at FROM search_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+
+            if row is None or row[1] <= now:
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE search_cache SET last_access = ? WHERE cache_key = ?", (now, key)
+            )
+            self.hits += 1
+
+        return json.loads(row[0])
+
+    def put(self, kind: str, query: str, filter_string: str, marketplace: str,
+            response: Dict[str, Any], **params: Any) -> None:
+        """Store a search response using the TTL configured for its kind"""
+        ttl = self.ttls.get(kind)
+        if not ttl or ttl <= 0:
+            return
+
+        key = self.make_key(kind, query, filter_string, marketplace, **params)
+        now = time.time()
+        payload = json.dumps(response, separators=(",", ":"))
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_cache "
+                "(cache_key, kind, payload, created_at, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, kind, payload, now, now + ttl, now)
+            )
+
+            self._writes_since_check += 1
+            if self._writes_since_check >= _EVICTION_CHECK_INTERVAL:
+                self._writes_since_check = 0
+                self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries, then least recently used ones above max_entries"""
+        cursor = self._conn.execute("DELETE FROM search_cache WHERE expires_at <= ?", (now,))
+        self.evictions += max(cursor.rowcount, 0)
+
+        count = self._conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+        if count > self.max_entries:
+            cursor = self._conn.execute(
+                "DELETE FROM search_cache WHERE cache_key IN ("
+                " SELECT cache_key FROM search_cache ORDER BY last_access ASC LIMIT ?)",
+                (count - self.max_entries,)
+            )
+            self.evictions += max(cursor.rowcount, 0)
+
+    def evict(self) -> None:
+        """Run eviction now instead of waiting for the next check interval"""
+        with self._lock:
+            self._writes_since_check = 0
+            self._evict(time.time())
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current number of entries"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "max_entries": self.max_entries
+        }
+
+    def clear(self) -> None:
+        """Remove every cached response"""
+        with self._lock:
+            self._conn.execute("DELETE FROM search_cache")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+# Lazily created shared cache
+_search_cache = None
+_search_cache_loaded = False
+
+def get_search_cache() -> Optional[SearchCache]:
+    """Return the process-wide search cache configured from the environment"""
+    global _search_cache, _search_cache_loaded
+
+    if not _search_cache_loaded:
+        _search_cache = SearchCache.from_env()
+        _search_cache_loaded = True
+    return _search_cache
+
+def set_search_cache(cache: Optional[SearchCache]) -> None:
+    """Replace the process-wide search cache (None disables caching)"""
+    global _search_cache, _search_cache_loaded
+
+    _search_cache = cache
+    _search_cache_loaded = True
@@ -0,0 +1,135 @@
+import os
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional
+import aiohttp
+from ebay_cache import get_search_cache
+from adaptive_concurrency import current_concurrency
+from ebay_transport import get_transport
+from metrics import CACHE_LOOKUPS, search_kind, stage
+
+logger = logging.getLogger(__name__)
+
+# eBay API host; point it at a mock server (see mock_ebay.py) to run offline
+EBAY_API_BASE = os.getenv("EBAY_API_BASE", "https://api.ebay.com").rstrip("/")
+
+# eBay Browse search and OAuth token endpoints
+EBAY_SEARCH_URL = f"{EBAY_API_BASE}/buy/browse/v1/item_summary/search"
+EBAY_OAUTH_URL = f"{EBAY_API_BASE}/identity/v1/oauth2/token"
+
+# The Browse API returns at most 200 items per page and refuses offsets past 10,000
+MAX_PAGE_SIZE = 200
+MAX_OFFSET = 10000
+
+# How many items to read per card before stopping pagination
+SOLD_MAX_ITEMS = int(os.getenv("EBAY_SOLD_MAX_ITEMS", 1000))
+ACTIVE_MAX_ITEMS = int(os.getenv("EBAY_ACTIVE_MAX_ITEMS", 200))
+
+class EbaySearchError(Exception):
+    """Raised when an item_summary/search call fails or returns an unexpected payload"""
+
+    def __init__(self, message: str, status: Optional[int] = None, body: Optional[str] = None):
+        super().__init__(message)
+        self.status = status
+        self.body = body
+
+async def fetch_search_page(session: aiohttp.ClientSession, headers: Dict[str, str], kind: str,
+                            params: Dict[str, Any], rate_limiter) -> Dict[str, Any]:
+    """Fetch one page of search results, serving repeats from the search cache"""
+    marketplace = headers["X-EBAY-C-MARKETPLACE-ID"]
+    extra_params = {k: v for k, v in params.items() if k not in ("q", "filter")}
+    transport = get_transport()
+    cache = get_search_cache() if transport.use_cache else None
+
+    if cache is not None:
+        cached = cache.get(kind, params["q"], params.get("filter", ""), marketplace, **extra_params)
+        CACHE_LOOKUPS.inc(kind=search_kind(kind), result="miss" if cached is None else "hit")
+        if cached is not None:
+            logger.debug("Cache hit for %s search: %s (offset %s)", kind, params["q"], params.get("offset", 0))
+            return cached
+
+    # Apply rate limiting only when we actually call eBay
+    await rate_limiter.acquire()
+
+    with stage(f"{search_kind(kind)}_fetch"):
+        response = await transport.request(session, "GET", EBAY_SEARCH_URL, headers=headers, params=params)
+    
+    # Let an adaptive batch run size its concurrency from eBay's status and latency
+    concurrency = current_concurrency()
+    if concurrency is not None:
+        concurrency.observe(response.status, response.elapsed)
+    if response.status != 200:
+        raise EbaySearchError(
+            f"eBay API call failed with status {response.status}",
+            status=response.status,
+            body=response.body
+        )
+
+    try:
+        with stage("json_decode"):
+            data = response.json()
+    except ValueError:
+        raise EbaySearchError("Invalid JSON in eBay API response", body=response.body)
+
+    if not isinstance(data, dict):
+        raise EbaySearchError("Invalid response format from eBay API", body=str(data))
+
+    if cache is not None:
+        cache.put(kind, params["q"], params.get("filter", ""), marketplace, data, **extra_params)
+
+    return data
+
+async def iter_search_pages(session: aiohttp.ClientSession, headers: Dict[str, str], kind: str,
+                            params: Dict[str, Any], rate_limiter,
+                            max_items: Optional[int] = None,
+                            page_size: int = MAX_PAGE_SIZE,
+                            prefetch: bool = True) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Yield search results page by page, following the Browse API's offset pagination.
+
+    Only the current page and (with prefetch) the request for the next one are
+    held at a time, so memory stays flat however many pages a card has. The
+    next page is requested before the current one is handed to the caller,
+    which overlaps its round trip with the caller's filtering.
+    """
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    yielded = 0
+
+    def start_page(offset: int) -> asyncio.Task:
+        page_params = dict(params, limit=page_size, offset=offset)
+        return asyncio.ensure_future(fetch_search_page(session, headers, kind, page_params, rate_limiter))
+
+    offset = 0
+    next_page = start_page(offset)
+    try:
+        while next_page is not None:
+            page = await next_page
+            next_page = None
+
+            items = page.get("itemSummaries", [])
+            if not isinstance(items, list):
+                raise EbaySearchError("Invalid itemSummaries format in eBay API response", body=str(items))
+
+            if max_items is not None:
+                items = items[:max_items - yielded]
+            yielded += len(items)
+            offset += page_size
+
+            has_more = (
+                bool(page.get("next"))
+                and bool(items)
+                and offset < min(page.get("total", MAX_OFFSET), MAX_OFFSET)
+                and (max_items is None or yielded < max_items)
+            )
+
+            if has_more and prefetch:
+                next_page = start_page(offset)
+
+            yield items
+
+            if has_more and not prefetch:
+                next_page = start_page(offset)
+    finally:
+        if next_page is not None:
+            next_page.cancel()
+            # Retrieve the outcome so an abandoned prefetch never logs "exception was never retrieved"
+            next_page.add_done_callback(lambda task: task.cancelled() or task.exception())
@@ -0,0 +1,215 @@
+import os
+import re
+import json
+import time
+import atexit
+import asyncio
+import logging
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional
+from urllib.parse import urlsplit
+import aiohttp
+from ebay_cache import normalize_query
+from metrics import EBAY_IN_FLIGHT, EBAY_RESPONSES
+from output_writers import open_text
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_VERSION = 1
+
+OAUTH_TOKEN_PATH = "/identity/v1/oauth2/token"
+
+# Response headers never written to a cassette
+_SKIPPED_HEADERS = {"set-cookie", "authorization", "date", "content-length", "content-encoding", "transfer-encoding"}
+
+# Any ISO 8601 timestamp; sold date ranges are rebuilt from the clock on every run
+_TIMESTAMP_RE = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?Z?")
+
+class TransportResponse:
+    """Status, headers, body and timing of one eBay API response"""
+
+    def __init__(self, status: int, headers: Dict[str, str], body: str, elapsed: float):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.elapsed = elapsed
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+def request_key(method: str, url: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """Identity of a request for replay: host-independent, with timestamps and query spacing normalized"""
+    normalized = {}
+    for name, value in (params or {}).items():
+        value = str(value)
+        if name == "q":
+            value = normalize_query(value)
+        elif name == "filter":
+            value = _TIMESTAMP_RE.sub("*", value)
+        normalized[name] = value
+    return json.dumps([method.upper(), urlsplit(url).path, normalized], sort_keys=True)
+
+class HttpTransport:
+    """Sends requests to eBay over the caller's aiohttp session"""
+
+    # Whether responses may be served from (and stored in) the search cache
+    use_cache = True
+
+    async def request(self, session: aiohttp.ClientSession, method: str, url: str,
+                      headers: Optional[Dict[str, str]] = None, params: Optional[Dict[str, Any]] = None,
+                      data: Optional[Dict[str, Any]] = None) -> TransportResponse:
+        # Same API family names as the rate limiter's buckets
+        api = "identity" if urlsplit(url).path.endswith(OAUTH_TOKEN_PATH) else "browse"
+        start = time.perf_counter()
+        with EBAY_IN_FLIGHT.track(api=api):
+            try:
+                async with session.request(method, url, headers=headers, params=params, data=data) as response:
+                    body = await response.text()
+            except aiohttp.ClientError:
+                EBAY_RESPONSES.inc(api=api, status="error")
+                raise
+        EBAY_RESPONSES.inc(api=api, status=str(response.status))
+        return TransportResponse(response.status, dict(response.headers), body, time.perf_counter() - start)
+
+    def close(self) -> None:
+        pass
+
+class RecordingTransport(HttpTransport):
+    """Sends requests to eBay and appends every response to a cassette file.
+
+    Cassettes are NDJSON, one response per line, compressed when the file
+    name ends in .gz or .zst. OAuth tokens are redacted before writing.
+    """
+
+    # Record what eBay actually returns, not what an earlier run cached
+    use_cache = False
+
+    def __init__(self, path: str, inner: Optional[HttpTransport] = None):
+        self.path = path
+        self.inner = inner or HttpTransport()
+        self.recorded = 0
+        self._started = time.time()
+        self._file = open_text(path, "w")
+        self._file.write(json.dumps({"cassette": CASSETTE_VERSION, "recorded_at": self._started}) + "\n")
+        # Close on exit so a compressed cassette is never left without its end marker
+        atexit.register(self.close)
+
+    async def request(self, session, method, url, headers=None, params=None, data=None):
+        started = time.time()
+        response = await self.inner.request(session, method, url, headers=headers, params=params, data=data)
+        if self._file is not None:
+            self._file.write(json.dumps({
+                "key": request_key(method, url, params),
+                "offset": round(started - self._started, 4),
+                "elapsed": round(response.elapsed, 4),
+                "status": response.status,
+                "headers": {name: value for name, value in response.headers.items() if name.lower() not in _SKIPPED_HEADERS},
+                "body": _redact(response.body)
+            }) + "\n")
+            self._file.flush()
+            self.recorded += 1
+        return response
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+class ReplayTransport(HttpTransport):
+    """Serves responses from a cassette instead of the network.
+
+    Repeated requests get the recorded responses in order, and the last one
+    again once they run out. time_scale=1 waits as long as each recorded
+    response took, 0.5 half as long, and 0 (the default) not at all.
+    """
+
+    use_cache = False
+
+    def __init__(self, path: str, time_scale: float = 0.0):
+        self.path = path
+        self.time_scale = time_scale
+        self.replayed = 0
+        self.missing = 0
+        self._responses: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        for entry in read_cassette(path):
+            self._responses[entry["key"]].append(entry)
+
+    async def request(self, session, method, url, headers=None, params=None, data=None):
+        key = request_key(method, url, params)
+        recorded = self._responses.get(key)
+        if not recorded and urlsplit(url).path.endswith(OAUTH_TOKEN_PATH):
+            # Recordings redact tokens anyway, and a run that reused a cached token recorded none
+            return TransportResponse(200, {}, json.dumps({"access_token": "replayed-token", "expires_in": 7200}), 0.0)
+        if not recorded:
+            self.missing += 1
+            logger.warning("No recorded response for %s %s %s", method, urlsplit(url).path, params)
+            body = json.dumps({"errors": [{"message": "Request not found in cassette"}]})
+            return TransportResponse(599, {}, body, 0.0)
+
+        entry = recorded.popleft() if len(recorded) > 1 else recorded[0]
+        if self.time_scale > 0 and entry["elapsed"] > 0:
+            await asyncio.sleep(entry["elapsed"] * self.time_scale)
+        self.replayed += 1
+        return TransportResponse(entry["status"], entry["headers"], entry["body"], entry["elapsed"])
+
+def read_cassette(path: str) -> List[Dict[str, Any]]:
+    """Read a cassette's recorded responses, ignoring a torn final line from an interrupted recording"""
+    entries = []
+    try:
+        with open_text(path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                if "key" in entry:
+                    entries.append(entry)
+    except (EOFError, OSError) as e:
+        # A compressed cassette whose recording was killed before it was closed
+        if not entries:
+            raise
+        logger.warning("Cassette %s ends early (%s); using the %d responses before that", path, e, len(entries))
+    return entries
+
+def _redact(body: str) -> str:
+    if '"access_token"' not in body:
+        return body
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return body
+    data["access_token"] = "recorded-token"
+    return json.dumps(data)
+
+def transport_from_env() -> HttpTransport:
+    """Transport selected by EBAY_TRANSPORT (http, record or replay) and EBAY_CASSETTE"""
+    mode = os.getenv("EBAY_TRANSPORT", "http").lower()
+    if mode == "http":
+        return HttpTransport()
+    path = os.getenv("EBAY_CASSETTE")
+    if not path:
+        raise ValueError(f"EBAY_TRANSPORT={mode} needs EBAY_CASSETTE set to a cassette file")
+    if mode == "record":
+        return RecordingTransport(path)
+    if mode == "replay":
+        return ReplayTransport(path, time_scale=float(os.getenv("EBAY_REPLAY_TIME_SCALE", 0)))
+    raise ValueError(f"Unknown EBAY_TRANSPORT '{mode}'; expected http, record or replay")
+
+# Lazily created shared transport
+_transport: Optional[HttpTransport] = None
+
+def get_transport() -> HttpTransport:
+    """Return the process-wide transport used for eBay API calls"""
+    global _transport
+
+    if _transport is None:
+        _transport = transport_from_env()
+    return _transport
+
+def set_transport(transport: Optional[HttpTransport]) -> None:
+    """Replace the process-wide transport (None re-reads the environment on next use)"""
+    global _transport
+
+    if _transport is not None and _transport is not transport:
+        _transport.close()
+    _transport = transport
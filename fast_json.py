@@ -0,0 +1,57 @@
+import gzip
+import json
+from typing import Any, Dict, Optional
+from fastapi import Response
+
+# Optional dependency: orjson serializes several times faster than the json module
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Bodies smaller than this are sent uncompressed; gzip would save little and cost CPU
+GZIP_MIN_SIZE = 1000
+
+def _default(value: Any) -> Any:
+    # NumPy scalars from the pricing math
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(value: Any) -> bytes:
+    """Serialize to compact JSON bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(value, default=_default, separators=(",", ":")).encode("utf-8")
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Whether an Accept-Encoding header allows gzip, honouring q-values ("gzip;q=0" refuses it)"""
+    wildcard = None
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip()
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding == "gzip":
+            return quality > 0
+        if coding == "*":
+            wildcard = quality > 0
+    # "*" covers gzip only when gzip is not listed itself
+    return bool(wildcard)
+
+def json_response(content: Any, accept_encoding: str = "", headers: Optional[Dict[str, str]] = None) -> Response:
+    """Build a JSON response, gzip-compressed when the client accepts it and the body is large"""
+    body = dumps(content)
+    headers = dict(headers or {})
+    # Sent on every negotiated response, compressed or not, so caches keep the two apart
+    headers["Vary"] = "Accept-Encoding"
+    if len(body) >= GZIP_MIN_SIZE and accepts_gzip(accept_encoding):
+        body = gzip.compress(body, compresslevel=5)
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,67 @@
+import time
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+# Number of filter decisions kept per card
+DEFAULT_TRACE_SIZE = 1000
+
+class FilterTrace:
+    """Ring buffer of filter decisions made while pricing one card"""
+
+    def __init__(self, card: str, maxlen: int = DEFAULT_TRACE_SIZE):
+        self.card = card
+        self.decisions = deque(maxlen=maxlen)
+        self.dropped = 0
+
+    def record(self, stage: str, decision: str, title: str = "", price: Any = None, reason: str = "") -> None:
+        """Record one decision; formatting is deferred until the trace is dumped"""
+        if len(self.decisions) == self.decisions.maxlen:
+            self.dropped += 1
+        self.decisions.append((time.time(), stage, decision, title, price, reason))
+
+    def dump(self) -> Dict[str, Any]:
+        """Return the recorded decisions as plain dicts"""
+        return {
+            "card": self.card,
+            "dropped": self.dropped,
+            "decisions": [
+                {
+                    "time": timestamp,
+                    "stage": stage,
+                    "decision": decision,
+                    "title": title,
+                    "price": price,
+                    "reason": reason
+                }
+                for timestamp, stage, decision, title, price, reason in self.decisions
+            ]
+        }
+
+    def format(self) -> str:
+        """Render the trace as human-readable lines"""
+        lines: List[str] = [f"Filter trace for {self.card}:"]
+        if self.dropped:
+            lines.append(f"  ({self.dropped} earlier decisions dropped)")
+        for _, stage, decision, title, price, reason in self.decisions:
+            price_text = f" - ${price}" if price is not None else ""
+            reason_text = f" ({reason})" if reason else ""
+            lines.append(f"  [{stage}] {decision.upper()}: {title}{price_text}{reason_text}")
+        return "\n".join(lines)
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("filter_trace", default=None)
+
+def current_trace() -> Optional[FilterTrace]:
+    """Return the trace for the card being priced in this task, if tracing is on"""
+    return _current_trace.get()
+
+@contextmanager
+def tracing(card: str, maxlen: int = DEFAULT_TRACE_SIZE) -> Iterator[FilterTrace]:
+    """Record filter decisions for one card in this task and the tasks it starts"""
+    trace = FilterTrace(card, maxlen)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
@@ -0,0 +1,118 @@
+import os
+from typing import Any, Dict, Optional
+import aiohttp
+
+# Connection pool defaults
+DEFAULT_LIMIT = 100
+DEFAULT_LIMIT_PER_HOST = 20
+DEFAULT_KEEPALIVE_TIMEOUT = 30
+DEFAULT_DNS_TTL = 300
+
+class PoolStats:
+    """Counters for connection reuse, collected through aiohttp tracing"""
+
+    def __init__(self):
+        self.requests = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.dns_cache_hits = 0
+        self.dns_cache_misses = 0
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, context, params):
+            self.requests += 1
+
+        async def on_connection_create_end(session, context, params):
+            self.connections_created += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            self.connections_reused += 1
+
+        async def on_dns_cache_hit(session, context, params):
+            self.dns_cache_hits += 1
+
+        async def on_dns_cache_miss(session, context, params):
+            self.dns_cache_misses += 1
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_dns_cache_hit.append(on_dns_cache_hit)
+        trace_config.on_dns_cache_miss.append(on_dns_cache_miss)
+        return trace_config
+
+    def as_dict(self) -> Dict[str, Any]:
+        connections = self.connections_created + self.connections_reused
+        return {
+            "requests": self.requests,
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+            "reuse_rate": round(self.connections_reused / connections, 4) if connections else 0.0,
+            "dns_cache_hits": self.dns_cache_hits,
+            "dns_cache_misses": self.dns_cache_misses
+        }
+
+class HttpPool:
+    """A single pooled aiohttp session shared by every eBay call"""
+
+    def __init__(self, limit: int = DEFAULT_LIMIT,
+                 limit_per_host: int = DEFAULT_LIMIT_PER_HOST,
+                 keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT,
+                 dns_ttl: int = DEFAULT_DNS_TTL):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_ttl = dns_ttl
+        self.stats = PoolStats()
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @classmethod
+    def from_env(cls) -> "HttpPool":
+        """Create a pool from EBAY_HTTP_* environment variables"""
+        return cls(
+            limit=int(os.getenv("EBAY_HTTP_LIMIT", DEFAULT_LIMIT)),
+            limit_per_host=int(os.getenv("EBAY_HTTP_LIMIT_PER_HOST", DEFAULT_LIMIT_PER_HOST)),
+            keepalive_timeout=float(os.getenv("EBAY_HTTP_KEEPALIVE_TIMEOUT", DEFAULT_KEEPALIVE_TIMEOUT)),
+            dns_ttl=int(os.getenv("EBAY_HTTP_DNS_TTL", DEFAULT_DNS_TTL))
+        )
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """Return the shared session, creating it on first use"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_ttl,
+                use_dns_cache=True
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                trace_configs=[self.stats.trace_config()]
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self) -> aiohttp.ClientSession:
+        return self.get_session()
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    def stats_dict(self) -> Dict[str, Any]:
+        """Return pool configuration and connection reuse counters"""
+        stats = {
+            "limit": self.limit,
+            "limit_per_host": self.limit_per_host,
+            "keepalive_timeout": self.keepalive_timeout,
+            "dns_ttl": self.dns_ttl,
+            "open": self._session is not None and not self._session.closed
+        }
+        stats.update(self.stats.as_dict())
+        return stats
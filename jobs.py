@@ -0,0 +1,216 @@
+import time
+import uuid
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Jobs that can still change state
+ACTIVE_STATUSES = ("queued", "running")
+
+# Finished jobs kept for status polling
+DEFAULT_MAX_FINISHED_JOBS = 100
+
+# Events buffered per progress subscriber; a subscriber that falls further behind misses card events
+EVENT_QUEUE_SIZE = 1000
+
+class BatchJob:
+    """State and progress counters for one background batch pricing job"""
+
+    def __init__(self, job_id: str, params: Dict[str, Any]):
+        self.id = job_id
+        self.params = params
+        self.status = "queued"
+        self.total: Optional[int] = None
+        self.successful = 0
+        self.failed = 0
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self.dropped_events = 0
+        self._subscribers: List[asyncio.Queue] = []
+        self._wait_clock: Optional[Callable[[], float]] = None
+        self._wait_start = 0.0
+        self._concurrency: Optional[Callable[[], Dict[str, Any]]] = None
+        self._quota: Optional[Callable[[], Optional[int]]] = None
+
+    def record(self, success: bool, card: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+        """Count one finished card and tell progress subscribers about it"""
+        if success:
+            self.successful += 1
+        else:
+            self.failed += 1
+        if self._subscribers:
+            self.publish("card", {
+                "success": success,
+                "card": card,
+                "error": error,
+                "done": self.successful + self.failed,
+                "failed": self.failed
+            })
+
+    def track_wait(self, clock: Callable[[], float]) -> None:
+        """Report rate limiter waiting as the growth of clock() (total seconds waited) from now on"""
+        self._wait_clock = clock
+        self._wait_start = clock()
+
+    def track_quota(self, remaining: Callable[[], Optional[int]]) -> None:
+        """Report the eBay calls left in the daily quota, from remaining(), in progress snapshots"""
+        self._quota = remaining
+
+    def track_concurrency(self, stats: Callable[[], Dict[str, Any]]) -> None:
+        """Report an adaptive concurrency limit's state, from stats(), in progress snapshots"""
+        self._concurrency = stats
+
+    def subscribe(self) -> asyncio.Queue:
+        """Return a queue that receives this job's (event, data) pairs"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+        self._subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+
+    def publish(self, event: str, data: Dict[str, Any]) -> None:
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait((event, data))
+            except asyncio.QueueFull:
+                # Never block pricing on a slow reader; progress snapshots still carry the totals
+                self.dropped_events += 1
+
+    def progress(self) -> Dict[str, Any]:
+        """Snapshot of the job's progress, throughput and estimated time left"""
+        done = self.successful + self.failed
+        remaining = None if self.total is None else max(0, self.total - done)
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+
+        throughput = done / elapsed if elapsed else 0.0
+        rate_limit_wait = None
+        if self._wait_clock is not None:
+            rate_limit_wait = round(self._wait_clock() - self._wait_start, 3)
+        eta_seconds = None
+        if self.status == "running" and remaining is not None and throughput > 0:
+            eta_seconds = round(remaining / throughput, 1)
+
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "params": self.params,
+            "total": self.total,
+            "done": done,
+            "successful": self.successful,
+            "failed": self.failed,
+            "remaining": remaining,
+            "percent_complete": round(100.0 * done / self.total, 1) if self.total else None,
+            "throughput_per_second": round(throughput, 3),
+            "elapsed_seconds": round(elapsed, 1) if elapsed is not None else None,
+            "eta_seconds": eta_seconds,
+            "rate_limit_wait_seconds": rate_limit_wait,
+            "remaining_quota": self._quota() if self._quota is not None else None,
+            "concurrency": self._concurrency() if self._concurrency is not None else None,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+            "result": self.result
+        }
+
+class JobManager:
+    """Runs batch jobs as tasks on the server's own event loop, a few at a time"""
+
+    def __init__(self, max_running: int = 1, max_finished: int = DEFAULT_MAX_FINISHED_JOBS):
+        self.max_running = max(1, max_running)
+        self.max_finished = max_finished
+        self.jobs: Dict[str, BatchJob] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def submit(self, run: Callable[[BatchJob], Awaitable[Dict[str, Any]]], params: Dict[str, Any]) -> BatchJob:
+        """Start a job in the background and return it immediately; must be called from the event loop"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_running)
+        job = BatchJob(uuid.uuid4().hex, params)
+        self.jobs[job.id] = job
+        job.task = asyncio.ensure_future(self._run(job, run))
+        self._forget_finished()
+        return job
+
+    async def _run(self, job: BatchJob, run: Callable[[BatchJob], Awaitable[Dict[str, Any]]]) -> None:
+        try:
+            async with self._slots:
+                job.status = "running"
+                job.started_at = time.time()
+                job.result = await run(job)
+                job.status = "completed"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+        except Exception as e:
+            logger.exception("Batch job %s failed", job.id)
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            job.publish("end", job.progress())
+
+    def get(self, job_id: str) -> Optional[BatchJob]:
+        return self.jobs.get(job_id)
+
+    def list(self) -> List[BatchJob]:
+        return sorted(self.jobs.values(), key=lambda job: job.submitted_at)
+
+    def cancel(self, job_id: str) -> Optional[BatchJob]:
+        """Cancel a queued or running job; finished jobs are left as they are"""
+        job = self.jobs.get(job_id)
+        if job is not None and job.status in ACTIVE_STATUSES and job.task is not None:
+            job.task.cancel()
+        return job
+
+    async def shutdown(self) -> None:
+        """Cancel every unfinished job and wait for them to stop"""
+        tasks = [job.task for job in self.jobs.values() if job.task is not None and not job.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _forget_finished(self) -> None:
+        finished = [job for job in self.list() if job.status not in ACTIVE_STATUSES]
+        for job in finished[:max(0, len(finished) - self.max_finished)]:
+            del self.jobs[job.id]
+
+async def job_events(job: BatchJob, interval: float = 1.0) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """Yield a job's events as (event, data): each finished card, a progress snapshot
+    every `interval` seconds, and a final "end" snapshot when the job stops"""
+    queue = job.subscribe()
+    getter: Optional[asyncio.Future] = None
+    try:
+        yield "progress", job.progress()
+        while job.status in ACTIVE_STATUSES:
+            # Keep one pending get across timeouts so no event is lost to a cancelled get
+            if getter is None:
+                getter = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait([getter], timeout=interval)
+            if not done:
+                yield "progress", job.progress()
+                continue
+            event, data = getter.result()
+            getter = None
+            yield event, data
+            if event == "end":
+                return
+        while not queue.empty():
+            event, data = queue.get_nowait()
+            yield event, data
+            if event == "end":
+                return
+        yield "end", job.progress()
+    finally:
+        if getter is not None:
+            getter.cancel()
+        job.unsubscribe(queue)
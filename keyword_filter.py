@@ -0,0 +1,101 @@
+import re
+import logging
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from filter_trace import current_trace
+from metrics import ITEMS_FILTERED, stage
+
+logger = logging.getLogger(__name__)
+
+# Keywords that mark a listing as something other than a single, genuine card
+EXCLUDED_KEYWORDS = [
+    "lot",
+    "complete your set",
+    "you pick",
+    "u pick",
+    "pick your",
+    "complete set",
+    "bulk",
+    "pick a card",
+    "pick your card",
+    "reprint",
+    "proxy",
+    "custom",
+    # Not an inflection _keyword_pattern adds, but as much a custom card as "custom"
+    "customized",
+    "customised"
+]
+
+def _keyword_pattern(keyword: str) -> str:
+    """Regex for one keyword: any spacing between words, and plurals or -ed/-ing forms of the last word"""
+    *words, last = keyword.split()
+    if last.endswith("y"):
+        last = re.escape(last[:-1]) + "(?:y|ies)"
+    else:
+        last = re.escape(last) + "(?:s|es|ed|ing)?"
+    return r"\s+".join([re.escape(word) for word in words] + [last])
+
+class KeywordMatcher:
+    """Matches titles against a keyword list with one compiled, word-bounded regex"""
+
+    def __init__(self, keywords: Iterable[str]):
+        # Normalize keywords the same way matched text is normalized below
+        self.keywords = tuple(dict.fromkeys(" ".join(kw.lower().split()) for kw in keywords if kw.strip()))
+        # Longest first, so "pick your card" is reported rather than "pick your"
+        self._ordered = sorted(self.keywords, key=len, reverse=True)
+        # One group per keyword, so a match reports the keyword rather than the inflected text
+        alternation = "|".join(f"({_keyword_pattern(kw)})" for kw in self._ordered)
+        # Word boundaries keep "lot" from matching "slot" or "Lotus" while still catching "lots"
+        self._pattern = re.compile(rf"\b(?:{alternation})\b", re.IGNORECASE) if self.keywords else None
+
+    def match(self, title: str) -> Optional[str]:
+        """Return the keyword found in the title, or None"""
+        if self._pattern is None or not title:
+            return None
+        found = self._pattern.search(title)
+        if found is None:
+            return None
+        return self._ordered[found.lastindex - 1]
+
+    def split(self, items: Sequence[Dict[str, Any]], title_key: str = "title") -> Tuple[List[Dict[str, Any]], List[Tuple[Dict[str, Any], str]]]:
+        """Split items into kept items and (item, matched keyword) rejections in one pass"""
+        kept = []
+        rejected = []
+        match = self.match
+        for item in items:
+            keyword = match(item.get(title_key, ""))
+            if keyword is None:
+                kept.append(item)
+            else:
+                rejected.append((item, keyword))
+        return kept, rejected
+
+@lru_cache(maxsize=32)
+def _cached_matcher(keywords: Tuple[str, ...]) -> KeywordMatcher:
+    return KeywordMatcher(keywords)
+
+def get_matcher(keywords: Optional[Iterable[str]] = None) -> KeywordMatcher:
+    """Return a compiled matcher for the keywords, reusing one built earlier for the same list"""
+    return _cached_matcher(tuple(EXCLUDED_KEYWORDS if keywords is None else keywords))
+
+def filter_by_keywords(items: List[Dict[str, Any]], keywords: Optional[Iterable[str]] = None,
+                       title_key: str = "title") -> List[Dict[str, Any]]:
+    """Drop items whose titles contain an excluded keyword, logging and tracing each rejection"""
+    if not items:
+        return items
+
+    with stage("keyword_filter"):
+        kept, rejected = get_matcher(keywords).split(items, title_key)
+    if rejected:
+        ITEMS_FILTERED.inc(len(rejected), reason="keyword")
+
+    if rejected:
+        trace = current_trace()
+        if trace is not None or logger.isEnabledFor(logging.DEBUG):
+            for item, keyword in rejected:
+                logger.debug("  EXCLUDED: %s - $%s (keyword: %s)", item.get(title_key, ""), item.get("price", 0), keyword)
+                if trace is not None:
+                    trace.record("keyword", "rejected", item.get(title_key, ""), item.get("price", 0), keyword)
+
+    logger.debug("Filtered out %d of %d items by title keyword", len(rejected), len(items))
+    return kept
@@ -1,9 +1,12 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from contextlib import asynccontextmanager
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Callable, List, Optional, Tuple
 import requests
 import os
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import numpy as np
 from dotenv import load_dotenv
 import csv
@@ -12,30 +15,52 @@ import time
 from asyncio import Semaphore
 import aiohttp
 import base64
+import hmac
+import json
+import logging
+from ebay_cache import get_search_cache, normalize_query
+from ebay_transport import get_transport
+from ebay_search import iter_search_pages, EbaySearchError, EBAY_OAUTH_URL, SOLD_MAX_ITEMS, ACTIVE_MAX_ITEMS
+from http_pool import HttpPool
+from rate_limiter import RateLimiter
+from singleflight import SingleFlight
+from price_index import PriceIndex
+from fast_json import json_response
+from jobs import JobManager, job_events
+from sales_store import SoldRefresh, api_sales_scope, get_sales_store, history_days
+from filter_trace import current_trace, tracing
+from adaptive_concurrency import AdaptiveConcurrency, parse_range
+from batch_pipeline import run_pipeline
+from output_writers import create_writer, open_text, supports_append
+from keyword_filter import EXCLUDED_KEYWORDS, filter_by_keywords
+import metrics
+from metrics import ITEMS_FILTERED, PRICE_INDEX_LOOKUPS, pricing_card, stage
+from profiling import ProfileBusyError, async_profiling
 
 # Load environment variables
 load_dotenv()
 
-app = FastAPI(title="eBay Card Pricer API")
+logger = logging.getLogger(__name__)
+
+# Shared, pooled HTTP session for all eBay calls
+http_pool = HttpPool.from_env()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the pooled session up front and close it on shutdown
+    http_pool.get_session()
+    yield
+    await batch_jobs.shutdown()
+    await price_index.shutdown()
+    await http_pool.close()
+
+app = FastAPI(title="eBay Card Pricer API", lifespan=lifespan)
 
 # eBay API credentials
 EBAY_APP_ID = os.getenv("EBAY_APP_ID")
 EBAY_CERT_ID = os.getenv("EBAY_CERT_ID")
 EBAY_DEV_ID = os.getenv("EBAY_DEV_ID")
 
-# Keywords to exclude from listings
-EXCLUDED_KEYWORDS = [
-    "lot",
-    "complete your set",
-    "you pick",
-    "u pick",
-    "pick your",
-    "complete set",
-    "bulk",
-    "pick a card",
-    "pick your card"
-]
-
 class Sale(BaseModel):
     sale_date: str
     price: float
@@ -53,6 +78,15 @@ class CardPriceResponse(BaseModel):
     active_listings: List[ActiveListing]
     market_analysis: dict
 
+class CardSpec(BaseModel):
+    brand: str
+    set_name: str
+    year: str
+    condition: Optional[str] = None
+    player_name: Optional[str] = None
+    card_number: Optional[str] = None
+    card_variation: Optional[str] = None
+
 class GoogleSheetsResponse(BaseModel):
     success: bool
     message: str
@@ -82,44 +116,33 @@ async def get_ebay_oauth_token():
         auth_bytes = auth_string.encode('ascii')
         base64_auth = base64.b64encode(auth_bytes).decode('ascii')
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                "https://api.ebay.com/identity/v1/oauth2/token",
-                headers={
-                    "Content-Type": "application/x-www-form-urlencoded",
-                    "Authorization": f"Basic {base64_auth}"
-                },
-                data={
-                    "grant_type": "client_credentials",
-                    "scope": "https://api.ebay.com/oauth/api_scope"
-                }
-            ) as response:
-                if response.status != 200:
-                    raise HTTPException(status_code=500, detail="Failed to get eBay OAuth token")
-                
-                response_data = await response.json()
-                _oauth_token = response_data["access_token"]
-                # Set token expiry to 1 hour before actual expiry to be safe
-                _token_expiry = datetime.now() + timedelta(seconds=response_data["expires_in"] - 3600)
-                return _oauth_token
-
-# Add rate limiter class
-class RateLimiter:
-    def __init__(self, calls_per_second):
-        self.calls_per_second = calls_per_second
-        self.last_call = 0
-        self.lock = asyncio.Lock()
-    
-    async def acquire(self):
-        async with self.lock:
-            now = time.time()
-            time_since_last_call = now - self.last_call
-            if time_since_last_call < 1.0 / self.calls_per_second:
-                await asyncio.sleep(1.0 / self.calls_per_second - time_since_last_call)
-            self.last_call = time.time()
-
-# Create global rate limiter
-rate_limiter = RateLimiter(calls_per_second=2)
+        await rate_limiter.acquire("identity")
+        
+        session = http_pool.get_session()
+        response = await get_transport().request(
+            session,
+            "POST",
+            EBAY_OAUTH_URL,
+            headers={
+                "Content-Type": "application/x-www-form-urlencoded",
+                "Authorization": f"Basic {base64_auth}"
+            },
+            data={
+                "grant_type": "client_credentials",
+                "scope": "https://api.ebay.com/oauth/api_scope"
+            }
+        )
+        if response.status != 200:
+            raise HTTPException(status_code=500, detail="Failed to get eBay OAuth token")
+        
+        response_data = response.json()
+        _oauth_token = response_data["access_token"]
+        # Set token expiry to 1 hour before actual expiry to be safe
+        _token_expiry = datetime.now() + timedelta(seconds=response_data["expires_in"] - 3600)
+        return _oauth_token
+
+# Create global rate limiter (token bucket per eBay API family)
+rate_limiter = RateLimiter.from_env()
 
 def build_search_query(brand: str, set_name: str, year: str, 
                       player_name: Optional[str] = None,
@@ -246,7 +269,11 @@ def filter_price_outliers(items: List[dict], price_key: str = "price") -> List[d
     """Filter out extreme price outliers using the IQR method"""
     if not items or len(items) < 4:  # Need at least 4 items for meaningful outlier detection
         return items
-    
+    with stage("outlier_filter"):
+        return _filter_price_outliers(items, price_key)
+
+def _filter_price_outliers(items: List[dict], price_key: str) -> List[dict]:
+    """IQR filtering for filter_price_outliers, timed as the outlier_filter stage"""
     # Extract prices
     prices = [item[price_key] for item in items]
     
@@ -269,12 +296,20 @@ def filter_price_outliers(items: List[dict], price_key: str = "price") -> List[d
         upper_bound = q3 + (2.5 * iqr)
         filtered_items = [item for item in items if lower_bound <= item[price_key] <= upper_bound]
     
-    # Print debug information about filtered items
-    print(f"\nFiltered out {len(items) - len(filtered_items)} price outliers")
-    print(f"Price bounds: ${lower_bound:.2f} - ${upper_bound:.2f}")
-    for item in items:
-        if item[price_key] < lower_bound or item[price_key] > upper_bound:
-            print(f"  EXCLUDED: {item.get('title', '')} - ${item[price_key]}")
+    excluded = len(items) - len(filtered_items)
+    if excluded:
+        ITEMS_FILTERED.inc(excluded, reason="outlier")
+    logger.debug("Filtered out %d price outliers (bounds $%.2f - $%.2f)", excluded, lower_bound, upper_bound)
+    
+    # Only walk the excluded items again when someone will see them
+    trace = current_trace()
+    if excluded and (trace is not None or logger.isEnabledFor(logging.DEBUG)):
+        for item in items:
+            if item[price_key] < lower_bound or item[price_key] > upper_bound:
+                logger.debug("  EXCLUDED: %s - $%s", item.get('title', ''), item[price_key])
+                if trace is not None:
+                    trace.record("outlier", "rejected", item.get('title', ''), item[price_key],
+                                 f"outside ${lower_bound:.2f} - ${upper_bound:.2f}")
     
     return filtered_items
 
@@ -283,22 +318,205 @@ def filter_by_title_keywords(items: List[dict], title_key: str = "title", exclud
     if not items or not exclude_keywords:
         return items
     
-    # Convert keywords to lowercase for case-insensitive matching
-    exclude_keywords = [kw.lower() for kw in exclude_keywords]
+    # One compiled, word-bounded pass; rejections are logged and traced with the keyword that matched
+    return filter_by_keywords(items, exclude_keywords, title_key)
+
+async def search_ebay_pages(session: aiohttp.ClientSession, headers: dict, kind: str, params: dict,
+                            description: str, max_items: Optional[int] = None, **page_options):
+    """Stream search result pages from eBay, reporting failures as HTTP errors"""
+    try:
+        async for page in iter_search_pages(session, headers, kind, params, rate_limiter, max_items=max_items,
+                                            **page_options):
+            yield page
+    except EbaySearchError as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch {description} from eBay: {e.body or e}")
+
+async def fetch_sold_sales(session: aiohttp.ClientSession, headers: dict, sold_params: dict, condition: Optional[str],
+                          refresh: Optional[SoldRefresh] = None) -> List[dict]:
+    """Fetch sold items for a card and filter them down to usable sales"""
+    debug = logger.isEnabledFor(logging.DEBUG)
+    trace = current_trace()
+    refresh = refresh or SoldRefresh(None, sold_params["q"])
+    
+    # Stream sold items page by page over the shared connection pool
+    # (only sales newer than the card's watermark when it has been fetched before)
+    sales_data = []
+    async for page in search_ebay_pages(session, headers, refresh.kind, sold_params, "sold items",
+                                        max_items=SOLD_MAX_ITEMS, **refresh.page_options()):
+        logger.debug("Number of sold items on this page: %d", len(page))
+        reached_known = refresh.see_page(page)
+        
+        # Process sales data
+        for item in page:
+            if "price" in item:
+                if debug:
+                    logger.debug("Found sold item: %s - $%s - Condition: %s",
+                                 item.get('title'), item['price']['value'], item.get('condition', 'Unknown'))
+                # Get the sale date from itemEndDate, which is when the auction/sale ended
+                sale_date = item.get("itemEndDate")
+                if not sale_date:
+                    # Fallback to soldDate if itemEndDate is not available
+                    sale_date = item.get("soldDate")
+            
+                # If both dates are None, use current date as fallback
+                if not sale_date:
+                    sale_date = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.000Z")
+            
+                sales_data.append({
+                    "item_id": item.get("itemId"),
+                    "sale_date": sale_date,
+                    "price": float(item["price"]["value"]),
+                    "condition": item.get("condition", "Unknown"),
+                    "title": item.get("title", "")  # Add title to the sales data
+                })
+        
+        # Everything past the watermark is already in the sales history
+        if reached_known:
+            break
+    if refresh.incremental:
+        logger.debug("Incremental refresh of %s read %d page(s)", sold_params["q"], refresh.pages)
+
+    # Filter out listings with specific keywords
+    sales_data = filter_by_title_keywords(sales_data, exclude_keywords=EXCLUDED_KEYWORDS)
+    logger.debug("Number of sales after keyword filtering: %d", len(sales_data))
+    
+    # Keep every sale seen, then price from the card's accumulated history
+    store = get_sales_store()
+    if store is not None:
+        # The watermark advances in the same transaction, so a failed save leaves these sales to the next refresh
+        new_sales = store.add_sales(sold_params["q"], sales_data, watermark=refresh.advanced_watermark(SOLD_MAX_ITEMS))
+        sales_data = store.get_sales(sold_params["q"], since=datetime.now(timezone.utc) - timedelta(days=history_days()))
+        logger.debug("Stored %d new sales; %d sales in history", new_sales, len(sales_data))
     
-    # Filter out items with matching keywords
-    filtered_items = [
-        item for item in items 
-        if not any(kw in item.get(title_key, "").lower() for kw in exclude_keywords)
-    ]
+    # Only include items with the specified condition
+    if condition is not None:
+        if trace is not None:
+            for sale in sales_data:
+                if sale["condition"] != condition:
+                    trace.record("condition", "rejected", sale["title"], sale["price"], sale["condition"])
+        matching = [sale for sale in sales_data if sale["condition"] == condition]
+        ITEMS_FILTERED.inc(len(sales_data) - len(matching), reason="condition")
+        sales_data = matching
     
-    # Print debug information about filtered items
-    print(f"\nFiltered out {len(items) - len(filtered_items)} items with keywords: {exclude_keywords}")
-    for item in items:
-        if any(kw in item.get(title_key, "").lower() for kw in exclude_keywords):
-            print(f"  EXCLUDED: {item.get(title_key, '')} - ${item.get('price', 0)}")
+    # Filter out price outliers from sales data
+    sales_data = filter_price_outliers(sales_data)
+    logger.debug("Number of sales after outlier filtering: %d", len(sales_data))
     
-    return filtered_items
+    if debug:
+        for sale in sales_data:
+            logger.debug("  KEPT: %s - $%s - %s", sale.get('title', ''), sale['price'], sale['condition'])
+    if trace is not None:
+        for sale in sales_data:
+            trace.record("sold", "kept", sale.get('title', ''), sale['price'])
+    
+    return sales_data
+
+async def fetch_active_listings(session: aiohttp.ClientSession, headers: dict, query: str, condition: Optional[str]) -> List[dict]:
+    """Fetch active listings for a card and filter them down to usable listings"""
+    # Build the active listings search
+    active_filter = "buyingOptions:{FIXED_PRICE|AUCTION}"  # Include both Buy It Now and Auction listings
+    
+    active_params = {
+        "q": query,
+        "filter": active_filter,
+        "sort": "price"
+    }
+    
+    logger.debug("Using active listings filter: %s", active_params['filter'])
+    
+    debug = logger.isEnabledFor(logging.DEBUG)
+    trace = current_trace()
+    
+    # Stream active listings page by page over the shared connection pool
+    active_listings = []
+    async for page in search_ebay_pages(session, headers, "active", active_params, "active listings", max_items=ACTIVE_MAX_ITEMS):
+        logger.debug("Number of active listings on this page: %d", len(page))
+        
+        # Process active listings data
+        for item in page:
+            if "price" in item:
+                if debug:
+                    logger.debug("Found active listing: %s - $%s - Condition: %s",
+                                 item.get('title'), item['price']['value'], item.get('condition', 'Unknown'))
+                listing_type = "buy_it_now" if "FIXED_PRICE" in item.get("buyingOptions", []) else "auction"
+            
+                # Only include items with the specified condition
+                item_condition = item.get("condition", "Unknown")
+                if condition is None or item_condition == condition:
+                    active_listings.append({
+                        "price": float(item["price"]["value"]),
+                        "condition": item_condition,
+                        "listing_type": listing_type,
+                        "title": item.get("title", "")  # Add title to the active listings
+                    })
+                else:
+                    ITEMS_FILTERED.inc(reason="condition")
+                    if trace is not None:
+                        trace.record("condition", "rejected", item.get("title", ""), item["price"]["value"], item_condition)
+
+    # Filter out listings with specific keywords
+    active_listings = filter_by_title_keywords(active_listings, exclude_keywords=EXCLUDED_KEYWORDS)
+    logger.debug("Number of active listings after keyword filtering: %d", len(active_listings))
+    
+    # Filter out price outliers from active listings
+    active_listings = filter_price_outliers(active_listings)
+    logger.debug("Number of active listings after outlier filtering: %d", len(active_listings))
+    
+    if debug:
+        for listing in active_listings:
+            logger.debug("  KEPT: %s - $%s - %s - %s", listing.get('title', ''), listing['price'],
+                         listing['condition'], listing['listing_type'])
+    if trace is not None:
+        for listing in active_listings:
+            trace.record("active", "kept", listing.get('title', ''), listing['price'], listing['listing_type'])
+    
+    return active_listings
+
+# Shared secret that admins send in X-Admin-Token to profile a request; profiling is off when unset
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN")
+
+def profile_requested(request: Request, profile: bool) -> bool:
+    """Whether a request asked to be profiled (X-Profile header or profile=true), checking the admin token"""
+    if not (profile or request.headers.get("x-profile", "").lower() in ("1", "true", "yes")):
+        return False
+    token = request.headers.get("x-admin-token", "")
+    if not PROFILE_ADMIN_TOKEN or not hmac.compare_digest(token, PROFILE_ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Profiling needs a valid X-Admin-Token")
+    return True
+
+# Fields returned by /card-price?summary=true
+SUMMARY_FIELDS = ("predicted_price", "confidence_score", "market_analysis")
+
+def selected_price_fields(fields: Optional[str], summary: bool) -> Optional[set]:
+    """Parse a /card-price field projection; None means every field"""
+    # Projection only trims serialization: the price index keeps full responses,
+    # since the next request for the same card may ask for recent_sales or active_listings
+    if summary:
+        return set(SUMMARY_FIELDS)
+    if not fields:
+        return None
+    selected = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = selected - set(CardPriceResponse.model_fields)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}; expected some of {', '.join(CardPriceResponse.model_fields)}"
+        )
+    return selected
+
+# Coalesces identical in-flight card lookups
+card_lookups = SingleFlight()
+
+def price_weight(price: CardPriceResponse) -> int:
+    """Price index weight of a price: the sales and listings it holds, which dominate its memory"""
+    return 1 + len(price.recent_sales) + len(price.active_listings)
+
+# Latest price per card, served stale-while-revalidate by /card-price
+price_index = PriceIndex.from_env(weigh=price_weight)
+
+def card_lookup_key(query: str, condition: Optional[str]) -> tuple:
+    """Canonical key for a card lookup: the normalized query plus condition"""
+    return (normalize_query(query), (condition or "").strip())
 
 @app.get("/card-price", response_model=CardPriceResponse)
 async def get_card_price(
@@ -308,27 +526,84 @@ async def get_card_price(
     condition: Optional[str] = None,
     player_name: Optional[str] = None,
     card_number: Optional[str] = None,
-    card_variation: Optional[str] = None
+    card_variation: Optional[str] = None,
+    max_age: Optional[float] = None,
+    fields: Optional[str] = None,
+    summary: bool = False,
+    profile: bool = False,
+    request: Request = None
 ):
     """Get predicted price for a sports card based on recent eBay sales and active listings"""
     
-    # Get OAuth token (now cached)
-    oauth_token = await get_ebay_oauth_token()
+    if max_age is not None and max_age < 0:
+        raise HTTPException(status_code=400, detail="max_age must be zero or more seconds")
+    selected = selected_price_fields(fields, summary)
     
     # Build search query
     query = build_search_query(brand, set_name, year, player_name, card_number, card_variation)
-    print(f"Search query: {query}")  # Debug log
+    logger.debug("Search query: %s", query)
+    
+    if request is not None and profile_requested(request, profile):
+        # Price this request's own fetch from eBay, bypassing the price index and lookup coalescing.
+        # The profile covers the whole process while it runs, other requests included
+        try:
+            async with async_profiling(query) as captured:
+                price = await price_card(query, condition)
+        except ProfileBusyError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        return json_response(
+            price.model_dump(include=selected),
+            request.headers.get("accept-encoding", ""),
+            headers={"X-Price-Index": "miss", "Age": "0", "X-Profile": captured.name}
+        )
+    
+    # Serve from the price index
+    price, status, age = await lookup_card_price(query, condition, max_age)
+    if request is None:
+        # Called from another endpoint rather than over HTTP
+        return price
+    
+    # Serialize only the requested fields, straight to (optionally gzipped) JSON bytes
+    return json_response(
+        price.model_dump(include=selected),
+        request.headers.get("accept-encoding", ""),
+        headers={"X-Price-Index": status, "Age": str(int(age))}
+    )
+
+async def lookup_card_price(query: str, condition: Optional[str], max_age: Optional[float] = None) -> Tuple[CardPriceResponse, str, float]:
+    """Price a card through the price index; returns (price, index status, age of the price in seconds)"""
+    # max_age: oldest price to accept, in seconds; 0 recomputes. Identical concurrent lookups (and refreshes) share a single upstream fetch
+    key = card_lookup_key(query, condition)
+    price, status, age = await price_index.lookup(
+        key,
+        lambda: card_lookups.do(key, lambda: price_card(query, condition)),
+        max_age=max_age
+    )
+    PRICE_INDEX_LOOKUPS.inc(status=status)
+    return price, status, age
+
+async def price_card(query: str, condition: Optional[str] = None) -> CardPriceResponse:
+    """Price a card from live eBay sold items and active listings"""
+    with pricing_card():
+        return await _price_card(query, condition)
+
+async def _price_card(query: str, condition: Optional[str]) -> CardPriceResponse:
+    """Pricing steps of price_card, each timed as a stage"""
+    # Get OAuth token (now cached)
+    with stage("token"):
+        oauth_token = await get_ebay_oauth_token()
     
-    # Calculate date range (last 90 days, which is the maximum allowed by eBay)
+    # Calculate date range (last 90 days, which is the maximum allowed by eBay),
+    # or only the sales since the last refresh when the card has a watermark
     end_date = datetime.utcnow()
-    start_date = end_date - timedelta(days=90)
+    refresh = SoldRefresh(get_sales_store(), query, scope=api_sales_scope(condition))
+    start_date = refresh.start_date(end_date - timedelta(days=90))
     
     # Format dates in ISO 8601 UTC format
     start_date_str = start_date.strftime("%Y-%m-%dT%H:%M:%S.000Z")
     end_date_str = end_date.strftime("%Y-%m-%dT%H:%M:%S.000Z")
     
     # Prepare eBay API request for sold items
-    sold_url = "https://api.ebay.com/buy/browse/v1/item_summary/search"
     headers = {
         "Authorization": f"Bearer {oauth_token}",
         "Content-Type": "application/json",
@@ -357,123 +632,25 @@ async def get_card_price(
     sold_params = {
         "q": query,
         "filter": sold_filter,
-        "sort": "-endDate",  # Most recent first
-        "limit": 100
+        "sort": "-endDate"  # Most recent first
     }
     
-    print(f"Using sold items filter: {sold_params['filter']}")  # Debug log
-    
-    # Apply rate limiting before making the API call
-    await rate_limiter.acquire()
-    
-    # Make requests to eBay API using aiohttp
-    async with aiohttp.ClientSession() as session:
-        async with session.get(sold_url, headers=headers, params=sold_params) as response:
-            if response.status != 200:
-                response_text = await response.text()
-                raise HTTPException(status_code=500, detail=f"Failed to fetch sold items from eBay: {response_text}")
-            
-            sold_data = await response.json()
-            print(f"Number of sold items found: {len(sold_data.get('itemSummaries', []))}")  # Debug log
-            
-            # Process sales data
-            sales_data = []
-            for item in sold_data.get("itemSummaries", []):
-                if "price" in item:
-                    print(f"Found sold item: {item.get('title')} - ${item['price']['value']} - Condition: {item.get('condition', 'Unknown')}")  # Debug log
-                    # Get the sale date from itemEndDate, which is when the auction/sale ended
-                    sale_date = item.get("itemEndDate")
-                    if not sale_date:
-                        # Fallback to soldDate if itemEndDate is not available
-                        sale_date = item.get("soldDate")
-                    
-                    # If both dates are None, use current date as fallback
-                    if not sale_date:
-                        sale_date = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.000Z")
-                    
-                    # Only include items with the specified condition
-                    item_condition = item.get("condition", "Unknown")
-                    if condition is None or item_condition == condition:
-                        sales_data.append({
-                            "sale_date": sale_date,
-                            "price": float(item["price"]["value"]),
-                            "condition": item_condition,
-                            "title": item.get("title", "")  # Add title to the sales data
-                        })
-    
-    # Filter out listings with specific keywords
-    sales_data = filter_by_title_keywords(sales_data, exclude_keywords=EXCLUDED_KEYWORDS)
-    print(f"Number of sales after keyword filtering: {len(sales_data)}")  # Debug log
-    
-    # Filter out price outliers from sales data
-    sales_data = filter_price_outliers(sales_data)
-    print(f"Number of sales after outlier filtering: {len(sales_data)}")  # Debug log
-    
-    # Print remaining sales data
-    print("\nRemaining sales data:")
-    for sale in sales_data:
-        print(f"  {sale.get('title', '')} - ${sale['price']} - {sale['condition']}")
+    logger.debug("Using sold items filter: %s", sold_params['filter'])
     
-    # Now get active listings
-    active_filter = "buyingOptions:{FIXED_PRICE|AUCTION}"  # Include both Buy It Now and Auction listings
-    
-    active_params = {
-        "q": query,
-        "filter": active_filter,
-        "sort": "price",
-        "limit": 100
-    }
-    
-    print(f"Using active listings filter: {active_params['filter']}")  # Debug log
-    
-    # Apply rate limiting before making the API call
-    await rate_limiter.acquire()
-    
-    # Make requests to eBay API using aiohttp
-    async with aiohttp.ClientSession() as session:
-        async with session.get(sold_url, headers=headers, params=active_params) as response:
-            if response.status != 200:
-                response_text = await response.text()
-                raise HTTPException(status_code=500, detail=f"Failed to fetch active listings from eBay: {response_text}")
-            
-            active_data = await response.json()
-            print(f"Number of active listings found: {len(active_data.get('itemSummaries', []))}")  # Debug log
-            
-            # Process active listings data
-            active_listings = []
-            for item in active_data.get("itemSummaries", []):
-                if "price" in item:
-                    print(f"Found active listing: {item.get('title')} - ${item['price']['value']} - Condition: {item.get('condition', 'Unknown')}")  # Debug log
-                    listing_type = "buy_it_now" if "FIXED_PRICE" in item.get("buyingOptions", []) else "auction"
-                    
-                    # Only include items with the specified condition
-                    item_condition = item.get("condition", "Unknown")
-                    if condition is None or item_condition == condition:
-                        active_listings.append({
-                            "price": float(item["price"]["value"]),
-                            "condition": item_condition,
-                            "listing_type": listing_type,
-                            "title": item.get("title", "")  # Add title to the active listings
-                        })
-    
-    # Filter out listings with specific keywords
-    active_listings = filter_by_title_keywords(active_listings, exclude_keywords=EXCLUDED_KEYWORDS)
-    print(f"Number of active listings after keyword filtering: {len(active_listings)}")  # Debug log
-    
-    # Filter out price outliers from active listings
-    active_listings = filter_price_outliers(active_listings)
-    print(f"Number of active listings after outlier filtering: {len(active_listings)}")  # Debug log
-    
-    # Print remaining active listings
-    print("\nRemaining active listings:")
-    for listing in active_listings:
-        print(f"  {listing.get('title', '')} - ${listing['price']} - {listing['condition']} - {listing['listing_type']}")
-    
-    # Get market analysis
-    market_analysis = analyze_market(sales_data, active_listings)
+    # Fetch sold items and active listings concurrently over the shared connection pool,
+    # filtering each result as it arrives
+    session = http_pool.get_session()
+    sales_data, active_listings = await asyncio.gather(
+        fetch_sold_sales(session, headers, sold_params, condition, refresh),
+        fetch_active_listings(session, headers, query, condition)
+    )
     
-    # Predict price
-    predicted_price, confidence = predict_price(sales_data, active_listings)
+    with stage("prediction"):
+        # Get market analysis
+        market_analysis = analyze_market(sales_data, active_listings)
+        
+        # Predict price
+        predicted_price, confidence = predict_price(sales_data, active_listings)
     
     return CardPriceResponse(
         predicted_price=predicted_price,
@@ -483,6 +660,61 @@ async def get_card_price(
         market_analysis=market_analysis
     )
 
+# Largest card list accepted by /card-prices in one request
+CARD_PRICES_MAX_CARDS = int(os.getenv("CARD_PRICES_MAX_CARDS", 1000))
+
+@app.post("/card-prices")
+async def get_card_prices(cards: List[CardSpec], max_concurrent: int = 5, max_age: Optional[float] = None):
+    """
+    Price a list of cards concurrently, streaming each result as NDJSON as soon as it is ready.
+    
+    Each line is {"index", "card", "result", "price_index", "age"} for a priced card or
+    {"index", "card", "error"} for a failed one, in completion order; "index" is the card's
+    position in the request, and "age" how old the price is in seconds.
+    """
+    if len(cards) > CARD_PRICES_MAX_CARDS:
+        raise HTTPException(status_code=413, detail=f"At most {CARD_PRICES_MAX_CARDS} cards per request")
+    if max_concurrent < 1:
+        raise HTTPException(status_code=400, detail="max_concurrent must be at least 1")
+    if max_age is not None and max_age < 0:
+        raise HTTPException(status_code=400, detail="max_age must be zero or more seconds")
+    
+    return StreamingResponse(stream_card_prices(cards, max_concurrent, max_age), media_type="application/x-ndjson")
+
+async def stream_card_prices(cards: List[CardSpec], max_concurrent: int, max_age: Optional[float]):
+    """Yield one NDJSON line per card as its price completes"""
+    semaphore = Semaphore(max_concurrent)
+    
+    async def price(index: int, card: CardSpec) -> dict:
+        spec = jsonable_encoder(card)
+        line = {"index": index, "card": spec}
+        async with semaphore:
+            try:
+                # Same path as /card-price: price index, lookup coalescing and the shared rate limiter
+                query = build_search_query(card.brand, card.set_name, card.year, card.player_name,
+                                           card.card_number, card.card_variation)
+                price, status, age = await lookup_card_price(query, card.condition, max_age)
+                line["result"] = jsonable_encoder(price)
+                # Like the X-Price-Index and Age headers of /card-price
+                line["price_index"] = status
+                line["age"] = round(age, 1)
+            except HTTPException as e:
+                line["error"] = str(e.detail)
+            except Exception as e:
+                logger.exception("Error pricing card %d in /card-prices", index)
+                line["error"] = str(e)
+        return line
+    
+    tasks = [asyncio.ensure_future(price(index, card)) for index, card in enumerate(cards)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield json.dumps(await next_done) + "\n"
+    finally:
+        # The client went away or the stream ended; stop pricing cards nobody will read
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
 @app.post("/write-to-sheets", response_model=GoogleSheetsResponse)
 async def write_to_sheets(
     brand: str,
@@ -502,7 +734,9 @@ async def write_to_sheets(
             condition=condition,
             player_name=player_name,
             card_number=card_number,
-            card_variation=card_variation
+            card_variation=card_variation,
+            # The sheet has no column for a price's age, so always reprice
+            max_age=0
         )
         
         # Prepare data for Google Sheets
@@ -546,6 +780,9 @@ async def write_to_sheets(
             detail=f"Failed to write to Google Sheets: {str(e)}"
         )
 
+# File that /write-to-csv appends to; its name picks the format (CSV, optionally .gz/.zst, or .ndjson)
+WRITE_TO_CSV_PATH = os.getenv("WRITE_TO_CSV_PATH", "card_prices.csv")
+
 @app.get("/write-to-csv", response_model=CSVResponse)
 async def write_to_csv(
     brand: str,
@@ -556,6 +793,11 @@ async def write_to_csv(
     card_number: Optional[str] = None,
     card_variation: Optional[str] = None
 ):
+    """Price a card and append the result to the WRITE_TO_CSV_PATH file"""
+    file_path = WRITE_TO_CSV_PATH
+    if not supports_append(file_path):
+        raise HTTPException(status_code=500, detail=f"Cannot append rows to {file_path}; set WRITE_TO_CSV_PATH to a CSV or NDJSON file")
+    
     try:
         # Get card price data
         price_data = await get_card_price(
@@ -565,7 +807,9 @@ async def write_to_csv(
             condition=condition,
             player_name=player_name,
             card_number=card_number,
-            card_variation=card_variation
+            card_variation=card_variation,
+            # The file has no column for a price's age, so always reprice
+            max_age=0
         )
         
         # Prepare data for CSV
@@ -588,21 +832,14 @@ async def write_to_csv(
             'price_trend': price_data.market_analysis['price_trend']
         }
         
-        # Define CSV file path
-        csv_file = 'card_prices.csv'
-        file_exists = os.path.exists(csv_file) and os.path.getsize(csv_file) > 0
-        
-        # Write to CSV
-        with open(csv_file, 'a', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=row_data.keys())
-            if not file_exists:
-                writer.writeheader()
-            writer.writerow(row_data)
+        # Write to the output file
+        with create_writer(file_path, CSV_OUTPUT_FIELDS, CSV_OUTPUT_TYPES, append=True) as writer:
+            writer.write_rows([[row_data[field] for field in CSV_OUTPUT_FIELDS]])
         
         return CSVResponse(
             success=True,
             message="Successfully wrote to CSV file",
-            file_path=csv_file
+            file_path=file_path
         )
         
     except Exception as e:
@@ -611,20 +848,44 @@ async def write_to_csv(
             detail=f"Failed to write to CSV: {str(e)}"
         )
 
+# Columns written by process_cards_from_csv
+CSV_OUTPUT_FIELDS = [
+    'timestamp', 'brand', 'set_name', 'year', 'condition', 'player_name',
+    'card_number', 'card_variation', 'predicted_price', 'confidence_score',
+    'recent_sales_count', 'active_listings_count', 'market_trend',
+    'supply_level', 'price_trend'
+]
+
+# Column types for typed output formats (Parquet, NDJSON)
+CSV_OUTPUT_TYPES = {
+    'predicted_price': 'float',
+    'confidence_score': 'float',
+    'recent_sales_count': 'int',
+    'active_listings_count': 'int'
+}
+
 # Modify process_cards_from_csv to use parallel processing
 async def process_cards_from_csv(
     input_csv_path: str,
     output_csv_path: str = "card_prices.csv",
-    max_concurrent: int = 5
+    max_concurrent: int = 5,
+    on_card_done: Optional[Callable[..., None]] = None,
+    concurrency: Optional[AdaptiveConcurrency] = None
 ):
     """
-    Process multiple cards from an input CSV file and write results to an output CSV file.
-    Uses parallel processing with asyncio to speed up processing.
+    Process multiple cards from an input CSV file and write results to an output file.
+    The input may be .gz or .zst compressed; the output format follows the output
+    file name (CSV, optionally compressed, .ndjson or .parquet).
+    Cards are streamed from the input through a fixed pool of pricing workers
+    to a single writer that appends rows in batches.
     
     Args:
         input_csv_path (str): Path to the input CSV file containing card details
         output_csv_path (str): Path to write the results (default: 'card_prices.csv')
         max_concurrent (int): Maximum number of cards to process concurrently (default: 5)
+        on_card_done (callable): Called with (success, card, error) as each card succeeds or fails
+        concurrency (AdaptiveConcurrency): Adjusts the number of cards in flight to eBay's
+            responses instead of the fixed max_concurrent
     
     Returns:
         dict: Summary of processing results including success count and any errors
@@ -636,93 +897,79 @@ async def process_cards_from_csv(
         'errors': []
     }
     
+    async def process_card(card):
+        try:
+            # Get card price data
+            price_data = await get_card_price(
+                brand=card['brand'],
+                set_name=card['set_name'],
+                year=card['year'],
+                condition=card.get('condition'),
+                player_name=card.get('player_name'),
+                card_number=card.get('card_number'),
+                card_variation=card.get('card_variation'),
+                # Rows written out carry no age, so never write a price from the index
+                max_age=0
+            )
+            
+            # Prepare data for CSV
+            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            row_data = {
+                'timestamp': current_time,
+                'brand': card['brand'],
+                'set_name': card['set_name'],
+                'year': card['year'],
+                'condition': card.get('condition', 'N/A'),
+                'player_name': card.get('player_name', 'N/A'),
+                'card_number': card.get('card_number', 'N/A'),
+                'card_variation': card.get('card_variation', 'N/A'),
+                'predicted_price': str(price_data.predicted_price),
+                'confidence_score': str(price_data.confidence_score),
+                'recent_sales_count': str(len(price_data.recent_sales)),
+                'active_listings_count': str(len(price_data.active_listings)),
+                'market_trend': price_data.market_analysis.get('market_trend', 'unknown'),
+                'supply_level': price_data.market_analysis.get('supply_level', 'unknown'),
+                'price_trend': price_data.market_analysis.get('price_trend', 'unknown')
+            }
+            
+            results['successful'] += 1
+            if on_card_done is not None:
+                on_card_done(True, card)
+            return row_data
+            
+        except Exception as e:
+            results['failed'] += 1
+            results['errors'].append({
+                'card': card,
+                'error': str(e)
+            })
+            if on_card_done is not None:
+                on_card_done(False, card, str(e))
+            return None
+    
     try:
-        # Read input CSV
-        with open(input_csv_path, 'r', newline='') as f:
-            reader = csv.DictReader(f)
-            cards = list(reader)
+        # Parquet files cannot be appended to, so they are rewritten
+        append = supports_append(output_csv_path)
         
-        results['total_cards'] = len(cards)
-        
-        # Process cards in batches
-        batch_size = max_concurrent
-        for i in range(0, len(cards), batch_size):
-            batch = cards[i:i+batch_size]
+        # Stream cards through a fixed pool of workers to a single batched writer
+        with open_text(input_csv_path) as infile, \
+                create_writer(output_csv_path, CSV_OUTPUT_FIELDS, CSV_OUTPUT_TYPES, append=append) as writer:
             
-            # Create a new event loop for this batch
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
+            def write_rows(rows):
+                writer.write_rows([[row[field] for field in CSV_OUTPUT_FIELDS] for row in rows])
+                writer.flush()
             
-            try:
-                # Create a semaphore to limit concurrent processing
-                semaphore = asyncio.Semaphore(max_concurrent)
-                
-                # Create a lock for writing to the CSV file
-                csv_lock = asyncio.Lock()
-                
-                # Define a function to process a single card
-                async def process_card(card):
-                    async with semaphore:
-                        try:
-                            # Get card price data
-                            price_data = await get_card_price(
-                                brand=card['brand'],
-                                set_name=card['set_name'],
-                                year=card['year'],
-                                condition=card.get('condition'),
-                                player_name=card.get('player_name'),
-                                card_number=card.get('card_number'),
-                                card_variation=card.get('card_variation')
-                            )
-                            
-                            # Prepare data for CSV
-                            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                            row_data = {
-                                'timestamp': current_time,
-                                'brand': card['brand'],
-                                'set_name': card['set_name'],
-                                'year': card['year'],
-                                'condition': card.get('condition', 'N/A'),
-                                'player_name': card.get('player_name', 'N/A'),
-                                'card_number': card.get('card_number', 'N/A'),
-                                'card_variation': card.get('card_variation', 'N/A'),
-                                'predicted_price': str(price_data.predicted_price),
-                                'confidence_score': str(price_data.confidence_score),
-                                'recent_sales_count': str(len(price_data.recent_sales)),
-                                'active_listings_count': str(len(price_data.active_listings)),
-                                'market_trend': price_data.market_analysis.get('market_trend', 'unknown'),
-                                'supply_level': price_data.market_analysis.get('supply_level', 'unknown'),
-                                'price_trend': price_data.market_analysis.get('price_trend', 'unknown')
-                            }
-                            
-                            # Write to CSV with lock
-                            async with csv_lock:
-                                file_exists = os.path.exists(output_csv_path)
-                                with open(output_csv_path, 'a', newline='') as f:
-                                    writer = csv.DictWriter(f, fieldnames=row_data.keys())
-                                    if not file_exists:
-                                        writer.writeheader()
-                                    writer.writerow(row_data)
-                            
-                            results['successful'] += 1
-                            return row_data
-                            
-                        except Exception as e:
-                            results['failed'] += 1
-                            results['errors'].append({
-                                'card': card,
-                                'error': str(e)
-                            })
-                            return None
-                
-                # Process all cards in the batch concurrently
-                tasks = [process_card(card) for card in batch]
-                loop.run_until_complete(asyncio.gather(*tasks))
-                
-            finally:
-                # Close the event loop
-                loop.close()
+            pipeline_stats = await run_pipeline(
+                csv.DictReader(infile),
+                process_card,
+                write_rows,
+                workers=max_concurrent,
+                concurrency=concurrency
+            )
         
+        results['total_cards'] = pipeline_stats['read']
+        if concurrency is not None:
+            results['concurrency'] = concurrency.stats()
         return results
         
     except Exception as e:
@@ -731,12 +978,110 @@ async def process_cards_from_csv(
         })
         return results
 
+# Batch jobs run in the background on the server's own event loop
+batch_jobs = JobManager(max_running=int(os.getenv("BATCH_MAX_RUNNING_JOBS", 1)))
+
+def count_csv_rows(path: str) -> int:
+    """Count the data rows in a CSV file"""
+    with open_text(path) as f:
+        return sum(1 for _ in csv.DictReader(f))
+
+def adaptive_concurrency(max_concurrent: int, adaptive: Optional[str]) -> Optional[AdaptiveConcurrency]:
+    """Build the adaptive limit for a batch request's "MIN:MAX" bounds, starting from max_concurrent"""
+    if not adaptive:
+        return None
+    try:
+        return AdaptiveConcurrency(max_concurrent, *parse_range(adaptive))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def submit_batch_job(input_csv_path: str, output_csv_path: str, max_concurrent: int, adaptive: Optional[str] = None):
+    """Queue a batch pricing job and return it without waiting for it to run"""
+    if not os.path.exists(input_csv_path):
+        raise HTTPException(status_code=400, detail=f"Input file not found: {input_csv_path}")
+    concurrency = adaptive_concurrency(max_concurrent, adaptive)
+    
+    async def run(job):
+        job.track_wait(rate_limiter.total_wait)
+        job.track_quota(rate_limiter.remaining_quota)
+        if concurrency is not None:
+            job.track_concurrency(concurrency.stats)
+        # Count rows off the event loop so progress can report what is left
+        job.total = await asyncio.to_thread(count_csv_rows, input_csv_path)
+        return await process_cards_from_csv(input_csv_path, output_csv_path, max_concurrent, on_card_done=job.record,
+                                            concurrency=concurrency)
+    
+    return batch_jobs.submit(run, {
+        "input_csv_path": input_csv_path,
+        "output_csv_path": output_csv_path,
+        "max_concurrent": max_concurrent,
+        "adaptive": adaptive
+    })
+
+@app.post("/jobs", response_model=dict, status_code=202)
+async def create_job(
+    input_csv_path: str,
+    output_csv_path: str = 'card_prices.csv',
+    max_concurrent: int = 5,
+    adaptive: Optional[str] = None
+):
+    """Submit a CSV of cards for background pricing and return its job ID.
+    
+    adaptive="MIN:MAX" starts at max_concurrent and adjusts to eBay's responses within those bounds.
+    """
+    job = submit_batch_job(input_csv_path, output_csv_path, max_concurrent, adaptive)
+    return {"job_id": job.id, "status": job.status, "status_url": f"/jobs/{job.id}"}
+
+@app.get("/jobs", response_model=dict)
+async def list_jobs():
+    """List batch jobs with their progress"""
+    return {"jobs": [job.progress() for job in batch_jobs.list()]}
+
+@app.get("/jobs/{job_id}", response_model=dict)
+async def get_job(job_id: str):
+    """Report a batch job's progress, throughput and estimated time left"""
+    job = batch_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job.progress()
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, interval: float = 1.0):
+    """
+    Follow a batch job as Server-Sent Events.
+    
+    Sends a "card" event as each card finishes, a "progress" event (throughput, ETA,
+    rate limiter wait, error counts) every `interval` seconds, and an "end" event
+    when the job stops.
+    """
+    job = batch_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    if interval <= 0:
+        raise HTTPException(status_code=400, detail="interval must be greater than zero")
+    
+    async def events():
+        async for event, data in job_events(job, interval):
+            yield f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.delete("/jobs/{job_id}", response_model=dict)
+async def cancel_job(job_id: str):
+    """Cancel a queued or running batch job; rows already priced are kept"""
+    job = batch_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job.progress()
+
 # Add a new endpoint to process cards in parallel
 @app.post("/process-cards-parallel", response_model=dict)
 async def process_cards_parallel(
     input_csv_path: str,
     output_csv_path: str = 'card_prices.csv',
-    max_concurrent: int = 5
+    max_concurrent: int = 5,
+    wait: bool = False,
+    adaptive: Optional[str] = None
 ):
     """
     Process multiple cards from an input CSV file in parallel and write results to an output CSV file.
@@ -745,15 +1090,88 @@ async def process_cards_parallel(
         input_csv_path (str): Path to the input CSV file containing card details
         output_csv_path (str): Path to write the results (default: 'card_prices.csv')
         max_concurrent (int): Maximum number of cards to process concurrently (default: 5)
+        wait (bool): Block until the file is done instead of returning a job ID (default: False)
+        adaptive (str): "MIN:MAX" bounds for adjusting concurrency to eBay's responses,
+            starting from max_concurrent (default: fixed concurrency)
     
     Returns:
-        dict: Summary of processing results including success count and any errors
+        dict: The background job's ID, or with wait=True the summary of processing results
     """
+    if not wait:
+        job = submit_batch_job(input_csv_path, output_csv_path, max_concurrent, adaptive)
+        return {"job_id": job.id, "status": job.status, "status_url": f"/jobs/{job.id}"}
+    
+    concurrency = adaptive_concurrency(max_concurrent, adaptive)
     try:
-        results = await process_cards_from_csv(input_csv_path, output_csv_path, max_concurrent)
+        results = await process_cards_from_csv(input_csv_path, output_csv_path, max_concurrent,
+                                               concurrency=concurrency)
         return results
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to process cards: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@app.get("/cache-stats", response_model=dict)
+async def cache_stats():
+    """Report hit/miss counters for the eBay search cache"""
+    cache = get_search_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+@app.get("/sales-history-stats", response_model=dict)
+async def sales_history_stats():
+    """Report how many sales the local sales history holds"""
+    store = get_sales_store()
+    if store is None:
+        return {"enabled": False}
+    return {"enabled": True, "history_days": history_days(), **store.stats()}
+
+@app.get("/price-index-stats", response_model=dict)
+async def price_index_stats():
+    """Report how /card-price lookups were served from the price index"""
+    return price_index.stats()
+
+@app.get("/pool-stats", response_model=dict)
+async def pool_stats():
+    """Report connection pool configuration and reuse counters"""
+    return http_pool.stats_dict()
+
+@app.get("/rate-limit", response_model=dict)
+async def rate_limit_stats():
+    """Report rate limiter state and remaining daily quota per eBay API family"""
+    return rate_limiter.stats()
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Export stage latencies, eBay responses, cache and filter counters and in-flight gauges for Prometheus"""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/coalescing-stats", response_model=dict)
+async def coalescing_stats():
+    """Report how many card lookups were served by a shared in-flight fetch"""
+    return card_lookups.stats()
+
+@app.get("/card-price/trace", response_model=dict)
+async def card_price_trace(
+    brand: str,
+    set_name: str,
+    year: str,
+    condition: Optional[str] = None,
+    player_name: Optional[str] = None,
+    card_number: Optional[str] = None,
+    card_variation: Optional[str] = None
+):
+    """Price a card and return every filter decision made along the way"""
+    query = build_search_query(brand, set_name, year, player_name, card_number, card_variation)
+    
+    # Traced lookups bypass coalescing so the trace belongs to this request alone
+    with tracing(query) as trace:
+        price = await price_card(query, condition)
+    
+    return {
+        "predicted_price": price.predicted_price,
+        "confidence_score": price.confidence_score,
+        **trace.dump()
+    }
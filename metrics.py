@@ -0,0 +1,239 @@
+import os
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+from profiling import current_profile
+
+# Latency buckets in seconds, from a cache hit up to a slow multi-page fetch
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+class Metric:
+    """A named metric with optional labels; subclasses hold one value per label combination"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} takes labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def samples(self) -> Iterator[Tuple[str, Tuple[str, ...], Tuple[str, ...], float]]:
+        """Yield (sample name, label names, label values, value) for every label combination"""
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield self.name, self.label_names, key, value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {_escape(self.documentation)}", f"# TYPE {self.name} {self.kind}"]
+        for name, label_names, label_values, value in self.samples():
+            lines.append(f"{name}{_format_labels(label_names, label_values)} {_format_value(value)}")
+        return lines
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+class Counter(Metric):
+    """A value that only goes up, such as responses received"""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+class Gauge(Metric):
+    """A value that goes up and down, such as requests in flight"""
+
+    kind = "gauge"
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    @contextmanager
+    def track(self, **labels: str) -> Iterator[None]:
+        """Count the enclosed block as in progress"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+class Histogram(Metric):
+    """Observations counted into cumulative buckets, with their sum and count"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (not yet cumulative) counts with one overflow slot, then sum and count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe how long the enclosed block takes"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def samples(self):
+        with self._lock:
+            values = {key: (list(state[0]), state[1], state[2]) for key, state in self._values.items()}
+        bucket_labels = self.label_names + ("le",)
+        for key, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", bucket_labels, key + (_format_value(bound),), cumulative
+            yield f"{self.name}_sum", self.label_names, key, total
+            yield f"{self.name}_count", self.label_names, key, count
+
+class Registry:
+    """The set of metrics exported together on /metrics"""
+
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        """Reset every metric (for tests)"""
+        for metric in self.metrics.values():
+            metric.clear()
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "card_pricer_stage_seconds", "Time spent in each stage of pricing a card", ["stage"]))
+CARD_SECONDS = REGISTRY.register(Histogram(
+    "card_pricer_card_seconds", "Time to price one card from eBay, by outcome", ["result"]))
+EBAY_RESPONSES = REGISTRY.register(Counter(
+    "card_pricer_ebay_responses_total", "eBay API responses by API family and HTTP status", ["api", "status"]))
+CACHE_LOOKUPS = REGISTRY.register(Counter(
+    "card_pricer_search_cache_lookups_total", "Search cache lookups by search kind and result", ["kind", "result"]))
+PRICE_INDEX_LOOKUPS = REGISTRY.register(Counter(
+    "card_pricer_price_index_lookups_total", "/card-price lookups by price index status", ["status"]))
+ITEMS_FILTERED = REGISTRY.register(Counter(
+    "card_pricer_items_filtered_total", "Listings dropped while pricing, by reason", ["reason"]))
+EBAY_IN_FLIGHT = REGISTRY.register(Gauge(
+    "card_pricer_ebay_requests_in_flight", "eBay API requests waiting for a response", ["api"]))
+CARDS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "card_pricer_cards_in_flight", "Cards being priced from eBay"))
+LIMITER_WAITING = REGISTRY.register(Gauge(
+    "card_pricer_rate_limiter_waiting", "Callers queued for a rate limit token, by API family", ["api"]))
+CONCURRENCY_LIMIT = REGISTRY.register(Gauge(
+    "card_pricer_concurrency_limit", "Current limit of an adaptive batch run's concurrent cards"))
+
+def stage(name: str):
+    """Time the enclosed block as one stage of pricing a card"""
+    profile = current_profile()
+    if profile is None:
+        return STAGE_SECONDS.time(stage=name)
+    return _profiled_stage(profile, name)
+
+@contextmanager
+def _profiled_stage(profile, name: str) -> Iterator[None]:
+    # Also record the stage's memory peak in the profile being captured
+    with STAGE_SECONDS.time(stage=name), profile.stage(name):
+        yield
+
+@contextmanager
+def pricing_card() -> Iterator[None]:
+    """Count a card as in flight while it is priced, then time it by outcome"""
+    start = time.perf_counter()
+    result = "error"
+    with CARDS_IN_FLIGHT.track():
+        try:
+            yield
+            result = "ok"
+        finally:
+            CARD_SECONDS.observe(time.perf_counter() - start, result=result)
+
+def search_kind(kind: str) -> str:
+    """Metric label for a search kind; incremental sold refreshes count as sold"""
+    return "sold" if kind.startswith("sold") else kind
+
+def render() -> str:
+    return REGISTRY.render()
+
+def write_metrics(path: str) -> None:
+    """Write every metric to a file, e.g. for the node_exporter textfile collector"""
+    # Write then rename, so a scraper never reads a half-written file
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as f:
+        f.write(render())
+    os.replace(temp_path, path)
@@ -0,0 +1,192 @@
+import os
+import json
+import random
+import asyncio
+import hashlib
+import argparse
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from aiohttp import web
+
+# Paths served under EBAY_API_BASE, matching the real eBay APIs
+OAUTH_PATH = "/identity/v1/oauth2/token"
+SEARCH_PATH = "/buy/browse/v1/item_summary/search"
+
+DEFAULT_SOLD_ITEMS = 150
+DEFAULT_ACTIVE_ITEMS = 40
+
+CONDITIONS = ["New", "Used", "Ungraded", "Graded"]
+
+class MockEbay:
+    """Imitation of the eBay OAuth and Browse item_summary/search endpoints for offline testing.
+
+    Each card query gets its own stable set of synthetic listings (or the
+    recorded payloads from payload_dir), paginated like the real API. Every
+    response can be delayed, fail with a 500 or be throttled with a 429 at
+    configurable rates.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 throttle_rate: float = 0.0, sold_items: int = DEFAULT_SOLD_ITEMS,
+                 active_items: int = DEFAULT_ACTIVE_ITEMS, payload_dir: Optional[str] = None,
+                 seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.sold_items = sold_items
+        self.active_items = active_items
+        self.seed = seed
+        self._random = random.Random(seed)
+        self.recorded = load_payloads(payload_dir) if payload_dir else {}
+        self.counts = {"oauth": 0, "sold": 0, "active": 0, "errors": 0, "throttled": 0}
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(OAUTH_PATH, self.handle_oauth)
+        app.router.add_get(SEARCH_PATH, self.handle_search)
+        app.router.add_get("/mock-stats", self.handle_stats)
+        return app
+
+    async def _misbehave(self) -> Optional[web.Response]:
+        """Apply latency, then maybe answer with an error or a throttle instead of a result"""
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        roll = self._random.random()
+        if roll < self.throttle_rate:
+            self.counts["throttled"] += 1
+            return web.json_response({"errors": [{"errorId": 2001, "message": "Too many requests"}]},
+                                     status=429, headers={"Retry-After": "1"})
+        if roll < self.throttle_rate + self.error_rate:
+            self.counts["errors"] += 1
+            return web.json_response({"errors": [{"errorId": 10001, "message": "Internal error"}]}, status=500)
+        return None
+
+    async def handle_oauth(self, request: web.Request) -> web.Response:
+        self.counts["oauth"] += 1
+        failure = await self._misbehave()
+        if failure is not None:
+            return failure
+        return web.json_response({
+            "access_token": "mock-access-token",
+            "expires_in": 7200,
+            "token_type": "Application Access Token"
+        })
+
+    async def handle_search(self, request: web.Request) -> web.Response:
+        query = request.query.get("q", "")
+        filter_string = request.query.get("filter", "")
+        kind = "sold" if ("soldItems" in filter_string or "itemEndDate" in filter_string) else "active"
+        self.counts[kind] += 1
+        failure = await self._misbehave()
+        if failure is not None:
+            return failure
+
+        limit = int(request.query.get("limit", 50))
+        offset = int(request.query.get("offset", 0))
+        items = self.recorded.get(kind)
+        if items is None:
+            items = self.synthetic_items(query, kind)
+        page = {
+            "href": request.path_qs,
+            "total": len(items),
+            "limit": limit,
+            "offset": offset,
+            "itemSummaries": items[offset:offset + limit]
+        }
+        if offset + limit < len(items):
+            page["next"] = str(request.rel_url.update_query(offset=offset + limit))
+        return web.json_response(page)
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.counts)
+
+    def synthetic_items(self, query: str, kind: str) -> List[Dict[str, Any]]:
+        """Stable listings for a query: the same query always gets the same items"""
+        digest = hashlib.sha1(f"{self.seed}|{kind}|{query.lower()}".encode("utf-8")).hexdigest()
+        rng = random.Random(int(digest[:12], 16))
+        base_price = rng.uniform(5, 500)
+        now = datetime.now(timezone.utc)
+        count = self.sold_items if kind == "sold" else self.active_items
+
+        items = []
+        for i in range(count):
+            item = {
+                "itemId": f"v1|{digest[:10]}{kind[0]}{i}|0",
+                "title": f"{query} card {i}",
+                "price": {"value": f"{base_price * rng.uniform(0.8, 1.2):.2f}", "currency": "USD"},
+                "condition": rng.choice(CONDITIONS)
+            }
+            if kind == "sold":
+                # Newest first, as requested with sort=-endDate
+                item["itemEndDate"] = (now - timedelta(hours=i * 90 * 24 / max(count, 1))).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+            else:
+                item["buyingOptions"] = [rng.choice(["FIXED_PRICE", "AUCTION"])]
+            items.append(item)
+        return items
+
+def load_payloads(payload_dir: str) -> Dict[str, List[Dict[str, Any]]]:
+    """Read recorded search responses (sold.json, active.json) to serve for every query"""
+    payloads = {}
+    for kind in ("sold", "active"):
+        path = os.path.join(payload_dir, f"{kind}.json")
+        if os.path.exists(path):
+            with open(path) as f:
+                payloads[kind] = json.load(f).get("itemSummaries", [])
+    return payloads
+
+class MockEbayServer:
+    """Runs a MockEbay app on a local port"""
+
+    def __init__(self, mock: Optional[MockEbay] = None, host: str = "127.0.0.1", port: int = 0):
+        self.mock = mock or MockEbay()
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def base_url(self) -> str:
+        """Value for EBAY_API_BASE"""
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> str:
+        self._runner = web.AppRunner(self.mock.create_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self.base_url
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+def add_mock_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--latency', type=float, default=0.05, help='Seconds added to every response (default: 0.05)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Extra random delay of up to this many seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of responses that fail with a 500')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Fraction of responses that are throttled with a 429')
+    parser.add_argument('--sold-items', type=int, default=DEFAULT_SOLD_ITEMS, help='Sold items per card')
+    parser.add_argument('--active-items', type=int, default=DEFAULT_ACTIVE_ITEMS, help='Active listings per card')
+    parser.add_argument('--payloads', help='Directory of recorded sold.json / active.json responses to serve instead')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for synthetic listings and failures')
+
+def mock_from_args(args: argparse.Namespace) -> MockEbay:
+    return MockEbay(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                    throttle_rate=args.throttle_rate, sold_items=args.sold_items,
+                    active_items=args.active_items, payload_dir=args.payloads, seed=args.seed)
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a mock eBay API for offline testing')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    print(f"Mock eBay API on http://{args.host}:{args.port} (set EBAY_API_BASE to this)")
+    web.run_app(mock_from_args(args).create_app(), host=args.host, port=args.port, print=None)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import os
+import csv
+import gzip
+import json
+from typing import Any, Dict, List, Optional, Sequence
+
+# Optional dependencies: zstandard for .zst files, pyarrow for Parquet
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Rows buffered per Parquet row group; bounds memory for any output size
+DEFAULT_ROW_GROUP_SIZE = 10000
+
+def compression_for(path: str) -> Optional[str]:
+    """Compression implied by a file name: 'gzip', 'zstd' or None"""
+    lowered = path.lower()
+    if lowered.endswith(".gz"):
+        return "gzip"
+    if lowered.endswith(".zst"):
+        return "zstd"
+    return None
+
+def format_for(path: str) -> str:
+    """Output format implied by a file name: 'csv', 'ndjson' or 'parquet'"""
+    lowered = path.lower()
+    if compression_for(lowered):
+        lowered = lowered.rsplit(".", 1)[0]
+    if lowered.endswith(".parquet"):
+        return "parquet"
+    if lowered.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return "csv"
+
+def open_text(path: str, mode: str = "r"):
+    """Open a text file, transparently (de)compressing .gz and .zst files"""
+    compression = compression_for(path)
+    if compression == "gzip":
+        return gzip.open(path, mode + "t", newline="", encoding="utf-8")
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Reading or writing .zst files requires the 'zstandard' package (pip install -r requirements.txt)")
+        return zstandard.open(path, mode + "t", newline="", encoding="utf-8")
+    return open(path, mode, newline="", encoding="utf-8")
+
+def _coerce(value: Any, column_type: str) -> Any:
+    if value is None:
+        return None
+    if column_type == "string":
+        return str(value)
+    if value == "":
+        return None
+    try:
+        return float(value) if column_type == "float" else int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+class OutputWriter:
+    """Writes batches of result rows, given as lists in column order"""
+
+    def __init__(self, path: str, columns: Sequence[str], column_types: Optional[Dict[str, str]] = None,
+                 append: bool = False):
+        self.path = path
+        self.columns = list(columns)
+        self.types = [(column_types or {}).get(column, "string") for column in self.columns]
+        self.append = append
+
+    def write_rows(self, rows: Sequence[Sequence[Any]]) -> None:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        """Push written rows to disk"""
+
+    def close(self) -> None:
+        raise NotImplementedError
+
+    def __enter__(self) -> "OutputWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+class _TextWriter(OutputWriter):
+    """Base for line-oriented formats, optionally gzip or zstd compressed"""
+
+    def __init__(self, path, columns, column_types=None, append=False):
+        super().__init__(path, columns, column_types, append)
+        has_content = append and os.path.exists(path) and os.path.getsize(path) > 0
+        # Appending to a compressed file adds a new gzip member / zstd frame, which readers handle
+        self._file = open_text(path, "a" if append else "w")
+        self._start(has_content)
+
+    def _start(self, has_content: bool) -> None:
+        pass
+
+    def flush(self) -> None:
+        self._file.flush()
+        if compression_for(self.path) is None:
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._file.close()
+
+class CsvWriter(_TextWriter):
+    def _start(self, has_content):
+        self._writer = csv.writer(self._file)
+        if not has_content:
+            self._writer.writerow(self.columns)
+
+    def write_rows(self, rows):
+        self._writer.writerows(rows)
+
+class NdjsonWriter(_TextWriter):
+    """One JSON object per line, with values typed by column"""
+
+    def write_rows(self, rows):
+        columns, types = self.columns, self.types
+        self._file.write("".join(
+            json.dumps({column: _coerce(value, column_type) for column, column_type, value in zip(columns, types, row)}) + "\n"
+            for row in rows
+        ))
+
+class ParquetWriter(OutputWriter):
+    """Typed Parquet columns, written one row group at a time"""
+
+    ARROW_TYPES = {"string": "string", "float": "float64", "int": "int64"}
+
+    def __init__(self, path, columns, column_types=None, append=False, row_group_size=DEFAULT_ROW_GROUP_SIZE):
+        super().__init__(path, columns, column_types, append)
+        if pyarrow is None:
+            raise RuntimeError("Writing Parquet files requires the 'pyarrow' package (pip install -r requirements.txt)")
+        if append and os.path.exists(path) and os.path.getsize(path) > 0:
+            raise ValueError("Parquet files cannot be appended to; write to a new file instead")
+        self.row_group_size = row_group_size
+        self.schema = pyarrow.schema([
+            (column, getattr(pyarrow, self.ARROW_TYPES[column_type])())
+            for column, column_type in zip(self.columns, self.types)
+        ])
+        self._writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+        self._buffer: List[Sequence[Any]] = []
+
+    def write_rows(self, rows):
+        self._buffer.extend(rows)
+        if len(self._buffer) >= self.row_group_size:
+            self._write_row_group()
+
+    def _write_row_group(self):
+        if not self._buffer:
+            return
+        columns = list(zip(*self._buffer))
+        arrays = [
+            pyarrow.array([_coerce(value, column_type) for value in values], type=field.type)
+            for values, column_type, field in zip(columns, self.types, self.schema)
+        ]
+        self._writer.write_table(pyarrow.Table.from_arrays(arrays, schema=self.schema))
+        self._buffer = []
+
+    def close(self):
+        self._write_row_group()
+        self._writer.close()
+
+WRITERS = {
+    "csv": CsvWriter,
+    "ndjson": NdjsonWriter,
+    "parquet": ParquetWriter
+}
+
+def supports_append(path: str) -> bool:
+    """Whether new rows can be appended to an existing file of this format"""
+    return format_for(path) != "parquet"
+
+def create_writer(path: str, columns: Sequence[str], column_types: Optional[Dict[str, str]] = None,
+                  append: bool = False, format: Optional[str] = None) -> OutputWriter:
+    """Create a writer for the format named, or implied by the file name"""
+    format = format or format_for(path)
+    if format not in WRITERS:
+        raise ValueError(f"Unknown output format '{format}'; expected one of {', '.join(WRITERS)}")
+    return WRITERS[format](path, columns, column_types, append)
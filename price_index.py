@@ -0,0 +1,162 @@
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds a computed price is served without recomputing
+DEFAULT_MAX_AGE = 60 * 60
+
+# Seconds past which a stale price is no longer served while it is recomputed
+DEFAULT_MAX_STALE = 24 * 60 * 60
+
+DEFAULT_MAX_ENTRIES = 10000
+
+# Total weight of the entries kept; with main's weighing, sales and listings held across all cards
+DEFAULT_MAX_ITEMS = 200000
+
+# Background recomputes running at once
+DEFAULT_REFRESH_CONCURRENCY = 4
+
+class PriceIndex:
+    """Latest computed price per canonical card, served stale-while-revalidate.
+
+    A fresh entry is returned as is. A stale entry is returned immediately
+    while a recompute runs in the background, so interactive lookups never
+    wait on eBay for a card that has been priced before. Entries older than
+    max_stale, and cards never priced, are computed on the request path.
+
+    Least recently used entries are dropped beyond max_entries, or once the
+    entries' total weight passes max_items; weigh gives a value's weight
+    (1 by default), e.g. how many sales and listings it holds.
+    """
+
+    def __init__(self, max_age: float = DEFAULT_MAX_AGE, max_stale: float = DEFAULT_MAX_STALE,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, refresh_concurrency: int = DEFAULT_REFRESH_CONCURRENCY,
+                 max_items: int = DEFAULT_MAX_ITEMS, weigh: Optional[Callable[[Any], int]] = None):
+        self.max_age = max_age
+        self.max_stale = max_stale
+        self.max_entries = max_entries
+        self.max_items = max_items
+        self.refresh_concurrency = max(1, refresh_concurrency)
+        self._weigh = weigh or (lambda value: 1)
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._weights: Dict[Hashable, int] = {}
+        self.items = 0
+        self._refreshing: Dict[Hashable, asyncio.Task] = {}
+        self._refresh_slots: Optional[asyncio.Semaphore] = None
+        self.fresh_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    @classmethod
+    def from_env(cls, weigh: Optional[Callable[[Any], int]] = None) -> "PriceIndex":
+        """Create an index from PRICE_INDEX_* environment variables"""
+        return cls(
+            max_age=float(os.getenv("PRICE_INDEX_MAX_AGE", DEFAULT_MAX_AGE)),
+            max_stale=float(os.getenv("PRICE_INDEX_MAX_STALE", DEFAULT_MAX_STALE)),
+            max_entries=int(os.getenv("PRICE_INDEX_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+            refresh_concurrency=int(os.getenv("PRICE_INDEX_REFRESH_CONCURRENCY", DEFAULT_REFRESH_CONCURRENCY)),
+            max_items=int(os.getenv("PRICE_INDEX_MAX_ITEMS", DEFAULT_MAX_ITEMS)),
+            weigh=weigh
+        )
+
+    def get(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """Return (value, age in seconds) for a card, or None if it was never priced"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        value, computed_at = entry
+        return value, time.time() - computed_at
+
+    def put(self, key: Hashable, value: Any) -> None:
+        weight = self._weigh(value)
+        if weight > self.max_items:
+            # Too big to keep; evicting everything else for it would not help
+            self._remove(key)
+            return
+        self._remove(key)
+        self._entries[key] = (value, time.time())
+        self._weights[key] = weight
+        self.items += weight
+        while len(self._entries) > self.max_entries or self.items > self.max_items:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: Hashable) -> None:
+        if self._entries.pop(key, None) is not None:
+            self.items -= self._weights.pop(key)
+
+    async def lookup(self, key: Hashable, compute: Callable[[], Awaitable[Any]],
+                     max_age: Optional[float] = None) -> Tuple[Any, str, float]:
+        """Return (value, "fresh" | "stale" | "miss", age in seconds) for a card.
+
+        max_age overrides the index's freshness limit for this lookup; 0 always
+        recomputes before answering.
+        """
+        max_age = self.max_age if max_age is None else max_age
+        entry = self.get(key)
+        if entry is not None and max_age > 0:
+            value, age = entry
+            if age <= max_age:
+                self.fresh_hits += 1
+                return value, "fresh", age
+            if age <= self.max_stale:
+                self.stale_hits += 1
+                self._schedule_refresh(key, compute)
+                return value, "stale", age
+
+        self.misses += 1
+        value = await compute()
+        self.put(key, value)
+        return value, "miss", 0.0
+
+    def _schedule_refresh(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> None:
+        if key in self._refreshing:
+            return
+        if self._refresh_slots is None:
+            self._refresh_slots = asyncio.Semaphore(self.refresh_concurrency)
+        task = asyncio.ensure_future(self._refresh(key, compute))
+        self._refreshing[key] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+
+    async def _refresh(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> None:
+        async with self._refresh_slots:
+            try:
+                value = await compute()
+            except Exception as e:
+                # Keep serving the stale value; the next stale hit tries again
+                self.refresh_failures += 1
+                logger.warning("Background price refresh failed for %s: %s", key, e)
+                return
+        self.refreshes += 1
+        self.put(key, value)
+
+    def refreshing(self) -> int:
+        return len(self._refreshing)
+
+    async def shutdown(self) -> None:
+        """Cancel background recomputes and wait for them to stop"""
+        tasks = list(self._refreshing.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "items": self.items,
+            "max_age": self.max_age,
+            "max_stale": self.max_stale,
+            "fresh_hits": self.fresh_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "refreshing": self.refreshing()
+        }
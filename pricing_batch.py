@@ -0,0 +1,231 @@
+import numpy as np
+from typing import Any, Dict, List, Sequence, Tuple
+
+# Batch pricing works on ragged arrays: all cards' prices concatenated into one
+# flat `values` array, with `offsets` (length n_cards + 1) marking where each
+# card's prices start and end. Card i's prices are values[offsets[i]:offsets[i + 1]].
+# Every function below handles all cards in a fixed number of vectorized passes,
+# and gives the same results as card_pricer's filter_price_outliers, predict_price
+# and analyze_market. get_card_price does not use those helpers: it prices with its
+# own 3-sigma filter and mean.
+
+def ragged_from_lists(price_lists: Sequence[Sequence[float]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Pack per-card price lists into (values, offsets) ragged arrays"""
+    lengths = np.fromiter((len(prices) for prices in price_lists), dtype=np.int64, count=len(price_lists))
+    offsets = np.zeros(len(price_lists) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    if offsets[-1] == 0:
+        return np.zeros(0, dtype=np.float64), offsets
+    values = np.concatenate([np.asarray(prices, dtype=np.float64) for prices in price_lists])
+    return values, offsets
+
+def ragged_to_lists(values: np.ndarray, offsets: np.ndarray) -> List[List[float]]:
+    """Unpack (values, offsets) ragged arrays into per-card price lists"""
+    return [values[offsets[i]:offsets[i + 1]].tolist() for i in range(len(offsets) - 1)]
+
+def _segment_ids(offsets: np.ndarray) -> np.ndarray:
+    """Card index of every element in the flat values array"""
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+def _positions(offsets: np.ndarray) -> np.ndarray:
+    """Position of every element within its own card"""
+    total = offsets[-1]
+    return np.arange(total) - np.repeat(offsets[:-1], np.diff(offsets))
+
+def segment_sums(values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """Sum of each card's values (0 for cards with no values)"""
+    return np.bincount(_segment_ids(offsets), weights=values, minlength=len(offsets) - 1)
+
+def segment_means(values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """Mean of each card's values (0 for cards with no values)"""
+    counts = np.diff(offsets)
+    sums = segment_sums(values, offsets)
+    return np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+
+def segment_stds(values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """Population standard deviation of each card's values, like np.std"""
+    counts = np.diff(offsets)
+    means = segment_means(values, offsets)
+    deviations = values - means[_segment_ids(offsets)]
+    sq_sums = np.bincount(_segment_ids(offsets), weights=deviations * deviations, minlength=len(counts))
+    variances = np.divide(sq_sums, counts, out=np.zeros_like(sq_sums), where=counts > 0)
+    return np.sqrt(variances)
+
+def sort_within_segments(values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """Return a copy of values with each card's values sorted, in one pass over all cards"""
+    if len(values) == 0:
+        return values
+    # Sort by card first, then by price within each card
+    return values[np.lexsort((values, _segment_ids(offsets)))]
+
+def segment_percentiles(values: np.ndarray, offsets: np.ndarray, q: float,
+                        presorted: bool = False) -> np.ndarray:
+    """q-th percentile of each card's values using linear interpolation, like np.percentile"""
+    counts = np.diff(offsets)
+    result = np.zeros(len(counts), dtype=np.float64)
+    has_values = counts > 0
+    if not has_values.any():
+        return result
+
+    sorted_values = values if presorted else sort_within_segments(values, offsets)
+    starts = offsets[:-1][has_values]
+    position = (q / 100.0) * (counts[has_values] - 1)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.ceil(position).astype(np.int64)
+    fraction = position - lower
+    low_values = sorted_values[starts + lower]
+    high_values = sorted_values[starts + upper]
+    result[has_values] = low_values + (high_values - low_values) * fraction
+    return result
+
+def segment_weighted_averages(values: np.ndarray, offsets: np.ndarray, last_weight: float) -> np.ndarray:
+    """Weighted average per card with weights falling linearly from 1 to last_weight,
+    matching np.average(prices, weights=np.linspace(1, last_weight, len(prices)))"""
+    counts = np.diff(offsets)
+    ids = _segment_ids(offsets)
+    spans = np.maximum(counts - 1, 1)[ids]
+    weights = 1.0 - (1.0 - last_weight) * _positions(offsets) / spans
+    weighted_sums = np.bincount(ids, weights=values * weights, minlength=len(counts))
+    weight_sums = np.bincount(ids, weights=weights, minlength=len(counts))
+    return np.divide(weighted_sums, weight_sums, out=np.zeros_like(weighted_sums), where=weight_sums > 0)
+
+def outlier_bounds(values: np.ndarray, offsets: np.ndarray, multiplier: float = 1.5) -> Tuple[np.ndarray, np.ndarray]:
+    """Lower and upper IQR outlier bounds for every card"""
+    sorted_values = sort_within_segments(values, offsets)
+    q1 = segment_percentiles(sorted_values, offsets, 25, presorted=True)
+    q3 = segment_percentiles(sorted_values, offsets, 75, presorted=True)
+    iqr = q3 - q1
+    return q1 - multiplier * iqr, q3 + multiplier * iqr
+
+def filter_outliers(values: np.ndarray, offsets: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Drop IQR price outliers for every card at once, like filter_price_outliers.
+
+    Cards with fewer than 4 prices are left alone. If the 1.5 x IQR bounds
+    would drop more than half of a card's prices, 2.5 x IQR is used instead.
+    Returns the filtered (values, offsets) and the keep mask over the input.
+    """
+    counts = np.diff(offsets)
+    ids = _segment_ids(offsets)
+    sorted_values = sort_within_segments(values, offsets)
+    q1 = segment_percentiles(sorted_values, offsets, 25, presorted=True)
+    q3 = segment_percentiles(sorted_values, offsets, 75, presorted=True)
+    iqr = q3 - q1
+
+    checked = counts >= 4
+    multiplier = np.full(len(counts), 1.5)
+    keep = _within(values, ids, q1, q3, iqr, multiplier) | ~checked[ids]
+
+    # Fall back to the lenient multiplier where the strict one kept too little
+    kept = np.bincount(ids, weights=keep, minlength=len(counts))
+    lenient = checked & (kept < counts * 0.5)
+    if lenient.any():
+        multiplier[lenient] = 2.5
+        keep = _within(values, ids, q1, q3, iqr, multiplier) | ~checked[ids]
+
+    kept_counts = np.bincount(ids[keep], minlength=len(counts))
+    new_offsets = np.zeros_like(offsets)
+    np.cumsum(kept_counts, out=new_offsets[1:])
+    return values[keep], new_offsets, keep
+
+def _within(values, ids, q1, q3, iqr, multiplier):
+    lower = (q1 - multiplier * iqr)[ids]
+    upper = (q3 + multiplier * iqr)[ids]
+    return (values >= lower) & (values <= upper)
+
+def price_cards_batch(sale_values: np.ndarray, sale_offsets: np.ndarray,
+                      active_values: np.ndarray, active_offsets: np.ndarray,
+                      remove_outliers: bool = True) -> Dict[str, np.ndarray]:
+    """Analyze and price many cards at once from ragged sale and active-listing prices.
+
+    Sale prices must be ordered most recent first and active prices lowest first,
+    the same order the per-card predict_price expects. Returns one array per
+    field of the per-card market analysis, plus predicted_price and confidence_score.
+    """
+    sale_values = np.asarray(sale_values, dtype=np.float64)
+    active_values = np.asarray(active_values, dtype=np.float64)
+    sale_offsets = np.asarray(sale_offsets, dtype=np.int64)
+    active_offsets = np.asarray(active_offsets, dtype=np.int64)
+    if len(sale_offsets) != len(active_offsets):
+        raise ValueError("sale_offsets and active_offsets must describe the same number of cards")
+
+    if remove_outliers:
+        sale_values, sale_offsets, _ = filter_outliers(sale_values, sale_offsets)
+        active_values, active_offsets, _ = filter_outliers(active_values, active_offsets)
+
+    sale_counts = np.diff(sale_offsets)
+    active_counts = np.diff(active_offsets)
+    has_data = (sale_counts > 0) | (active_counts > 0)
+
+    # Market analysis
+    sale_means = segment_means(sale_values, sale_offsets)
+    active_means = segment_means(active_values, active_offsets)
+
+    price_trend = np.select(
+        [active_means > sale_means * 1.1, active_means < sale_means * 0.9],
+        ["increasing", "decreasing"],
+        default="stable"
+    ).astype(object)
+    supply_level = np.select(
+        [active_counts > sale_counts * 2, active_counts < sale_counts * 0.5],
+        ["high", "low"],
+        default="moderate"
+    ).astype(object)
+    bullish = (price_trend == "increasing") & (supply_level == "low")
+    bearish = (price_trend == "decreasing") & (supply_level == "high")
+    market_trend = np.select([bullish, bearish], ["bullish", "bearish"], default="neutral").astype(object)
+
+    price_trend[~has_data] = "unknown"
+    supply_level[~has_data] = "unknown"
+    market_trend[~has_data] = "unknown"
+
+    # Price prediction
+    weighted_sale = segment_weighted_averages(sale_values, sale_offsets, 0.5)
+    weighted_active = segment_weighted_averages(active_values, active_offsets, 0.7)
+    neutral_price = np.where(weighted_active > 0, (weighted_sale + weighted_active) / 2, weighted_sale)
+    predicted = np.select(
+        [bullish, bearish],
+        [np.maximum(weighted_sale, weighted_active) * 1.05, np.minimum(weighted_sale, weighted_active) * 0.95],
+        default=neutral_price
+    )
+
+    # Confidence from data volume, reduced by price dispersion
+    sale_confidence = np.minimum(1.0, sale_counts / 10)
+    active_confidence = np.minimum(1.0, active_counts / 15)
+    sale_confidence = _dispersion_adjusted(sale_confidence, sale_values, sale_offsets, sale_means)
+    active_confidence = _dispersion_adjusted(active_confidence, active_values, active_offsets, active_means)
+    confidence = sale_confidence * 0.7 + active_confidence * 0.3
+
+    predicted[~has_data] = 0.0
+    confidence[~has_data] = 0.0
+
+    return {
+        "predicted_price": np.round(predicted, 2),
+        "confidence_score": np.round(confidence, 2),
+        "market_trend": market_trend,
+        "supply_level": supply_level,
+        "price_trend": price_trend,
+        "avg_sale_price": np.round(sale_means, 2),
+        "avg_active_price": np.round(active_means, 2),
+        "active_listings_count": active_counts,
+        "recent_sales_count": sale_counts
+    }
+
+def _dispersion_adjusted(confidence, values, offsets, means):
+    counts = np.diff(offsets)
+    stds = segment_stds(values, offsets)
+    ratio = np.divide(stds, means, out=np.ones_like(stds), where=means != 0)
+    return np.where(counts > 1, confidence * (1 - np.minimum(1, ratio)), confidence)
+
+def batch_results_to_dicts(results: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """Convert batch results into one dict per card, shaped like get_card_price's output"""
+    n_cards = len(results["predicted_price"])
+    analysis_fields = [name for name in results if name not in ("predicted_price", "confidence_score")]
+    columns = {name: results[name].tolist() for name in results}
+    return [
+        {
+            "predicted_price": columns["predicted_price"][i],
+            "confidence_score": columns["confidence_score"][i],
+            "market_analysis": {name: columns[name][i] for name in analysis_fields}
+        }
+        for i in range(n_cards)
+    ]
@@ -1,6 +1,11 @@
 import asyncio
 import argparse
+import logging
+from contextlib import nullcontext
+from adaptive_concurrency import DEFAULT_MAX_LIMIT, DEFAULT_MIN_LIMIT, parse_range
 from card_pricer import process_cards_from_csv
+from profiling import DEFAULT_PROFILE_DIR, profiling
+from shards import run_sharded
 
 async def main():
     """
@@ -13,27 +18,69 @@ async def main():
                         help='Path to output CSV file (default: card_prices.csv)')
     parser.add_argument('--concurrent', type=int, default=3, 
                         help='Maximum number of cards to process concurrently (default: 3)')
+    parser.add_argument('--adaptive', type=str, nargs='?', const=f'{DEFAULT_MIN_LIMIT}:{DEFAULT_MAX_LIMIT}',
+                        default=None, metavar='MIN:MAX',
+                        help='Adjust concurrency to eBay\'s responses within MIN:MAX, starting from --concurrent '
+                             f'(default bounds: {DEFAULT_MIN_LIMIT}:{DEFAULT_MAX_LIMIT})')
+    parser.add_argument('--log-level', type=str, default='WARNING',
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help='Logging verbosity; DEBUG shows every filter decision (default: WARNING)')
+    parser.add_argument('--trace-card', type=str, default=None,
+                        help='Print the filter trace for cards whose search query contains this text')
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip cards already written to the output by an earlier run and append the rest')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Split the input across this many processes sharing one rate limit (default: 1)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Capture a CPU profile and per-stage memory peaks of the run (single process only)')
+    parser.add_argument('--profile-dir', type=str, default=DEFAULT_PROFILE_DIR,
+                        help=f'Directory for --profile output (default: {DEFAULT_PROFILE_DIR})')
     
     args = parser.parse_args()
+    if args.profile and args.workers > 1:
+        parser.error('--profile needs a single process; drop --workers')
+    try:
+        adaptive = parse_range(args.adaptive) if args.adaptive else None
+    except ValueError as e:
+        parser.error(str(e))
+    logging.basicConfig(level=args.log_level, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
     
     print("eBay Card Pricer - Batch Processing")
     print("===================================")
     print(f"Input file: {args.input}")
     print(f"Output file: {args.output}")
     print(f"Concurrent processing: {args.concurrent}")
+    if args.workers > 1:
+        print(f"Worker processes: {args.workers}")
     print("\nProcessing cards... This may take a while depending on the number of cards.\n")
     
     try:
-        # Process cards from CSV
-        results = await process_cards_from_csv(
-            input_csv_path=args.input,
-            output_csv_path=args.output,
-            max_concurrent=args.concurrent
-        )
+        if args.workers > 1:
+            # One process per shard; outputs are merged back into input order
+            results = await asyncio.to_thread(
+                run_sharded, args.input, args.output, args.workers, args.concurrent,
+                resume=args.resume, trace_card=args.trace_card, log_level=args.log_level,
+                adaptive=adaptive
+            )
+        else:
+            # Process cards from CSV
+            with (profiling(args.input, args.profile_dir) if args.profile else nullcontext()) as profile:
+                results = await process_cards_from_csv(
+                    input_csv_path=args.input,
+                    output_csv_path=args.output,
+                    max_concurrent=args.concurrent,
+                    trace_card=args.trace_card,
+                    resume=args.resume,
+                    adaptive=adaptive
+                )
+            if profile is not None:
+                print(f"Profile has been written to {profile.paths['cpu']} and {profile.paths['memory']}")
         
         # Print results
         print("\nProcessing complete!")
-        print(f"Total cards: {results['total_cards']}")
+        print(f"Total cards: {results['total']}")
+        if results['skipped']:
+            print(f"Skipped (already priced): {results['skipped']}")
         print(f"Successful: {results['successful']}")
         print(f"Failed: {results['failed']}")
         
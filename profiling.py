@@ -0,0 +1,157 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import cProfile
+import contextvars
+import tracemalloc
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+
+# Where profiles are written unless a directory is given
+DEFAULT_PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+# Allocation sites listed in each memory report
+TOP_ALLOCATIONS = 25
+
+class ProfileBusyError(RuntimeError):
+    """Raised when a profile is requested while another one is being captured"""
+
+class Profile:
+    """A CPU profile and tracemalloc memory report for one request or batch run.
+
+    Writes <name>.prof (cProfile stats, for pstats, snakeviz or gprof2dot),
+    <name>.tracemalloc (a tracemalloc snapshot for tracemalloc.Snapshot.load)
+    and <name>.memory.json (peak memory overall and per pricing stage, and
+    the largest allocation sites).
+
+    Both profilers are process-wide: cProfile records every coroutine run on
+    the event loop thread and tracemalloc every allocation, so a profile taken
+    on a busy server includes whatever other requests were doing meanwhile.
+    """
+
+    def __init__(self, name: str, directory: Optional[str] = None):
+        self.name = name
+        self.directory = directory or DEFAULT_PROFILE_DIR
+        self.stages: Dict[str, Dict[str, int]] = {}
+        self.paths: Dict[str, str] = {}
+        self._profiler = cProfile.Profile()
+        self._started_tracing = False
+        self._started = 0.0
+        self._elapsed = 0.0
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        tracemalloc.reset_peak()
+        self._started = time.perf_counter()
+        self._profiler.enable()
+
+    def stop(self) -> Dict[str, str]:
+        """Stop profiling and write the profile files; returns their paths by kind"""
+        return self.write(*self.finish())
+
+    def finish(self) -> Tuple[tracemalloc.Snapshot, int]:
+        """Stop profiling without writing anything; returns the memory snapshot and peak for write()"""
+        self._profiler.disable()
+        self._elapsed = time.perf_counter() - self._started
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        if self._started_tracing:
+            tracemalloc.stop()
+        return snapshot, peak
+
+    def write(self, snapshot: tracemalloc.Snapshot, peak: int) -> Dict[str, str]:
+        """Write the profile files of a finished profile; returns their paths by kind"""
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, self.name)
+        self.paths = {"cpu": f"{base}.prof", "snapshot": f"{base}.tracemalloc", "memory": f"{base}.memory.json"}
+        self._profiler.dump_stats(self.paths["cpu"])
+        snapshot.dump(self.paths["snapshot"])
+        with open(self.paths["memory"], "w") as f:
+            json.dump(self.memory_report(snapshot, peak), f, indent=2)
+        return self.paths
+
+    def memory_report(self, snapshot: tracemalloc.Snapshot, peak: int) -> Dict[str, Any]:
+        top = snapshot.statistics("lineno")[:TOP_ALLOCATIONS]
+        return {
+            "name": self.name,
+            "seconds": round(self._elapsed, 4),
+            "peak_bytes": peak,
+            "stages": self.stages,
+            "top_allocations": [
+                {"location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                 "bytes": stat.size, "count": stat.count}
+                for stat in top
+            ]
+        }
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Record the memory peak reached while a pricing stage runs.
+
+        Stages of concurrent cards overlap, and each one resets the shared
+        tracemalloc peak on entry, so per-stage peaks are approximate.
+        """
+        start, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            _, peak = tracemalloc.get_traced_memory()
+            stats = self.stages.setdefault(name, {"calls": 0, "peak_bytes": 0})
+            stats["calls"] += 1
+            stats["peak_bytes"] = max(stats["peak_bytes"], peak - start)
+
+_current_profile: contextvars.ContextVar = contextvars.ContextVar("profile", default=None)
+
+# Only one cProfile profiler can be active at a time
+_active: Optional[Profile] = None
+
+def current_profile() -> Optional[Profile]:
+    """Return the profile being captured for this task, if profiling is on"""
+    return _current_profile.get()
+
+def profile_name(label: str) -> str:
+    """A unique, file-name-safe profile name"""
+    safe = "".join(c if c.isalnum() or c in "-_" else "-" for c in label)[:40].strip("-")
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{safe}-{uuid.uuid4().hex[:6]}"
+
+@contextmanager
+def profiling(label: str, directory: Optional[str] = None) -> Iterator[Profile]:
+    """Profile the enclosed block, and the tasks it starts, writing the results on exit"""
+    global _active
+
+    if _active is not None:
+        raise ProfileBusyError(f"Profile {_active.name} is still being captured")
+    profile = Profile(profile_name(label), directory)
+    _active = profile
+    token = _current_profile.set(profile)
+    profile.start()
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+        _active = None
+        profile.stop()
+
+@asynccontextmanager
+async def async_profiling(label: str, directory: Optional[str] = None) -> AsyncIterator[Profile]:
+    """profiling() for the event loop: the profile files are written from a worker thread"""
+    global _active
+
+    if _active is not None:
+        raise ProfileBusyError(f"Profile {_active.name} is still being captured")
+    profile = Profile(profile_name(label), directory)
+    _active = profile
+    token = _current_profile.set(profile)
+    profile.start()
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+        _active = None
+        # Dumping the stats and the snapshot is slow file I/O; keep it off the loop
+        await asyncio.to_thread(profile.write, *profile.finish())
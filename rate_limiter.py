@@ -0,0 +1,253 @@
+import os
+import time
+import asyncio
+from collections import deque
+from typing import Any, Dict, Optional
+from metrics import LIMITER_WAITING, stage
+from shared_state import SharedState, shared_state_dir
+
+# Rolling window for daily quota accounting
+QUOTA_WINDOW_SECONDS = 24 * 60 * 60
+# Calls are counted in one-minute buckets so the window costs at most 1440 entries
+_QUOTA_BUCKET_SECONDS = 60
+
+# Defaults for the Browse API, which all pricing searches go through
+DEFAULT_CALLS_PER_SECOND = 2
+DEFAULT_BURST = 5
+DEFAULT_DAILY_QUOTA = 5000
+
+class TokenBucket:
+    """Token bucket for one eBay API family, with rolling daily call accounting"""
+
+    _clock = staticmethod(time.monotonic)
+
+    # Whether reserve() and refund() block on I/O and belong off the event loop
+    blocking = False
+
+    def __init__(self, calls_per_second: float, burst: int = 1, daily_quota: Optional[int] = None):
+        if calls_per_second <= 0:
+            raise ValueError("calls_per_second must be positive")
+        self.calls_per_second = calls_per_second
+        self.burst = max(1, burst)
+        self.daily_quota = daily_quota
+        self.tokens = float(self.burst)
+        self.updated = self._clock()
+        self.waiting = 0
+        self.total_wait = 0.0
+        self._calls = deque()  # [bucket_start, count] pairs
+        self._calls_in_window = 0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.calls_per_second)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """Take a token and return how long the caller must wait before using it.
+
+        The balance may go negative: each caller reserves its slot up front and
+        then sleeps on its own, so waiters never hold a lock while sleeping and
+        are served in arrival order.
+        """
+        now = self._clock()
+        self._refill(now)
+        self.tokens -= 1
+        self._record_call(time.time())
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.calls_per_second
+
+    def refund(self) -> None:
+        """Give back a reserved token that was never used, and stop counting its call"""
+        self.tokens += 1
+        self._unrecord_call()
+
+    def _record_call(self, now: float) -> None:
+        bucket = now - (now % _QUOTA_BUCKET_SECONDS)
+        if self._calls and self._calls[-1][0] == bucket:
+            self._calls[-1][1] += 1
+        else:
+            self._calls.append([bucket, 1])
+        self._calls_in_window += 1
+        self._expire_calls(now)
+
+    def _unrecord_call(self) -> None:
+        # The call may have been counted in an earlier bucket; the window total is what matters
+        if self._calls:
+            self._calls[-1][1] -= 1
+            self._calls_in_window -= 1
+            if self._calls[-1][1] <= 0:
+                self._calls.pop()
+
+    def _expire_calls(self, now: float) -> None:
+        cutoff = now - QUOTA_WINDOW_SECONDS
+        while self._calls and self._calls[0][0] + _QUOTA_BUCKET_SECONDS <= cutoff:
+            self._calls_in_window -= self._calls.popleft()[1]
+
+    def calls_in_window(self) -> int:
+        """Number of calls made in the last 24 hours"""
+        self._expire_calls(time.time())
+        return self._calls_in_window
+
+    def remaining_quota(self) -> Optional[int]:
+        """Calls left in the rolling daily quota, or None if no quota is set"""
+        if self.daily_quota is None:
+            return None
+        return max(0, self.daily_quota - self.calls_in_window())
+
+    def stats(self) -> Dict[str, Any]:
+        self._refill(self._clock())
+        return {
+            "calls_per_second": self.calls_per_second,
+            "burst": self.burst,
+            "available_tokens": round(max(self.tokens, 0.0), 2),
+            "waiting": self.waiting,
+            "total_wait_seconds": round(self.total_wait, 3),
+            "calls_last_24h": self.calls_in_window(),
+            "daily_quota": self.daily_quota,
+            "remaining_quota": self.remaining_quota()
+        }
+
+class SharedTokenBucket(TokenBucket):
+    """Token bucket whose balance and call counts live in a file shared by several processes.
+
+    Every reservation takes an exclusive lock on the state file, so batch
+    workers running in separate processes stay within one combined rate and
+    daily quota.
+    """
+
+    # Wall-clock time, since monotonic clocks are not comparable between processes
+    _clock = staticmethod(time.time)
+
+    # Every reservation locks and rewrites the state file
+    blocking = True
+
+    def __init__(self, path: str, calls_per_second: float, burst: int = 1, daily_quota: Optional[int] = None):
+        super().__init__(calls_per_second, burst, daily_quota)
+        self.state = SharedState(path)
+
+    def _load(self, state: Dict[str, Any]) -> None:
+        self.tokens = state.get("tokens", float(self.burst))
+        self.updated = state.get("updated", self._clock())
+        self._calls = deque(state.get("calls", []))
+        self._calls_in_window = sum(count for _, count in self._calls)
+
+    def _save(self, state: Dict[str, Any]) -> None:
+        state["tokens"] = self.tokens
+        state["updated"] = self.updated
+        state["calls"] = [list(entry) for entry in self._calls]
+
+    def _refill(self, now: float) -> None:
+        # Tolerate the wall clock stepping backwards
+        super()._refill(max(now, self.updated))
+
+    def reserve(self) -> float:
+        with self.state.locked() as state:
+            self._load(state)
+            delay = super().reserve()
+            self._save(state)
+        return delay
+
+    def refund(self) -> None:
+        with self.state.locked() as state:
+            self._load(state)
+            TokenBucket.refund(self)
+            self._save(state)
+
+    def calls_in_window(self) -> int:
+        with self.state.locked() as state:
+            self._load(state)
+            self._expire_calls(time.time())
+            self._save(state)
+        return self._calls_in_window
+
+    def stats(self) -> Dict[str, Any]:
+        with self.state.locked() as state:
+            self._load(state)
+        return super().stats()
+
+class RateLimiter:
+    """Token-bucket rate limiter with a separate bucket per eBay API family.
+
+    If state_dir is set, buckets are kept in files there and shared with every
+    process using the same directory.
+    """
+
+    def __init__(self, calls_per_second: float = DEFAULT_CALLS_PER_SECOND,
+                 burst: int = DEFAULT_BURST,
+                 daily_quota: Optional[int] = None,
+                 default_api: str = "browse",
+                 state_dir: Optional[str] = None):
+        self.default_api = default_api
+        self.state_dir = state_dir
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.add_bucket(default_api, calls_per_second, burst, daily_quota)
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        """Create a limiter from EBAY_RATE_* environment variables"""
+        daily_quota = os.getenv("EBAY_DAILY_QUOTA", str(DEFAULT_DAILY_QUOTA))
+        limiter = cls(
+            calls_per_second=float(os.getenv("EBAY_RATE_LIMIT", DEFAULT_CALLS_PER_SECOND)),
+            burst=int(os.getenv("EBAY_RATE_BURST", DEFAULT_BURST)),
+            daily_quota=int(daily_quota) if daily_quota else None,
+            state_dir=shared_state_dir()
+        )
+        # OAuth token requests are rare and have their own, separate limits
+        limiter.add_bucket("identity", calls_per_second=1, burst=2)
+        return limiter
+
+    def add_bucket(self, api: str, calls_per_second: float, burst: int = 1,
+                   daily_quota: Optional[int] = None) -> TokenBucket:
+        """Register (or replace) the bucket for an API family"""
+        if self.state_dir:
+            bucket = SharedTokenBucket(os.path.join(self.state_dir, f"rate_{api}.json"),
+                                       calls_per_second, burst, daily_quota)
+        else:
+            bucket = TokenBucket(calls_per_second, burst, daily_quota)
+        self.buckets[api] = bucket
+        return bucket
+
+    def bucket(self, api: Optional[str] = None) -> TokenBucket:
+        api = api or self.default_api
+        if api not in self.buckets:
+            raise KeyError(f"No rate limit bucket configured for API '{api}'")
+        return self.buckets[api]
+
+    async def acquire(self, api: Optional[str] = None) -> float:
+        """Wait until a call to the given API family is allowed; returns the time waited"""
+        api = api or self.default_api
+        bucket = self.bucket(api)
+        with stage("rate_limit_wait"):
+            if bucket.blocking:
+                # Other workers may hold the file lock; wait for it on a thread, not the event loop
+                delay = await asyncio.to_thread(bucket.reserve)
+            else:
+                delay = bucket.reserve()
+            if delay > 0:
+                bucket.waiting += 1
+                LIMITER_WAITING.inc(api=api)
+                try:
+                    await asyncio.sleep(delay)
+                except asyncio.CancelledError:
+                    # Give the unused slot back to the next caller
+                    if bucket.blocking:
+                        asyncio.get_running_loop().run_in_executor(None, bucket.refund)
+                    else:
+                        bucket.refund()
+                    raise
+                finally:
+                    bucket.waiting -= 1
+                    LIMITER_WAITING.dec(api=api)
+                bucket.total_wait += delay
+        return delay
+
+    def remaining_quota(self, api: Optional[str] = None) -> Optional[int]:
+        """Calls left in the rolling daily quota for an API family"""
+        return self.bucket(api).remaining_quota()
+
+    def total_wait(self) -> float:
+        """Seconds callers have spent waiting for a token, across every API family"""
+        return sum(bucket.total_wait for bucket in self.buckets.values())
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {api: bucket.stats() for api, bucket in self.buckets.items()}
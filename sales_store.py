@@ -0,0 +1,338 @@
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from ebay_cache import normalize_query, user_cache_dir
+from shared_state import DIR_MODE
+
+DEFAULT_SALES_DB_PATH = os.path.join(user_cache_dir(), "ebay_sales.sqlite3")
+
+# How far back pricing reads stored sales; eBay itself only returns the last 90 days
+DEFAULT_HISTORY_DAYS = 90
+
+# Items per page when only sales newer than a card's watermark are requested;
+# a refresh of a card priced recently usually fits in one small page
+INCREMENTAL_PAGE_SIZE = int(os.getenv("EBAY_SOLD_INCREMENTAL_PAGE_SIZE", 50))
+
+_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.000Z"
+
+# Watermark scope of the CLI's sold search. The CLI and the API search eBay
+# differently, so one moving the other's watermark would skip sales it never saw
+CLI_SALES_SCOPE = "cli:"
+
+def api_sales_scope(condition: Optional[str]) -> str:
+    """Watermark scope of the API's sold search for a condition filter"""
+    return f"api:{condition or ''}"
+
+def card_key(search_query: str) -> str:
+    """Canonical identity for a card: its normalized search query"""
+    return normalize_query(search_query)
+
+def normalize_sale_date(value: Optional[str]) -> str:
+    """Convert an ISO 8601 timestamp to sortable UTC text (2024-01-31T12:34:56.000Z)"""
+    if not value:
+        return datetime.now(timezone.utc).strftime(_DATE_FORMAT)
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return value
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).strftime(_DATE_FORMAT)
+
+def sale_item_id(sale: Dict[str, Any]) -> str:
+    """eBay item ID of a sale, or a stable stand-in for items that have none"""
+    if sale.get("item_id"):
+        return str(sale["item_id"])
+    fingerprint = f"{sale.get('title', '')}|{sale.get('sale_date', '')}|{sale.get('price', '')}"
+    return "nohash:" + hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()
+
+class SalesStore:
+    """SQLite store of every sold item observed per card, deduplicated by eBay item ID"""
+
+    def __init__(self, path: str = DEFAULT_SALES_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), mode=DIR_MODE, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sales ("
+            " card_key TEXT NOT NULL,"
+            " item_id TEXT NOT NULL,"
+            " sale_date TEXT NOT NULL,"
+            " price REAL NOT NULL,"
+            " condition TEXT,"
+            " condition_id TEXT,"
+            " title TEXT,"
+            " first_seen REAL NOT NULL,"
+            " PRIMARY KEY (card_key, item_id))"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_sales_card_date ON sales (card_key, sale_date)"
+        )
+        # Newest sale seen per card and search scope (e.g. a condition filter)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS watermarks ("
+            " card_key TEXT NOT NULL,"
+            " scope TEXT NOT NULL,"
+            " sale_date TEXT NOT NULL,"
+            " item_id TEXT,"
+            " refreshed_at REAL NOT NULL,"
+            " PRIMARY KEY (card_key, scope))"
+        )
+
+    @classmethod
+    def from_env(cls) -> Optional["SalesStore"]:
+        """Create a store from EBAY_SALES_DB, or None if it is set empty"""
+        path = os.getenv("EBAY_SALES_DB", DEFAULT_SALES_DB_PATH)
+        if not path:
+            return None
+        return cls(os.path.expanduser(path))
+
+    def add_sales(self, card: str, sales: Iterable[Dict[str, Any]],
+                  watermark: Optional[Tuple[str, str, Optional[str]]] = None) -> int:
+        """Record sales for a card, ignoring items already stored; returns how many were new.
+
+        watermark=(scope, sale_date, item_id) also sets that scope's watermark
+        in the same transaction, so it never moves past sales that were not saved.
+        """
+        now = time.time()
+        rows = [
+            (
+                card_key(card),
+                sale_item_id(sale),
+                normalize_sale_date(sale.get("sale_date")),
+                float(sale["price"]),
+                sale.get("condition"),
+                sale.get("condition_id"),
+                sale.get("title", ""),
+                now
+            )
+            for sale in sales
+        ]
+        if not rows and watermark is None:
+            return 0
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                before = self._conn.total_changes
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO sales "
+                    "(card_key, item_id, sale_date, price, condition, condition_id, title, first_seen) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                added = self._conn.total_changes - before
+                if watermark is not None:
+                    scope, sale_date, item_id = watermark
+                    self._write_watermark(card, scope, sale_date, item_id, now)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return added
+
+    def get_sales(self, card: str, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                  limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return a card's stored sales, most recent first"""
+        sql = "SELECT item_id, sale_date, price, condition, condition_id, title FROM sales WHERE card_key = ?"
+        args: List[Any] = [card_key(card)]
+        if since is not None:
+            sql += " AND sale_date >= ?"
+            args.append(since.astimezone(timezone.utc).strftime(_DATE_FORMAT))
+        if until is not None:
+            sql += " AND sale_date <= ?"
+            args.append(until.astimezone(timezone.utc).strftime(_DATE_FORMAT))
+        sql += " ORDER BY sale_date DESC, item_id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+        return [
+            {
+                "item_id": item_id,
+                "sale_date": sale_date,
+                "price": price,
+                "condition": condition,
+                "condition_id": condition_id,
+                "title": title
+            }
+            for item_id, sale_date, price, condition, condition_id, title in rows
+        ]
+
+    def known_item_ids(self, card: str, item_ids: Iterable[str]) -> Set[str]:
+        """Return which of the given item IDs are already stored for a card"""
+        item_ids = [str(item_id) for item_id in item_ids if item_id]
+        if not item_ids:
+            return set()
+        placeholders = ",".join("?" * len(item_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT item_id FROM sales WHERE card_key = ? AND item_id IN ({placeholders})",
+                [card_key(card), *item_ids]
+            ).fetchall()
+        return {item_id for (item_id,) in rows}
+
+    def get_watermark(self, card: str, scope: str = "") -> Optional[Dict[str, Any]]:
+        """Return the newest sale seen for a card and scope, or None if it was never fetched"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT sale_date, item_id, refreshed_at FROM watermarks WHERE card_key = ? AND scope = ?",
+                (card_key(card), scope)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"sale_date": row[0], "item_id": row[1], "refreshed_at": row[2]}
+
+    def set_watermark(self, card: str, scope: str, sale_date: str, item_id: Optional[str]) -> None:
+        """Record the newest sale seen for a card and scope"""
+        with self._lock:
+            self._write_watermark(card, scope, sale_date, item_id, time.time())
+
+    def _write_watermark(self, card: str, scope: str, sale_date: str, item_id: Optional[str], now: float) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO watermarks (card_key, scope, sale_date, item_id, refreshed_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (card_key(card), scope, normalize_sale_date(sale_date), item_id, now)
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Return how many cards and sales are stored"""
+        with self._lock:
+            cards, sales, oldest = self._conn.execute(
+                "SELECT COUNT(DISTINCT card_key), COUNT(*), MIN(sale_date) FROM sales"
+            ).fetchone()
+        return {"cards": cards, "sales": sales, "oldest_sale": oldest}
+
+    def clear(self) -> None:
+        """Remove every stored sale"""
+        with self._lock:
+            self._conn.execute("DELETE FROM sales")
+            self._conn.execute("DELETE FROM watermarks")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+class SoldRefresh:
+    """Incremental refresh of one card's sold items, driven by its stored watermark.
+
+    A card that has been fetched before only needs sales that closed after its
+    watermark: the search starts at the watermark's date, reads small pages
+    newest first, and stops at the first page reaching the watermark. Only
+    this scope's own watermark counts, since sales stored by a search with a
+    different condition filter say nothing about what this search has seen.
+    Cards never seen before (or with no store) get the usual full-window scan.
+    """
+
+    def __init__(self, store: Optional[SalesStore], card: str, scope: str = ""):
+        self.store = store
+        self.card = card
+        self.scope = scope
+        self.watermark = store.get_watermark(card, scope) if store is not None else None
+        self.newest: Optional[tuple] = None
+        self.pages = 0
+        self.items = 0
+        self.reached_watermark = False
+
+    @property
+    def incremental(self) -> bool:
+        return self.watermark is not None
+
+    @property
+    def kind(self) -> str:
+        """Search cache kind: incremental searches get their own, shorter TTL"""
+        return "sold_new" if self.incremental else "sold"
+
+    def start_date(self, window_start: datetime) -> datetime:
+        """Start of the sold date range: the watermark, bounded by the full window"""
+        if not self.incremental:
+            return window_start
+        try:
+            mark = datetime.strptime(self.watermark["sale_date"], _DATE_FORMAT).replace(tzinfo=timezone.utc)
+        except ValueError:
+            return window_start
+        if window_start.tzinfo is None:
+            mark = mark.replace(tzinfo=None)
+        return max(window_start, mark)
+
+    def page_options(self) -> Dict[str, Any]:
+        """Pagination settings for iter_search_pages"""
+        if not self.incremental:
+            return {}
+        # No prefetch: the next page is usually not needed once a known item shows up
+        return {"page_size": INCREMENTAL_PAGE_SIZE, "prefetch": False}
+
+    def see_page(self, items: List[Dict[str, Any]]) -> bool:
+        """Note a page of raw search results; returns True once pagination can stop"""
+        self.pages += 1
+        self.items += len(items)
+        watermark = (self.watermark["sale_date"], self.watermark["item_id"] or "") if self.incremental else None
+        reached = False
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            sale_date = item.get("itemEndDate") or item.get("soldDate")
+            if sale_date:
+                mark = (normalize_sale_date(sale_date), str(item.get("itemId") or ""))
+                if self.newest is None or mark > self.newest:
+                    self.newest = mark
+                # Results are newest first, so the rest of the search is older than this scope's watermark
+                if watermark is not None and mark <= watermark:
+                    reached = True
+        self.reached_watermark = self.reached_watermark or reached
+        return reached
+
+    def advanced_watermark(self, max_items: Optional[int] = None) -> Optional[Tuple[str, str, Optional[str]]]:
+        """The (scope, sale_date, item_id) watermark to save with this refresh's sales, or None to keep the old one.
+
+        max_items is the cap pagination ran under: an incremental refresh that
+        hit it before reaching the old watermark left a gap of unread sales, and
+        moving the watermark past them would skip them for good.
+        """
+        if self.store is None:
+            return None
+        if (self.incremental and not self.reached_watermark
+                and max_items is not None and self.items >= max_items):
+            return None
+        newest = self.newest
+        if self.watermark is not None:
+            previous = (self.watermark["sale_date"], self.watermark["item_id"] or "")
+            newest = max(newest, previous) if newest is not None else previous
+        if newest is None:
+            # Nothing sold yet; still remember the card so the next refresh starts from now
+            newest = (datetime.now(timezone.utc).strftime(_DATE_FORMAT), "")
+        return self.scope, newest[0], newest[1] or None
+
+def history_days() -> int:
+    """Days of stored sales used for pricing (EBAY_SALES_HISTORY_DAYS)"""
+    return int(os.getenv("EBAY_SALES_HISTORY_DAYS", DEFAULT_HISTORY_DAYS))
+
+# Lazily created shared store
+_sales_store = None
+_sales_store_loaded = False
+
+def get_sales_store() -> Optional[SalesStore]:
+    """Return the process-wide sales store configured from the environment"""
+    global _sales_store, _sales_store_loaded
+
+    if not _sales_store_loaded:
+        _sales_store = SalesStore.from_env()
+        _sales_store_loaded = True
+    return _sales_store
+
+def set_sales_store(store: Optional[SalesStore]) -> None:
+    """Replace the process-wide sales store (None disables it)"""
+    global _sales_store, _sales_store_loaded
+
+    _sales_store = store
+    _sales_store_loaded = True
@@ -0,0 +1,164 @@
+import os
+import csv
+import heapq
+import shutil
+import asyncio
+import logging
+import tempfile
+import itertools
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from checkpoint import journal_path_for
+from output_writers import create_writer
+from shared_state import DIR_MODE
+
+# Rows handed to the output writer at a time while merging
+MERGE_BATCH_ROWS = 1000
+
+# Rows sorted in memory at a time while merging; shards are sorted in runs of this size on disk
+SORT_RUN_ROWS = 100000
+
+logger = logging.getLogger(__name__)
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """Parse an "i/n" shard spec (0-based index i of n shards)"""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f"Shard must look like i/n, got '{value}'")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Shard index must be between 0 and {count - 1}, got '{value}'")
+    return index, count
+
+def shard_output_path(output_csv_path: str, index: int, count: int) -> str:
+    """Where shard i of n writes its rows"""
+    return f"{output_csv_path}.shard-{index}-of-{count}"
+
+def merge_shard_outputs(output_csv_path: str, count: int, remove: bool = False,
+                        column_types: Optional[Dict[str, str]] = None) -> int:
+    """Merge the n shard files into the final output in input row order; returns rows written.
+
+    Shards are always plain CSV; the final output may be any format
+    create_writer supports, chosen by its file name.
+
+    Each shard is sorted by input row index in runs of SORT_RUN_ROWS rows
+    written to temporary files, and all runs are merged lazily by that
+    index, so memory stays bounded and the result does not depend on which
+    worker finished first.
+    """
+    # Sorted runs go next to the output, which has room for a copy of it
+    run_dir = tempfile.mkdtemp(prefix=".merge-", dir=os.path.dirname(os.path.abspath(output_csv_path)))
+    try:
+        header = None
+        run_paths: List[str] = []
+        for index in range(count):
+            path = shard_output_path(output_csv_path, index, count)
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Missing output for shard {index}/{count}: {path}")
+            shard_header = _write_sorted_runs(path, run_dir, run_paths)
+            header = header or (shard_header[1:] if shard_header else None)
+
+        written = 0
+        with contextlib.ExitStack() as stack:
+            runs = [csv.reader(stack.enter_context(open(run_path, 'r', newline=''))) for run_path in run_paths]
+            with create_writer(output_csv_path, header or [], column_types) as writer:
+                batch = []
+                for row in heapq.merge(*runs, key=_row_index):
+                    batch.append(row[1:])
+                    if len(batch) >= MERGE_BATCH_ROWS:
+                        writer.write_rows(batch)
+                        written += len(batch)
+                        batch = []
+                writer.write_rows(batch)
+                written += len(batch)
+    finally:
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+    if remove:
+        for index in range(count):
+            path = shard_output_path(output_csv_path, index, count)
+            for leftover in (path, journal_path_for(path)):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+    return written
+
+def _row_index(row: List[str]) -> int:
+    return int(row[0])
+
+def _write_sorted_runs(path: str, run_dir: str, run_paths: List[str]) -> Optional[List[str]]:
+    """Split a shard file into runs sorted by input row index; returns the shard's header"""
+    # Workers write rows as cards finish (and resumed runs append later), so shards are not in input order
+    with open(path, 'r', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        while True:
+            run = list(itertools.islice(reader, SORT_RUN_ROWS))
+            if not run:
+                break
+            run.sort(key=_row_index)
+            run_path = os.path.join(run_dir, f"run-{len(run_paths)}.csv")
+            with open(run_path, 'w', newline='') as out:
+                csv.writer(out).writerows(run)
+            run_paths.append(run_path)
+    return header
+
+def _run_shard(input_csv_path: str, output_csv_path: str, max_concurrent: int,
+               index: int, count: int, resume: bool, trace_card: Optional[str],
+               log_level: str, adaptive: Optional[Tuple[int, int]] = None) -> Dict[str, Any]:
+    """Entry point for one worker process"""
+    logging.basicConfig(level=log_level, format=f'%(asctime)s %(levelname)s shard {index}/{count} %(name)s: %(message)s')
+    # Imported here so each spawned process builds its own session, limiter and loop
+    from card_pricer import process_cards_from_csv
+    return asyncio.run(process_cards_from_csv(
+        input_csv_path,
+        shard_output_path(output_csv_path, index, count),
+        max_concurrent,
+        trace_card=trace_card,
+        resume=resume,
+        shard=(index, count),
+        adaptive=adaptive
+    ))
+
+def run_sharded(input_csv_path: str, output_csv_path: str, workers: int, max_concurrent: int = 3,
+                resume: bool = False, trace_card: Optional[str] = None,
+                log_level: str = "WARNING", adaptive: Optional[Tuple[int, int]] = None) -> Dict[str, Any]:
+    """Price the input in `workers` processes, one shard each, then merge their outputs.
+
+    The workers share one rate limit and OAuth token through files in
+    EBAY_SHARED_STATE_DIR (next to the output unless already set). Shard files
+    are removed after a clean run; if any card failed they are kept so a
+    --resume run only retries the missing cards. With adaptive=(min, max)
+    each worker adjusts its own concurrency within those bounds.
+    """
+    state_dir = os.getenv("EBAY_SHARED_STATE_DIR") or f"{output_csv_path}.state"
+    # Holds the shared OAuth token, so keep it private to the user running the batch
+    os.makedirs(state_dir, mode=DIR_MODE, exist_ok=True)
+    os.environ["EBAY_SHARED_STATE_DIR"] = state_dir
+
+    # Spawn rather than fork so no event loop or open connection is inherited
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        futures = [
+            executor.submit(_run_shard, input_csv_path, output_csv_path, max_concurrent,
+                            index, workers, resume, trace_card, log_level, adaptive)
+            for index in range(workers)
+        ]
+        shard_results = [future.result() for future in futures]
+
+    results = {
+        'total': sum(r['total'] for r in shard_results),
+        'skipped': sum(r['skipped'] for r in shard_results),
+        'successful': sum(r['successful'] for r in shard_results),
+        'failed': sum(r['failed'] for r in shard_results),
+        'errors': [error for r in shard_results for error in r['errors']],
+        # Workers share one quota, so the lowest count is the most recent
+        'remaining_quota': min((r['remaining_quota'] for r in shard_results if r.get('remaining_quota') is not None), default=None)
+    }
+    from card_pricer import OUTPUT_COLUMN_TYPES
+    results['merged'] = merge_shard_outputs(output_csv_path, workers, remove=not results['failed'],
+                                            column_types=OUTPUT_COLUMN_TYPES)
+    logger.info("Merged %d rows from %d shards into %s", results['merged'], workers, output_csv_path)
+    return results
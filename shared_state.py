@@ -0,0 +1,74 @@
+import os
+import json
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+def shared_state_dir() -> Optional[str]:
+    """Directory for state shared between batch worker processes, if configured"""
+    return os.getenv("EBAY_SHARED_STATE_DIR") or None
+
+# Shared state includes the OAuth token, so only the owner may read it
+FILE_MODE = 0o600
+DIR_MODE = 0o700
+
+class SharedState:
+    """A small JSON document that several processes read and update under an exclusive file lock.
+
+    Locking blocks, so async code should call locked(), read() and update()
+    through asyncio.to_thread rather than on the event loop.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), mode=DIR_MODE, exist_ok=True)
+
+    @contextmanager
+    def locked(self) -> Iterator[Dict[str, Any]]:
+        """Hold the lock and yield the current state; changes to the dict are saved on exit"""
+        with os.fdopen(os.open(self.path, os.O_RDWR | os.O_CREAT, FILE_MODE), "r+") as f:
+            _lock(f)
+            try:
+                f.seek(0)
+                raw = f.read()
+                try:
+                    state = json.loads(raw) if raw else {}
+                except ValueError:
+                    # A torn write from a killed process; start from a clean slate
+                    state = {}
+                yield state
+                updated = json.dumps(state)
+                if updated != raw:
+                    f.seek(0)
+                    f.truncate()
+                    f.write(updated)
+                    f.flush()
+            finally:
+                _unlock(f)
+
+    def read(self) -> Dict[str, Any]:
+        with self.locked() as state:
+            return dict(state)
+
+    def update(self, values: Dict[str, Any]) -> None:
+        with self.locked() as state:
+            state.update(values)
+
+def _lock(f) -> None:
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+def _unlock(f) -> None:
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,150 @@
+import asyncio
+import csv
+import pytest
+import card_pricer
+import ebay_search
+from adaptive_concurrency import AdaptiveConcurrency, current_concurrency, parse_range
+from batch_pipeline import run_pipeline
+from ebay_cache import set_search_cache
+from ebay_transport import set_transport
+from mock_ebay import MockEbay, MockEbayServer, OAUTH_PATH, SEARCH_PATH
+from sales_store import set_sales_store
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(AdaptiveConcurrency, "_clock", staticmethod(fake))
+    return fake
+
+def test_limit_grows_only_while_every_slot_is_busy():
+    limit = AdaptiveConcurrency(initial=2, min_limit=1, max_limit=3)
+
+    # Idle slots: healthy responses are no reason to grow
+    for _ in range(10):
+        limit.observe(200, 0.1)
+    assert limit.limit == 2
+
+    limit.in_flight = 2
+    limit.observe(200, 0.1)
+    limit.observe(200, 0.1)
+    assert limit.limit == 3
+    limit.in_flight = 3
+    for _ in range(10):
+        limit.observe(200, 0.1)
+    assert limit.limit == 3
+    assert limit.increases == 1
+
+def test_throttling_halves_the_limit_once_per_round_trip(clock):
+    limit = AdaptiveConcurrency(initial=16, min_limit=2, max_limit=32)
+    limit.observe(200, 0.5)
+
+    limit.observe(429, 0.1)
+    limit.observe(429, 0.1)
+    assert limit.limit == 8
+
+    clock.now += 1.0
+    limit.observe(503, 0.1)
+    assert limit.limit == 4
+    clock.now += 1.0
+    limit.observe(429, 0.1)
+    clock.now += 1.0
+    limit.observe(429, 0.1)
+    assert limit.limit == 2
+    assert limit.stats()["throttled"] == 4
+    assert limit.stats()["server_errors"] == 1
+
+def test_rising_latency_trims_the_limit(clock):
+    limit = AdaptiveConcurrency(initial=10, min_limit=1, max_limit=32)
+    limit.in_flight = 10
+    for _ in range(10):
+        limit.observe(200, 0.1)
+    assert limit.limit == 11
+
+    limit.in_flight = 11
+    for _ in range(11):
+        limit.observe(200, 1.0)
+    assert limit.limit == 9
+
+def test_client_errors_are_ignored():
+    limit = AdaptiveConcurrency(initial=4)
+    limit.observe(404, 0.1)
+    assert limit.limit == 4 and limit.decreases == 0
+
+def test_parse_range():
+    assert parse_range("2:16") == (2, 16)
+    for text in ("16", "0:4", "8:4", "a:b"):
+        with pytest.raises(ValueError):
+            parse_range(text)
+
+@pytest.mark.asyncio
+async def test_pipeline_runs_at_most_the_current_limit():
+    limit = AdaptiveConcurrency(initial=2, min_limit=1, max_limit=8)
+    in_flight = 0
+    most = 0
+    seen = []
+
+    async def process(row):
+        nonlocal in_flight, most
+        in_flight += 1
+        most = max(most, in_flight)
+        seen.append(current_concurrency())
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return row
+
+    written = []
+    await run_pipeline(range(20), process, written.extend, concurrency=limit)
+
+    assert sorted(written) == list(range(20))
+    assert most == 2
+    assert all(found is limit for found in seen)
+    assert limit.in_flight == 0
+
+@pytest.mark.asyncio
+async def test_raising_the_limit_releases_waiting_cards():
+    limit = AdaptiveConcurrency(initial=1, min_limit=1, max_limit=4)
+    await limit.acquire()
+    waiters = [asyncio.ensure_future(limit.acquire()) for _ in range(2)]
+    await asyncio.sleep(0)
+    assert not any(waiter.done() for waiter in waiters)
+
+    limit._set_limit(3)
+    await asyncio.gather(*waiters)
+    assert limit.in_flight == 3
+
+@pytest.mark.asyncio
+async def test_batch_backs_off_when_ebay_throttles(monkeypatch, tmp_path):
+    server = MockEbayServer(MockEbay(throttle_rate=0.3, sold_items=10, active_items=5, seed=1))
+    await server.start()
+    monkeypatch.setattr(ebay_search, "EBAY_SEARCH_URL", server.base_url + SEARCH_PATH)
+    monkeypatch.setattr(card_pricer, "EBAY_OAUTH_URL", server.base_url + OAUTH_PATH)
+    monkeypatch.setattr(card_pricer, "_oauth_token", "mock-access-token")
+    monkeypatch.setattr(card_pricer, "_token_expiry", None)
+    monkeypatch.setattr(card_pricer, "_token_lock", None)
+    set_search_cache(None)
+    set_sales_store(None)
+    set_transport(None)
+
+    cards = tmp_path / "cards.csv"
+    with open(cards, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["brand", "set_name", "year", "player_name", "condition"])
+        for i in range(30):
+            writer.writerow(["Topps", "Chrome", "2020", f"Player {i}", ""])
+
+    try:
+        results = await card_pricer.process_cards_from_csv(str(cards), str(tmp_path / "out.csv"), 8, adaptive=(1, 16))
+    finally:
+        await server.close()
+
+    assert results["successful"] + results["failed"] == 30
+    assert results["concurrency"]["throttled"] > 0
+    assert results["concurrency"]["decreases"] > 0
+    assert results["concurrency"]["limit"] < 8
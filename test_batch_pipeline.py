@@ -0,0 +1,107 @@
+import asyncio
+import csv
+import pytest
+from batch_pipeline import run_pipeline
+import card_pricer
+
+@pytest.mark.asyncio
+async def test_every_result_is_written_in_batches():
+    written = []
+
+    async def process(row):
+        await asyncio.sleep(0)
+        return row * 10
+
+    stats = await run_pipeline(range(25), process, lambda rows: written.append(list(rows)),
+                               workers=4, flush_rows=10, flush_interval=60)
+
+    assert sorted(value for batch in written for value in batch) == [i * 10 for i in range(25)]
+    assert [len(batch) for batch in written] == [10, 10, 5]
+    assert stats == {"read": 25, "written": 25, "flushes": 3}
+
+@pytest.mark.asyncio
+async def test_none_results_are_not_written():
+    written = []
+
+    async def process(row):
+        return row if row % 2 else None
+
+    stats = await run_pipeline(range(10), process, written.extend, workers=2)
+
+    assert sorted(written) == [1, 3, 5, 7, 9]
+    assert stats["read"] == 10 and stats["written"] == 5
+
+@pytest.mark.asyncio
+async def test_slow_trickle_is_flushed_on_interval():
+    flushes = []
+
+    async def process(row):
+        await asyncio.sleep(0.03)
+        return row
+
+    await run_pipeline(range(4), process, lambda rows: flushes.append(len(rows)),
+                       workers=1, flush_rows=100, flush_interval=0.01)
+
+    # Rows are written as they arrive rather than held for a full batch
+    assert len(flushes) >= 3
+    assert sum(flushes) == 4
+
+@pytest.mark.asyncio
+async def test_reader_stays_a_bounded_distance_ahead():
+    in_flight = 0
+    peak = 0
+
+    def rows():
+        nonlocal in_flight, peak
+        for i in range(200):
+            in_flight += 1
+            peak = max(peak, in_flight)
+            yield i
+
+    async def process(row):
+        nonlocal in_flight
+        await asyncio.sleep(0)
+        in_flight -= 1
+        return row
+
+    await run_pipeline(rows(), process, lambda rows: None, workers=3, queue_size=5)
+
+    # Queue plus one row per worker plus the one the reader is holding
+    assert peak <= 5 + 3 + 1
+
+@pytest.mark.asyncio
+async def test_worker_error_stops_pipeline_but_keeps_written_rows():
+    written = []
+
+    async def process(row):
+        if row == 5:
+            raise RuntimeError("boom")
+        return row
+
+    with pytest.raises(RuntimeError, match="boom"):
+        await run_pipeline(range(100), process, written.extend, workers=1, flush_rows=100)
+
+    assert written == [0, 1, 2, 3, 4]
+
+@pytest.mark.asyncio
+async def test_process_cards_from_csv_streams_to_output(tmp_path, fake_pricer):
+    input_path = tmp_path / "cards.csv"
+    output_path = tmp_path / "prices.csv"
+    with open(input_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["brand", "set_name", "year", "condition", "player_name"])
+        for i in range(12):
+            writer.writerow(["Topps", "Chrome", "2020", "Ungraded", f" Player {i} "])
+        writer.writerow(["Topps", "Chrome", "2020", "Ungraded", "Broken"])
+
+    fake_pricer.failing.add("Broken")
+    results = await card_pricer.process_cards_from_csv(str(input_path), str(output_path), max_concurrent=3)
+
+    assert results["total"] == 13
+    assert results["successful"] == 12
+    assert results["failed"] == 1
+
+    with open(output_path, newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == card_pricer.OUTPUT_COLUMNS
+    assert sorted(row[3] for row in rows[1:]) == sorted(f"Player {i}" for i in range(12))
@@ -0,0 +1,70 @@
+import csv
+import pytest
+import card_pricer
+from checkpoint import CheckpointJournal, card_key, journal_path_for, keyed_cards
+
+def test_card_key_ignores_case_whitespace_and_row_order():
+    a = {"brand": "Topps", "set_name": "Chrome", "year": "2020", "player_name": "Mike  Trout"}
+    b = {"player_name": "mike trout", "year": "2020", "set_name": "CHROME ", "brand": "topps", "card_number": ""}
+    assert card_key(a) == card_key(b)
+    assert card_key(a) != card_key(dict(a, card_number="27"))
+
+def test_repeated_cards_get_distinct_keys():
+    card = {"brand": "Topps", "set_name": "Chrome", "year": "2020"}
+    keys = [key for key, _ in keyed_cards([card, dict(card, year="2021"), card])]
+    assert keys[0] != keys[1]
+    assert keys[2] == keys[0] + "#2"
+
+def test_journal_survives_reopen_and_ignores_torn_line(tmp_path):
+    path = str(tmp_path / "out.csv.journal")
+    with CheckpointJournal(path).open() as journal:
+        journal.mark_done(["a", "b"])
+    with open(path, "a") as f:
+        f.write("c")  # crash mid-write
+
+    with CheckpointJournal(path).open(resume=True) as journal:
+        assert journal.is_done("a") and journal.is_done("b")
+        assert not journal.is_done("c")
+
+    # Starting over without resume forgets earlier progress
+    with CheckpointJournal(path).open() as journal:
+        assert not journal.is_done("a")
+
+def _write_cards(path, players):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["brand", "set_name", "year", "condition", "player_name"])
+        for player in players:
+            writer.writerow(["Topps", "Chrome", "2020", "Ungraded", player])
+
+@pytest.mark.asyncio
+async def test_resume_only_prices_missing_cards(tmp_path, fake_pricer):
+    input_path = str(tmp_path / "cards.csv")
+    output_path = str(tmp_path / "prices.csv")
+    players = [f"Player {i}" for i in range(10)]
+    _write_cards(input_path, players)
+
+    # First run fails part way through the file
+    fake_pricer.failing.update({"Player 3", "Player 7"})
+    first = await card_pricer.process_cards_from_csv(input_path, output_path, max_concurrent=2)
+    assert first["successful"] == 8 and first["failed"] == 2
+
+    # The rerun only spends calls on the cards that did not finish
+    fake_pricer.calls.clear()
+    fake_pricer.failing.clear()
+    second = await card_pricer.process_cards_from_csv(input_path, output_path, max_concurrent=2, resume=True)
+    assert sorted(fake_pricer.calls) == ["Player 3", "Player 7"]
+    assert second["total"] == 10
+    assert second["skipped"] == 8
+    assert second["successful"] == 2
+
+    with open(output_path, newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == card_pricer.OUTPUT_COLUMNS
+    assert sorted(row[3] for row in rows[1:]) == sorted(players)
+
+    # A run without --resume starts over
+    fake_pricer.calls.clear()
+    await card_pricer.process_cards_from_csv(input_path, output_path, max_concurrent=2)
+    assert len(fake_pricer.calls) == 10
+    assert journal_path_for(output_path) == output_path + ".journal"
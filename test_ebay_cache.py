@@ -0,0 +1,73 @@
+import os
+import time
+import pytest
+from ebay_cache import SearchCache, normalize_filter, normalize_query, user_cache_dir
+
+SOLD_FILTER = "soldItemsFilter:{soldDateRange:{startDate:'2024-01-01T10:15:00.000Z',endDate:'2024-03-31T10:15:00.000Z'}}"
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = SearchCache(str(tmp_path / "cache.sqlite3"), ttls={"sold": 60, "active": 60}, max_entries=3)
+    yield cache
+    cache.close()
+
+def test_normalize_query():
+    assert normalize_query("  Topps   CHROME 2020 ") == "topps chrome 2020"
+
+def test_normalize_filter_drops_time_of_day():
+    later = SOLD_FILTER.replace("10:15:00", "18:42:07")
+    assert normalize_filter(SOLD_FILTER) == normalize_filter(later)
+    assert "2024-01-01" in normalize_filter(SOLD_FILTER)
+
+def test_miss_then_hit(cache):
+    assert cache.get("sold", "Topps Chrome 2020", SOLD_FILTER, "EBAY_US", limit=100) is None
+    cache.put("sold", "Topps Chrome 2020", SOLD_FILTER, "EBAY_US", {"itemSummaries": [{"title": "a"}]}, limit=100)
+
+    # Same search with different spacing, case, time of day and marketplace spelling
+    cached = cache.get("sold", "topps  chrome 2020", SOLD_FILTER.replace("10:15", "11:30"), "EBAY-US", limit=100)
+    assert cached == {"itemSummaries": [{"title": "a"}]}
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
+
+def test_kinds_and_params_are_separate(cache):
+    cache.put("sold", "q", "f", "EBAY_US", {"kind": "sold"}, limit=100)
+    assert cache.get("active", "q", "f", "EBAY_US", limit=100) is None
+    assert cache.get("sold", "q", "f", "EBAY_US", limit=50) is None
+
+def test_expired_entries_miss(cache):
+    cache.ttls["active"] = 0.01
+    cache.put("active", "q", "f", "EBAY_US", {"x": 1})
+    time.sleep(0.02)
+    assert cache.get("active", "q", "f", "EBAY_US") is None
+
+def test_zero_ttl_disables_kind(cache):
+    cache.ttls["active"] = 0
+    cache.put("active", "q", "f", "EBAY_US", {"x": 1})
+    assert cache.stats()["entries"] == 0
+
+def test_eviction_keeps_recently_used(cache):
+    for i in range(5):
+        cache.put("sold", f"q{i}", "f", "EBAY_US", {"i": i})
+        # Touch the first entry so it stays the most recently used
+        cache.get("sold", "q0", "f", "EBAY_US")
+    cache.evict()
+
+    stats = cache.stats()
+    assert stats["entries"] == 3
+    assert stats["evictions"] == 2
+    assert cache.get("sold", "q0", "f", "EBAY_US") == {"i": 0}
+
+def test_databases_default_to_the_user_cache_dir(monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "xdg"))
+    assert user_cache_dir() == str(tmp_path / "xdg" / "card-pricer")
+    monkeypatch.delenv("XDG_CACHE_HOME")
+    assert user_cache_dir() == os.path.join(os.path.expanduser("~"), ".cache", "card-pricer")
+
+def test_cache_creates_its_directory(tmp_path):
+    cache = SearchCache(str(tmp_path / "missing" / "cache.sqlite3"))
+    cache.put("sold", "q", "", "EBAY_US", {"itemSummaries": []})
+    cache.close()
+    assert (tmp_path / "missing" / "cache.sqlite3").exists()
@@ -0,0 +1,72 @@
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+import ebay_search
+from ebay_cache import set_search_cache
+from ebay_search import EbaySearchError, iter_search_pages
+from rate_limiter import RateLimiter
+
+HEADERS = {"X-EBAY-C-MARKETPLACE-ID": "EBAY_US"}
+TOTAL_ITEMS = 23
+
+@pytest_asyncio.fixture
+async def search_server(monkeypatch):
+    requests = []
+
+    async def handler(request):
+        requests.append(dict(request.query))
+        if request.query["q"] == "broken":
+            return web.Response(status=500, text="upstream error")
+        limit = int(request.query["limit"])
+        offset = int(request.query["offset"])
+        items = [{"itemId": str(i), "title": f"card {i}"} for i in range(offset, min(offset + limit, TOTAL_ITEMS))]
+        page = {"itemSummaries": items, "total": TOTAL_ITEMS, "limit": limit, "offset": offset}
+        if offset + limit < TOTAL_ITEMS:
+            page["next"] = f"/search?offset={offset + limit}"
+        return web.json_response(page)
+
+    app = web.Application()
+    app.router.add_get("/search", handler)
+    server = TestServer(app)
+    await server.start_server()
+    monkeypatch.setattr(ebay_search, "EBAY_SEARCH_URL", str(server.make_url("/search")))
+    set_search_cache(None)
+
+    yield server, requests
+
+    await server.close()
+
+async def collect(server, params, **kwargs):
+    import aiohttp
+    pages = []
+    async with aiohttp.ClientSession() as session:
+        limiter = RateLimiter(calls_per_second=1000, burst=1000)
+        async for page in iter_search_pages(session, HEADERS, "sold", params, limiter, **kwargs):
+            pages.append(page)
+    return pages
+
+@pytest.mark.asyncio
+async def test_follows_pagination(search_server):
+    server, requests = search_server
+    pages = await collect(server, {"q": "topps", "filter": "f"}, page_size=10)
+
+    assert [len(page) for page in pages] == [10, 10, 3]
+    assert [item["itemId"] for page in pages for item in page] == [str(i) for i in range(TOTAL_ITEMS)]
+    assert [r["offset"] for r in requests] == ["0", "10", "20"]
+
+@pytest.mark.asyncio
+async def test_max_items_stops_pagination(search_server):
+    server, requests = search_server
+    pages = await collect(server, {"q": "topps", "filter": "f"}, page_size=10, max_items=15, prefetch=False)
+
+    assert [len(page) for page in pages] == [10, 5]
+    assert len(requests) == 2
+
+@pytest.mark.asyncio
+async def test_errors_raise_search_error(search_server):
+    server, _ = search_server
+    with pytest.raises(EbaySearchError) as excinfo:
+        await collect(server, {"q": "broken", "filter": "f"})
+    assert excinfo.value.status == 500
+    assert excinfo.value.body == "upstream error"
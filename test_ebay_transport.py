@@ -0,0 +1,89 @@
+import csv
+import gzip
+import json
+import pytest
+import pytest_asyncio
+import card_pricer
+import ebay_search
+from compare_runs import compare_outputs, compare_timings
+from ebay_cache import set_search_cache
+from ebay_transport import RecordingTransport, ReplayTransport, read_cassette, request_key, set_transport
+from mock_ebay import MockEbay, MockEbayServer, OAUTH_PATH, SEARCH_PATH
+from sales_store import set_sales_store
+
+def test_request_key_ignores_host_timestamps_and_query_spacing():
+    params = {"q": "Topps  Chrome", "filter": "soldItemsFilter:{soldDateRange:{startDate:'2024-01-01T10:15:00.000Z'}}", "limit": 200}
+    later = {"q": "topps chrome", "filter": "soldItemsFilter:{soldDateRange:{startDate:'2024-02-03T08:00:00.000Z'}}", "limit": 200}
+    assert request_key("GET", "https://api.ebay.com" + SEARCH_PATH, params) == request_key("get", "http://127.0.0.1:1" + SEARCH_PATH, later)
+    assert request_key("GET", SEARCH_PATH, params) != request_key("GET", SEARCH_PATH, dict(params, offset=200))
+
+def test_truncated_compressed_cassette_keeps_complete_responses(tmp_path):
+    path = tmp_path / "cassette.ndjson.gz"
+    lines = [json.dumps({"cassette": 1})] + [json.dumps({"key": str(i), "body": "x" * 1000}) for i in range(50)]
+    data = gzip.compress(("\n".join(lines) + "\n").encode())
+    path.write_bytes(data[:len(data) // 2])
+
+    entries = read_cassette(str(path))
+    assert 0 < len(entries) < 50
+
+@pytest_asyncio.fixture
+async def mock_api(monkeypatch):
+    server = MockEbayServer(MockEbay(sold_items=30, active_items=5))
+    await server.start()
+    monkeypatch.setattr(ebay_search, "EBAY_SEARCH_URL", server.base_url + SEARCH_PATH)
+    monkeypatch.setattr(card_pricer, "EBAY_OAUTH_URL", server.base_url + OAUTH_PATH)
+    monkeypatch.setattr(card_pricer, "_oauth_token", None)
+    # The token lock belongs to the event loop of whichever test created it
+    monkeypatch.setattr(card_pricer, "_token_lock", None)
+    set_search_cache(None)
+    set_sales_store(None)
+    yield server
+    set_transport(None)
+    await server.close()
+
+def write_cards(path, count):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["brand", "set_name", "year", "player_name", "condition"])
+        for i in range(count):
+            writer.writerow(["Topps", "Chrome", "2020", f"Player {i}", ""])
+
+@pytest.mark.asyncio
+async def test_recorded_batch_replays_offline(mock_api, tmp_path, monkeypatch):
+    cards = tmp_path / "cards.csv"
+    cassette = str(tmp_path / "run.ndjson.gz")
+    write_cards(cards, 3)
+
+    recorder = RecordingTransport(cassette)
+    set_transport(recorder)
+    recorded = await card_pricer.process_cards_from_csv(str(cards), str(tmp_path / "recorded.csv"), 2,
+                                                        timings_path=str(tmp_path / "recorded-timings.csv"))
+    recorder.close()
+    assert recorded["successful"] == 3
+    assert "mock-access-token" not in gzip.open(cassette, "rt").read()
+
+    # Take the server away: the replay must not need the network
+    await mock_api.close()
+    monkeypatch.setattr(card_pricer, "_oauth_token", None)
+    replay = ReplayTransport(cassette)
+    set_transport(replay)
+    replayed = await card_pricer.process_cards_from_csv(str(cards), str(tmp_path / "replayed.csv"), 2,
+                                                        timings_path=str(tmp_path / "replayed-timings.csv"))
+
+    assert replayed["successful"] == 3
+    assert replay.missing == 0
+    report = compare_outputs(str(tmp_path / "recorded.csv"), str(tmp_path / "replayed.csv"))
+    assert report["matched"] == 3
+    assert report["changes"] == []
+    assert compare_timings(str(tmp_path / "recorded-timings.csv"), str(tmp_path / "replayed-timings.csv"))["cards"] == 3
+
+@pytest.mark.asyncio
+async def test_unrecorded_requests_fail(mock_api, tmp_path):
+    cassette = str(tmp_path / "empty.ndjson")
+    RecordingTransport(cassette).close()
+    set_transport(ReplayTransport(cassette))
+    cards = tmp_path / "cards.csv"
+    write_cards(cards, 1)
+
+    results = await card_pricer.process_cards_from_csv(str(cards), str(tmp_path / "out.csv"), 1)
+    assert results["failed"] == 1
@@ -0,0 +1,60 @@
+import asyncio
+import pytest
+from filter_trace import FilterTrace, current_trace, tracing
+import card_pricer
+
+def test_trace_records_and_formats_decisions():
+    trace = FilterTrace("2020 Topps Mike Trout")
+    trace.record("keyword", "rejected", "Mike Trout lot of 5", 12.5, "lot")
+    trace.record("sold", "kept", "Mike Trout #1", 20.0)
+
+    dump = trace.dump()
+    assert dump["card"] == "2020 Topps Mike Trout"
+    assert [d["decision"] for d in dump["decisions"]] == ["rejected", "kept"]
+    assert dump["decisions"][0]["reason"] == "lot"
+
+    text = trace.format()
+    assert "[keyword] REJECTED: Mike Trout lot of 5 - $12.5 (lot)" in text
+    assert "[sold] KEPT: Mike Trout #1 - $20.0" in text
+
+def test_trace_is_a_bounded_ring_buffer():
+    trace = FilterTrace("card", maxlen=3)
+    for i in range(5):
+        trace.record("sold", "kept", f"item {i}", i)
+
+    assert trace.dropped == 2
+    assert [d["title"] for d in trace.dump()["decisions"]] == ["item 2", "item 3", "item 4"]
+
+def test_tracing_is_scoped_to_the_task():
+    assert current_trace() is None
+
+    async def other_card():
+        return current_trace()
+
+    async def run():
+        with tracing("card") as trace:
+            assert current_trace() is trace
+            # Tasks started inside the block inherit the trace
+            assert await asyncio.ensure_future(other_card()) is trace
+        return await other_card()
+
+    assert asyncio.run(run()) is None
+
+def test_filters_record_rejections_only_when_traced():
+    items = [
+        {"title": "Mike Trout", "price": 10.0},
+        {"title": "Mike Trout LOT", "price": 11.0},
+        {"title": "Mike Trout", "price": 12.0},
+    ]
+
+    # No trace active: filtering still works
+    assert len(card_pricer.filter_by_title_keywords(items, exclude_keywords=["lot"])) == 2
+
+    with tracing("card") as trace:
+        kept = card_pricer.filter_by_title_keywords(items, exclude_keywords=["lot"])
+
+    assert len(kept) == 2
+    decisions = trace.dump()["decisions"]
+    assert len(decisions) == 1
+    assert decisions[0]["title"] == "Mike Trout LOT"
+    assert decisions[0]["reason"] == "lot"
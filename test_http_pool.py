@@ -0,0 +1,37 @@
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from http_pool import HttpPool
+
+@pytest.mark.asyncio
+async def test_pool_reuses_connections():
+    async def handler(request):
+        return web.json_response({"ok": True})
+
+    app = web.Application()
+    app.router.add_get("/", handler)
+    server = TestServer(app)
+    await server.start_server()
+
+    pool = HttpPool(limit=10, limit_per_host=2)
+    try:
+        session = pool.get_session()
+        for _ in range(5):
+            async with session.get(server.make_url("/")) as response:
+                assert (await response.json()) == {"ok": True}
+
+        # The same session is handed out every time
+        assert pool.get_session() is session
+
+        stats = pool.stats_dict()
+        assert stats["requests"] == 5
+        assert stats["connections_created"] == 1
+        assert stats["connections_reused"] == 4
+        assert stats["reuse_rate"] == 0.8
+        assert stats["limit_per_host"] == 2
+        assert stats["open"] is True
+    finally:
+        await pool.close()
+        await server.close()
+
+    assert pool.stats_dict()["open"] is False
@@ -0,0 +1,182 @@
+import asyncio
+import csv
+import time
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from jobs import BatchJob, JobManager, job_events
+import main
+
+async def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.005)
+
+def test_progress_reports_remaining_throughput_and_eta():
+    job = BatchJob("abc", {})
+    job.status = "running"
+    job.total = 10
+    job.started_at = time.time() - 2.0
+    for success in (True, True, True, False):
+        job.record(success)
+
+    progress = job.progress()
+    assert progress["done"] == 4
+    assert progress["failed"] == 1
+    assert progress["remaining"] == 6
+    assert progress["percent_complete"] == 40.0
+    assert progress["throughput_per_second"] == pytest.approx(2.0, rel=0.1)
+    assert progress["eta_seconds"] == pytest.approx(3.0, rel=0.1)
+
+@pytest.mark.asyncio
+async def test_jobs_run_in_background_and_complete():
+    manager = JobManager()
+
+    async def run(job):
+        job.total = 3
+        for _ in range(3):
+            await asyncio.sleep(0)
+            job.record(True)
+        return {"successful": 3}
+
+    job = manager.submit(run, {"input_csv_path": "cards.csv"})
+    assert job.status == "queued"
+
+    await _wait_for(lambda: job.status == "completed")
+    assert job.progress()["remaining"] == 0
+    assert job.result == {"successful": 3}
+
+@pytest.mark.asyncio
+async def test_jobs_beyond_limit_wait_their_turn_and_can_be_cancelled():
+    manager = JobManager(max_running=1)
+    release = asyncio.Event()
+
+    async def run(job):
+        await release.wait()
+        return {}
+
+    first = manager.submit(run, {})
+    second = manager.submit(run, {})
+    await _wait_for(lambda: first.status == "running")
+    assert second.status == "queued"
+
+    manager.cancel(first.id)
+    await _wait_for(lambda: first.status == "cancelled")
+    await _wait_for(lambda: second.status == "running")
+
+    release.set()
+    await _wait_for(lambda: second.status == "completed")
+
+@pytest.mark.asyncio
+async def test_failed_job_reports_error():
+    manager = JobManager()
+
+    async def run(job):
+        raise ValueError("bad input")
+
+    job = manager.submit(run, {})
+    await _wait_for(lambda: job.status == "failed")
+    assert job.progress()["error"] == "bad input"
+
+def test_job_endpoints(tmp_path):
+    input_path = tmp_path / "cards.csv"
+    output_path = tmp_path / "prices.csv"
+    with open(input_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["brand", "set_name", "year"])
+        for i in range(5):
+            writer.writerow(["Topps", "Chrome", str(2000 + i)])
+
+    async def fake_get_card_price(**card):
+        if card["year"] == "2003":
+            raise ValueError("no data")
+        return main.CardPriceResponse(
+            predicted_price=10.0, confidence_score=0.5, recent_sales=[],
+            active_listings=[], market_analysis={}
+        )
+
+    with patch("main.get_card_price", fake_get_card_price), TestClient(main.app) as client:
+        response = client.post("/jobs", params={"input_csv_path": str(input_path),
+                                                "output_csv_path": str(output_path)})
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+
+        deadline = time.monotonic() + 5
+        while True:
+            status = client.get(f"/jobs/{job_id}").json()
+            if status["status"] == "completed" or time.monotonic() > deadline:
+                break
+            time.sleep(0.01)
+
+        assert status["status"] == "completed"
+        assert status["total"] == 5
+        assert status["successful"] == 4
+        assert status["failed"] == 1
+        assert status["remaining"] == 0
+        assert job_id in [job["job_id"] for job in client.get("/jobs").json()["jobs"]]
+
+        assert client.get("/jobs/unknown").status_code == 404
+        assert client.post("/jobs", params={"input_csv_path": str(tmp_path / "missing.csv")}).status_code == 400
+
+@pytest.mark.asyncio
+async def test_job_events_stream_cards_progress_and_end():
+    manager = JobManager()
+    release = asyncio.Event()
+    waited = [0.0]
+
+    async def run(job):
+        job.track_wait(lambda: waited[0])
+        job.track_quota(lambda: 4998)
+        job.total = 2
+        await release.wait()
+        job.record(True, {"year": "2020"})
+        waited[0] += 1.5
+        job.record(False, {"year": "2021"}, "no data")
+        return {}
+
+    job = manager.submit(run, {})
+    await _wait_for(lambda: job.status == "running")
+
+    events = []
+    async for event, data in job_events(job, interval=0.01):
+        events.append((event, data))
+        if len(events) == 2:
+            release.set()
+
+    names = [event for event, _ in events]
+    assert names[0] == "progress"
+    assert names[-1] == "end"
+    cards = [data for event, data in events if event == "card"]
+    assert [card["success"] for card in cards] == [True, False]
+    assert cards[1]["error"] == "no data"
+    assert events[-1][1]["status"] == "completed"
+    assert events[-1][1]["rate_limit_wait_seconds"] == 1.5
+    assert events[-1][1]["remaining_quota"] == 4998
+    assert job._subscribers == []
+
+def test_job_events_endpoint(tmp_path):
+    input_path = tmp_path / "cards.csv"
+    with open(input_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["brand", "set_name", "year"])
+        for i in range(3):
+            writer.writerow(["Topps", "Chrome", str(2000 + i)])
+
+    async def fake_get_card_price(**card):
+        await asyncio.sleep(0.2)
+        return main.CardPriceResponse(
+            predicted_price=10.0, confidence_score=0.5, recent_sales=[],
+            active_listings=[], market_analysis={}
+        )
+
+    with patch("main.get_card_price", fake_get_card_price), TestClient(main.app) as client:
+        job_id = client.post("/jobs", params={"input_csv_path": str(input_path),
+                                              "output_csv_path": str(tmp_path / "prices.csv")}).json()["job_id"]
+        response = client.get(f"/jobs/{job_id}/events", params={"interval": 0.02})
+
+        assert response.headers["content-type"].startswith("text/event-stream")
+        names = [line.split(": ", 1)[1] for line in response.text.splitlines() if line.startswith("event: ")]
+        assert names.count("card") == 3
+        assert names[-1] == "end"
+        assert client.get("/jobs/unknown/events").status_code == 404
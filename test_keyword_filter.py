@@ -0,0 +1,69 @@
+from keyword_filter import EXCLUDED_KEYWORDS, KeywordMatcher, filter_by_keywords, get_matcher
+from filter_trace import tracing
+
+def test_matches_whole_words_only():
+    matcher = KeywordMatcher(["lot", "bulk"])
+    assert matcher.match("2020 Topps Mike Trout LOT of 10") == "lot"
+    assert matcher.match("Mike Trout lot") == "lot"
+    assert matcher.match("Pokemon Slot Machine promo") is None
+    assert matcher.match("Lotus Prizm Silver") is None
+    assert matcher.match("") is None
+
+def test_matches_plurals_and_inflected_forms():
+    matcher = get_matcher()
+    assert matcher.match("Lots of 10 Topps") == "lot"
+    assert matcher.match("2 card lots") == "lot"
+    assert matcher.match("reprints rc") == "reprint"
+    assert matcher.match("Reprinted Mickey Mantle rookie") == "reprint"
+    assert matcher.match("Charizard proxies") == "proxy"
+    assert matcher.match("Customs Jordan") == "custom"
+    assert matcher.match("2021 Prizm pick your cards") == "pick your card"
+    assert matcher.match("Pokemon Slots") is None
+    assert matcher.match("Lotto ticket card") is None
+
+def test_titles_the_substring_filter_excluded():
+    """Titles the old substring filter dropped, each kept or excluded on purpose"""
+    matcher = get_matcher()
+    # Still excluded: reprints, proxies and customs in any form
+    assert matcher.match("Reprinted 1952 Topps Mantle") == "reprint"
+    assert matcher.match("Reprinting of a classic") == "reprint"
+    assert matcher.match("Customized Jordan Fleer RC") == "customized"
+    assert matcher.match("Customised Messi Panini") == "customised"
+    assert matcher.match("Custom-made Ohtani card") == "custom"
+    # Kept: the keyword is only part of an unrelated word
+    assert matcher.match("1969 Topps Seattle Pilots team card") is None
+    assert matcher.match("Charlotte Hornets LaMelo Ball RC") is None
+    assert matcher.match("Lottery pick Wembanyama Prizm") is None
+    assert matcher.match("Customer favorite Trout Chrome") is None
+    assert matcher.match("Bulky Brewers Prince Fielder") is None
+
+def test_multi_word_keywords_tolerate_spacing_and_prefer_longest():
+    matcher = KeywordMatcher(["pick your", "pick your card"])
+    assert matcher.match("2021 Prizm  PICK   YOUR CARD #1-300") == "pick your card"
+    assert matcher.match("Pick your player") == "pick your"
+
+def test_split_keeps_order_and_reports_keyword():
+    items = [
+        {"title": "Mike Trout #1", "price": 10.0},
+        {"title": "Mike Trout reprint", "price": 1.0},
+        {"title": "Mike Trout #2", "price": 12.0},
+        {"title": "Complete Set 2020 Topps", "price": 80.0},
+    ]
+    kept, rejected = get_matcher().split(items)
+    assert [item["title"] for item in kept] == ["Mike Trout #1", "Mike Trout #2"]
+    assert [(item["title"], keyword) for item, keyword in rejected] == [
+        ("Mike Trout reprint", "reprint"),
+        ("Complete Set 2020 Topps", "complete set"),
+    ]
+
+def test_matchers_are_compiled_once_per_keyword_list():
+    assert get_matcher(EXCLUDED_KEYWORDS) is get_matcher(list(EXCLUDED_KEYWORDS))
+    assert get_matcher() is get_matcher(EXCLUDED_KEYWORDS)
+
+def test_filter_records_rejections_in_trace():
+    items = [{"title": "Bulk commons", "price": 2.0}, {"title": "Mike Trout", "price": 20.0}]
+    with tracing("card") as trace:
+        kept = filter_by_keywords(items)
+    assert kept == [items[1]]
+    decisions = trace.dump()["decisions"]
+    assert [(d["stage"], d["title"], d["reason"]) for d in decisions] == [("keyword", "Bulk commons", "bulk")]
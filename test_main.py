@@ -168,4 +168,207 @@ def test_active_listings_processing(mock_ebay_api):
     auction_listings = [l for l in active_listings if l["listing_type"] == "auction"]
     
     assert len(buy_it_now_listings) == 2
-    assert len(auction_listings) == 1 
\ No newline at end of file
+    assert len(auction_listings) == 1 
+
+
+@pytest.mark.asyncio
+async def test_sold_and_active_fetched_concurrently():
+    """Test that the sold and active searches are in flight at the same time"""
+    import asyncio
+    import main
+
+    in_flight = 0
+    max_in_flight = 0
+
+    async def fake_search(session, headers, kind, params, description, max_items=None):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.05)
+        in_flight -= 1
+        data = MOCK_SALES_DATA if kind == "sold" else MOCK_ACTIVE_LISTINGS_DATA
+        yield data["itemSummaries"]
+
+    async def fake_token():
+        return MOCK_OAUTH_TOKEN
+
+    with patch("main.search_ebay_pages", fake_search), \
+         patch("main.get_ebay_oauth_token", fake_token), \
+         patch("main.get_sales_store", lambda: None):
+        result = await main.get_card_price(brand="Topps", set_name="Chrome", year="2020")
+
+    assert max_in_flight == 2
+    assert len(result.recent_sales) == 3
+    assert len(result.active_listings) == 3
+
+@pytest.mark.asyncio
+async def test_identical_lookups_are_coalesced():
+    """Test that concurrent identical card lookups share one upstream fetch"""
+    import asyncio
+    import main
+
+    calls = 0
+
+    async def fake_price_card(query, condition=None):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return main.CardPriceResponse(
+            predicted_price=1.0, confidence_score=0.5, recent_sales=[], active_listings=[],
+            market_analysis={"query": query, "condition": condition}
+        )
+
+    with patch("main.price_card", fake_price_card):
+        results = await asyncio.gather(
+            *(main.get_card_price(brand="Topps", set_name="Chrome", year="2020", condition="New") for _ in range(5)),
+            main.get_card_price(brand="topps", set_name="chrome", year="2020", condition="New"),
+            main.get_card_price(brand="Topps", set_name="Chrome", year="2020", condition="Used")
+        )
+
+    # Case-insensitive query match shares the fetch; a different condition does not
+    assert calls == 2
+    assert results[0] is results[5]
+    assert results[6].market_analysis["condition"] == "Used"
+    assert main.card_lookups.in_flight() == 0
+
+def test_card_prices_streams_results_as_they_complete():
+    """Test that /card-prices streams one NDJSON line per card in completion order"""
+    import asyncio
+    import json
+    import main
+
+    delays = {"2001": 0.2, "2002": 0.0, "2003": 0.05}
+
+    async def fake_lookup_card_price(query, condition, max_age=None):
+        year = query.split()[-1]
+        await asyncio.sleep(delays[year])
+        if year == "2003":
+            raise main.HTTPException(status_code=500, detail="no data")
+        return main.CardPriceResponse(
+            predicted_price=float(year), confidence_score=0.5, recent_sales=[],
+            active_listings=[], market_analysis={}
+        ), "stale", 90.0
+
+    cards = [{"brand": "Topps", "set_name": "Chrome", "year": year} for year in delays]
+    with patch("main.lookup_card_price", fake_lookup_card_price):
+        response = client.post("/card-prices", json=cards)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["index"] for line in lines] == [1, 2, 0]
+    assert lines[0]["result"]["predicted_price"] == 2002.0
+    assert (lines[0]["price_index"], lines[0]["age"]) == ("stale", 90.0)
+    assert lines[1]["error"] == "no data"
+    assert lines[2]["card"]["year"] == "2001"
+
+def test_card_prices_rejects_oversized_requests():
+    """Test that /card-prices refuses more cards than it allows per request"""
+    with patch("main.CARD_PRICES_MAX_CARDS", 1):
+        response = client.post("/card-prices", json=[{"brand": "a", "set_name": "b", "year": "1"}] * 2)
+    assert response.status_code == 413
+
+def test_card_price_field_projection_and_gzip():
+    """Test that /card-price returns only the requested fields and gzips large bodies"""
+    import main
+
+    async def fake_price_card(query, condition=None):
+        return main.CardPriceResponse(
+            predicted_price=150.0, confidence_score=0.8,
+            recent_sales=[main.Sale(sale_date="2024-01-01T00:00:00.000Z", price=150.0, condition="New")] * 200,
+            active_listings=[], market_analysis={"market_trend": "stable"}
+        )
+
+    params = {"brand": "Projection", "set_name": "Test", "year": "2020"}
+    with patch("main.price_card", fake_price_card):
+        summary = client.get("/card-price", params={**params, "summary": "true"})
+        selected = client.get("/card-price", params={**params, "fields": "predicted_price,recent_sales"})
+        full = client.get("/card-price", params=params, headers={"Accept-Encoding": "gzip"})
+        refused = client.get("/card-price", params=params, headers={"Accept-Encoding": "gzip;q=0, identity"})
+        unknown = client.get("/card-price", params={**params, "fields": "predicted_price,nope"})
+
+    assert summary.json() == {"predicted_price": 150.0, "confidence_score": 0.8, "market_analysis": {"market_trend": "stable"}}
+    assert set(selected.json()) == {"predicted_price", "recent_sales"}
+    assert full.headers["content-encoding"] == "gzip"
+    assert len(full.json()["recent_sales"]) == 200
+    assert "content-encoding" not in summary.headers
+    assert "content-encoding" not in refused.headers
+    assert summary.headers["vary"] == full.headers["vary"] == "Accept-Encoding"
+    assert unknown.status_code == 400
+
+def test_metrics_endpoint_exports_stage_latencies():
+    """Test that /metrics reports pricing stages and price index lookups in Prometheus format"""
+    import main
+
+    async def fake_search(session, headers, kind, params, description, max_items=None, **page_options):
+        data = MOCK_SALES_DATA if kind.startswith("sold") else MOCK_ACTIVE_LISTINGS_DATA
+        yield data["itemSummaries"]
+
+    async def fake_token():
+        return MOCK_OAUTH_TOKEN
+
+    with patch("main.search_ebay_pages", fake_search), \
+         patch("main.get_ebay_oauth_token", fake_token), \
+         patch("main.get_sales_store", lambda: None):
+        priced = client.get("/card-price", params={"brand": "Metrics", "set_name": "Test", "year": "2020"})
+    response = client.get("/metrics")
+
+    assert priced.status_code == 200
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'card_pricer_stage_seconds_count{stage="token"}' in response.text
+    assert 'card_pricer_stage_seconds_bucket{stage="prediction",le="+Inf"}' in response.text
+    assert 'card_pricer_card_seconds_count{result="ok"}' in response.text
+    assert 'card_pricer_price_index_lookups_total{status="miss"}' in response.text
+    assert "# TYPE card_pricer_cards_in_flight gauge" in response.text
+
+def test_card_price_profiling_needs_admin_token(tmp_path):
+    """Test that /card-price?profile=true is refused without the admin token and writes a profile with it"""
+    import os
+    import main
+
+    async def fake_price_card(query, condition=None):
+        return main.CardPriceResponse(
+            predicted_price=10.0, confidence_score=0.5, recent_sales=[], active_listings=[], market_analysis={}
+        )
+
+    params = {"brand": "Profile", "set_name": "Test", "year": "2020", "profile": "true"}
+    with patch("main.price_card", fake_price_card), \
+         patch("main.PROFILE_ADMIN_TOKEN", "secret"), \
+         patch("profiling.DEFAULT_PROFILE_DIR", str(tmp_path)):
+        refused = client.get("/card-price", params=params)
+        profiled = client.get("/card-price", params=params, headers={"X-Admin-Token": "secret"})
+
+    assert refused.status_code == 403
+    assert profiled.status_code == 200
+    assert profiled.json()["predicted_price"] == 10.0
+    assert os.path.exists(os.path.join(tmp_path, profiled.headers["x-profile"] + ".prof"))
+    assert os.path.exists(os.path.join(tmp_path, profiled.headers["x-profile"] + ".memory.json"))
+
+def test_write_to_csv_only_writes_the_configured_file(tmp_path):
+    """Test that /write-to-csv appends to WRITE_TO_CSV_PATH and takes no destination from the caller"""
+    import main
+
+    max_ages = []
+
+    async def fake_get_card_price(max_age=None, **card):
+        max_ages.append(max_age)
+        return main.CardPriceResponse(
+            predicted_price=10.0, confidence_score=0.5, recent_sales=[], active_listings=[],
+            market_analysis={"market_trend": "stable", "supply_level": "low", "price_trend": "flat"}
+        )
+
+    output = tmp_path / "prices.csv"
+    elsewhere = tmp_path / "elsewhere.csv"
+    with patch("main.get_card_price", fake_get_card_price), \
+         patch("main.WRITE_TO_CSV_PATH", str(output)):
+        response = client.get("/write-to-csv", params={
+            "brand": "Topps", "set_name": "Chrome", "year": "2020", "file_path": str(elsewhere)
+        })
+
+    assert response.status_code == 200
+    assert response.json()["file_path"] == str(output)
+    assert "10.0" in output.read_text()
+    assert not elsewhere.exists()
+    # Written rows have no age column, so the price is never taken from the index
+    assert max_ages == [0]
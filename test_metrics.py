@@ -0,0 +1,82 @@
+import aiohttp
+import pytest
+import ebay_search
+from ebay_cache import set_search_cache
+from ebay_transport import set_transport
+from metrics import (Counter, Gauge, Histogram, Registry, EBAY_RESPONSES, STAGE_SECONDS,
+                     CARD_SECONDS, pricing_card, write_metrics)
+from mock_ebay import MockEbay, MockEbayServer, SEARCH_PATH
+from rate_limiter import RateLimiter
+
+def test_counter_and_gauge_render_in_text_format():
+    registry = Registry()
+    responses = registry.register(Counter("responses_total", "Responses", ["status"]))
+    in_flight = registry.register(Gauge("in_flight", "In flight"))
+    responses.inc(status="200")
+    responses.inc(2, status="429")
+    with in_flight.track():
+        assert in_flight.value() == 1
+
+    assert registry.render().splitlines() == [
+        "# HELP responses_total Responses",
+        "# TYPE responses_total counter",
+        'responses_total{status="200"} 1',
+        'responses_total{status="429"} 2',
+        "# HELP in_flight In flight",
+        "# TYPE in_flight gauge",
+        "in_flight 0",
+    ]
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("stage_seconds", "Stages", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, stage="fetch")
+
+    lines = histogram.render()
+    assert 'stage_seconds_bucket{stage="fetch",le="0.1"} 2' in lines
+    assert 'stage_seconds_bucket{stage="fetch",le="1"} 3' in lines
+    assert 'stage_seconds_bucket{stage="fetch",le="+Inf"} 4' in lines
+    assert 'stage_seconds_sum{stage="fetch"} 3.65' in lines
+    assert 'stage_seconds_count{stage="fetch"} 4' in lines
+
+def test_label_values_are_escaped_and_checked():
+    counter = Counter("items_total", "Items", ["reason"])
+    counter.inc(reason='say "hi"\n')
+    assert 'items_total{reason="say \\"hi\\"\\n"} 1' in counter.render()
+    with pytest.raises(ValueError):
+        counter.inc(status="200")
+
+def test_pricing_card_times_failures_separately():
+    before = CARD_SECONDS.count(result="error")
+    with pytest.raises(RuntimeError):
+        with pricing_card():
+            raise RuntimeError("eBay is down")
+    assert CARD_SECONDS.count(result="error") == before + 1
+
+def test_write_metrics(tmp_path):
+    path = tmp_path / "card_pricer.prom"
+    write_metrics(str(path))
+    assert "# TYPE card_pricer_stage_seconds histogram" in path.read_text()
+
+@pytest.mark.asyncio
+async def test_search_page_fetch_is_measured(monkeypatch):
+    server = MockEbayServer(MockEbay(active_items=5))
+    await server.start()
+    monkeypatch.setattr(ebay_search, "EBAY_SEARCH_URL", server.base_url + SEARCH_PATH)
+    set_search_cache(None)
+    set_transport(None)
+
+    responses = EBAY_RESPONSES.value(api="browse", status="200")
+    fetches = STAGE_SECONDS.count(stage="active_fetch")
+    try:
+        async with aiohttp.ClientSession() as session:
+            headers = {"X-EBAY-C-MARKETPLACE-ID": "EBAY_US"}
+            await ebay_search.fetch_search_page(session, headers, "active", {"q": "Topps Chrome"},
+                                                RateLimiter(calls_per_second=1000, burst=10))
+    finally:
+        await server.close()
+
+    assert EBAY_RESPONSES.value(api="browse", status="200") == responses + 1
+    assert STAGE_SECONDS.count(stage="active_fetch") == fetches + 1
+    assert STAGE_SECONDS.count(stage="json_decode") >= 1
+    assert STAGE_SECONDS.count(stage="rate_limit_wait") >= 1
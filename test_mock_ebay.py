@@ -0,0 +1,80 @@
+import csv
+import aiohttp
+import pytest
+import pytest_asyncio
+import card_pricer
+import ebay_search
+from mock_ebay import MockEbay, MockEbayServer, SEARCH_PATH
+
+@pytest_asyncio.fixture
+async def mock_server():
+    server = MockEbayServer(MockEbay(sold_items=30, active_items=5))
+    await server.start()
+    yield server
+    await server.close()
+
+async def get_json(url, **params):
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url, params=params) as response:
+            return response.status, await response.json()
+
+@pytest.mark.asyncio
+async def test_search_pages_are_stable_per_query(mock_server):
+    url = mock_server.base_url + SEARCH_PATH
+    sold_filter = "soldItemsFilter:{soldDateRange:{startDate:'2024-01-01T00:00:00.000Z'}}"
+
+    status, first = await get_json(url, q="Topps Chrome 2020", filter=sold_filter, limit=20, offset=0)
+    assert status == 200
+    assert first["total"] == 30
+    assert len(first["itemSummaries"]) == 20
+    assert "next" in first
+
+    _, last = await get_json(url, q="Topps Chrome 2020", filter=sold_filter, limit=20, offset=20)
+    assert len(last["itemSummaries"]) == 10
+    assert "next" not in last
+
+    _, again = await get_json(url, q="topps chrome 2020", filter=sold_filter, limit=20, offset=0)
+    assert [item["itemId"] for item in again["itemSummaries"]] == [item["itemId"] for item in first["itemSummaries"]]
+
+    _, active = await get_json(url, q="Topps Chrome 2020", filter="buyingOptions:{FIXED_PRICE|AUCTION}")
+    assert active["total"] == 5
+    assert "buyingOptions" in active["itemSummaries"][0]
+
+@pytest.mark.asyncio
+async def test_throttle_and_error_rates():
+    server = MockEbayServer(MockEbay(throttle_rate=1.0))
+    await server.start()
+    try:
+        status, body = await get_json(server.base_url + SEARCH_PATH, q="card")
+        assert status == 429
+        assert server.mock.counts["throttled"] == 1
+
+        server.mock.throttle_rate, server.mock.error_rate = 0.0, 1.0
+        status, _ = await get_json(server.base_url + SEARCH_PATH, q="card")
+        assert status == 500
+    finally:
+        await server.close()
+
+@pytest.mark.asyncio
+async def test_batch_pricing_against_mock(mock_server, tmp_path, monkeypatch):
+    from ebay_cache import set_search_cache
+    from sales_store import set_sales_store
+
+    monkeypatch.setattr(ebay_search, "EBAY_SEARCH_URL", mock_server.base_url + SEARCH_PATH)
+    monkeypatch.setattr(card_pricer, "EBAY_OAUTH_URL", mock_server.base_url + "/identity/v1/oauth2/token")
+    monkeypatch.setattr(card_pricer, "_oauth_token", None)
+    set_search_cache(None)
+    set_sales_store(None)
+
+    input_path = tmp_path / "cards.csv"
+    with open(input_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["brand", "set_name", "year", "player_name", "condition"])
+        for i in range(3):
+            writer.writerow(["Topps", "Chrome", "2020", f"Player {i}", ""])
+
+    results = await card_pricer.process_cards_from_csv(str(input_path), str(tmp_path / "prices.csv"), max_concurrent=2)
+
+    assert results["successful"] == 3
+    assert mock_server.mock.counts["sold"] == 3
+    assert mock_server.mock.counts["active"] == 3
@@ -0,0 +1,79 @@
+import csv
+import gzip
+import json
+import pytest
+import card_pricer
+from output_writers import create_writer, format_for, open_text, supports_append
+
+COLUMNS = ["Card Name", "Predicted Price", "Recent Sales"]
+TYPES = {"Predicted Price": "float", "Recent Sales": "int"}
+
+def test_format_and_compression_follow_file_name():
+    assert format_for("prices.csv") == "csv"
+    assert format_for("prices.csv.gz") == "csv"
+    assert format_for("prices.CSV.ZST") == "csv"
+    assert format_for("prices.ndjson") == "ndjson"
+    assert format_for("prices.jsonl.gz") == "ndjson"
+    assert format_for("prices.parquet") == "parquet"
+    assert format_for("prices.csv.shard-0-of-2") == "csv"
+    assert supports_append("prices.csv.gz") and not supports_append("prices.parquet")
+
+def test_gzip_csv_appends_new_rows_without_repeating_header(tmp_path):
+    path = str(tmp_path / "prices.csv.gz")
+    with create_writer(path, COLUMNS, TYPES) as writer:
+        writer.write_rows([["Topps 2020", 10.5, 3]])
+    with create_writer(path, COLUMNS, TYPES, append=True) as writer:
+        writer.write_rows([["Topps 2021", 12.0, 4]])
+
+    with gzip.open(path, "rt", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows == [COLUMNS, ["Topps 2020", "10.5", "3"], ["Topps 2021", "12.0", "4"]]
+
+def test_ndjson_values_are_typed(tmp_path):
+    path = str(tmp_path / "prices.ndjson")
+    with create_writer(path, COLUMNS, TYPES) as writer:
+        writer.write_rows([["Topps 2020", "10.5", "3"], ["Topps 2021", "", "n/a"]])
+
+    with open(path) as f:
+        records = [json.loads(line) for line in f]
+    assert records == [
+        {"Card Name": "Topps 2020", "Predicted Price": 10.5, "Recent Sales": 3},
+        {"Card Name": "Topps 2021", "Predicted Price": None, "Recent Sales": None},
+    ]
+
+def test_parquet_is_typed_and_written_in_row_groups(tmp_path):
+    pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+    from output_writers import ParquetWriter
+
+    path = str(tmp_path / "prices.parquet")
+    with ParquetWriter(path, COLUMNS, TYPES, row_group_size=2) as writer:
+        for i in range(5):
+            writer.write_rows([[f"card {i}", str(i * 1.5), i]])
+
+    parquet_file = pq.ParquetFile(path)
+    assert parquet_file.metadata.num_row_groups == 3
+    table = parquet_file.read()
+    assert str(table.schema.field("Predicted Price").type) == "double"
+    assert table.column("Recent Sales").to_pylist() == [0, 1, 2, 3, 4]
+
+    with pytest.raises(ValueError):
+        create_writer(path, COLUMNS, TYPES, append=True)
+
+@pytest.mark.asyncio
+async def test_batch_reads_compressed_input_and_writes_ndjson(tmp_path, fake_pricer):
+    input_path = str(tmp_path / "cards.csv.gz")
+    output_path = str(tmp_path / "prices.ndjson")
+    with open_text(input_path, "w") as f:
+        writer = csv.writer(f)
+        writer.writerow(["brand", "set_name", "year", "condition"])
+        writer.writerow(["Topps", "Chrome", "2020", "Ungraded"])
+
+    results = await card_pricer.process_cards_from_csv(input_path, output_path)
+    assert results["successful"] == 1
+
+    with open(output_path) as f:
+        record = json.loads(f.readline())
+    assert record["Card Name"] == "Topps Chrome 2020"
+    assert record["Predicted Price"] == 10.0
+    assert record["Recent Sales Count"] == 0
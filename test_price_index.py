@@ -0,0 +1,111 @@
+import asyncio
+import pytest
+from price_index import PriceIndex
+
+def counter():
+    calls = []
+
+    async def compute():
+        calls.append(len(calls) + 1)
+        await asyncio.sleep(0)
+        return len(calls)
+
+    return calls, compute
+
+def age_entry(index, key, seconds):
+    value, computed_at = index._entries[key]
+    index._entries[key] = (value, computed_at - seconds)
+
+@pytest.mark.asyncio
+async def test_miss_then_fresh_hit():
+    index = PriceIndex(max_age=60)
+    calls, compute = counter()
+
+    assert await index.lookup("card", compute) == (1, "miss", 0.0)
+    value, status, age = await index.lookup("card", compute)
+    assert (value, status) == (1, "fresh")
+    assert age < 1
+    assert calls == [1]
+
+@pytest.mark.asyncio
+async def test_stale_entry_is_served_while_recomputed():
+    index = PriceIndex(max_age=60)
+    calls, compute = counter()
+    await index.lookup("card", compute)
+    age_entry(index, "card", 120)
+
+    # The stale value comes back at once; repeat stale hits share one recompute
+    value, status, _ = await index.lookup("card", compute)
+    assert (value, status) == (1, "stale")
+    await index.lookup("card", compute)
+    assert index.refreshing() == 1
+
+    await asyncio.gather(*index._refreshing.values())
+    assert await index.lookup("card", compute) == (2, "fresh", pytest.approx(0, abs=1))
+    assert calls == [1, 2]
+    assert index.stats()["refreshes"] == 1
+
+@pytest.mark.asyncio
+async def test_max_age_override():
+    index = PriceIndex(max_age=3600)
+    calls, compute = counter()
+    await index.lookup("card", compute)
+    age_entry(index, "card", 120)
+
+    assert (await index.lookup("card", compute, max_age=600))[1] == "fresh"
+    assert (await index.lookup("card", compute, max_age=60))[1] == "stale"
+    await asyncio.gather(*index._refreshing.values())
+
+    # Zero always recomputes on the request path
+    value, status, _ = await index.lookup("card", compute, max_age=0)
+    assert (value, status) == (3, "miss")
+
+@pytest.mark.asyncio
+async def test_entries_past_max_stale_are_recomputed_inline():
+    index = PriceIndex(max_age=60, max_stale=300)
+    calls, compute = counter()
+    await index.lookup("card", compute)
+    age_entry(index, "card", 600)
+
+    assert (await index.lookup("card", compute))[:2] == (2, "miss")
+
+@pytest.mark.asyncio
+async def test_failed_refresh_keeps_stale_value():
+    index = PriceIndex(max_age=60)
+
+    async def fail():
+        raise RuntimeError("eBay down")
+
+    index.put("card", "old price")
+    age_entry(index, "card", 120)
+    assert (await index.lookup("card", fail))[:2] == ("old price", "stale")
+    await asyncio.gather(*index._refreshing.values())
+
+    assert index.get("card")[0] == "old price"
+    assert index.stats()["refresh_failures"] == 1
+
+def test_least_recently_used_entries_are_evicted():
+    index = PriceIndex(max_entries=2)
+    index.put("a", 1)
+    index.put("b", 2)
+    index.get("a")
+    index.put("c", 3)
+
+    assert index.get("b") is None
+    assert index.get("a")[0] == 1
+
+def test_entries_are_evicted_by_total_weight():
+    index = PriceIndex(max_items=10, weigh=len)
+    index.put("a", "x" * 4)
+    index.put("b", "x" * 4)
+    index.put("c", "x" * 4)
+
+    assert index.get("a") is None
+    assert index.stats()["items"] == 8
+    # Replacing an entry replaces its weight too
+    index.put("c", "x")
+    assert index.stats()["items"] == 5
+    # A value heavier than the whole budget is not kept
+    index.put("d", "x" * 11)
+    assert index.get("d") is None
+    assert index.get("b")[0] == "xxxx"
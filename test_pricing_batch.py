@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from card_pricer import analyze_market, filter_price_outliers, predict_price
+from pricing_batch import (
+    batch_results_to_dicts,
+    filter_outliers,
+    price_cards_batch,
+    ragged_from_lists,
+    ragged_to_lists,
+    segment_percentiles,
+    sort_within_segments,
+)
+
+def random_cards(seed=7, n_cards=200):
+    rng = np.random.default_rng(seed)
+    sales, active = [], []
+    for _ in range(n_cards):
+        base = rng.uniform(1, 500)
+        sales.append(list(np.round(base * rng.lognormal(0, 0.3, rng.integers(0, 30)), 2)))
+        active.append(sorted(np.round(base * rng.lognormal(0.1, 0.4, rng.integers(0, 30)), 2)))
+    # Make sure the edge cases are covered
+    sales[:3] = [[], [10.0], []]
+    active[:3] = [[], [], [12.0, 14.0]]
+    return sales, active
+
+def test_ragged_round_trip():
+    lists = [[1.0, 2.0], [], [3.0]]
+    values, offsets = ragged_from_lists(lists)
+    assert offsets.tolist() == [0, 2, 2, 3]
+    assert ragged_to_lists(values, offsets) == lists
+
+def test_percentiles_match_numpy():
+    sales, _ = random_cards()
+    values, offsets = ragged_from_lists(sales)
+    for q in (25, 50, 75):
+        result = segment_percentiles(values, offsets, q)
+        expected = [np.percentile(prices, q) if prices else 0.0 for prices in sales]
+        np.testing.assert_allclose(result, expected)
+
+def test_outlier_filter_matches_per_card():
+    sales, _ = random_cards()
+    sales.append([10, 10, 10, 10, 11, 500])
+    values, offsets = ragged_from_lists(sales)
+    filtered_values, filtered_offsets, _ = filter_outliers(values, offsets)
+
+    expected = [
+        [item["price"] for item in filter_price_outliers([{"price": p} for p in prices])]
+        for prices in sales
+    ]
+    assert ragged_to_lists(filtered_values, filtered_offsets) == expected
+    assert expected[-1] == [10, 10, 10, 10, 11]
+
+def test_batch_matches_per_card_pricing():
+    sales, active = random_cards()
+    results = price_cards_batch(*ragged_from_lists(sales), *ragged_from_lists(active))
+    cards = batch_results_to_dicts(results)
+
+    for card, sale_prices, active_prices in zip(cards, sales, active):
+        sale_items = filter_price_outliers([{"price": p} for p in sale_prices])
+        active_items = filter_price_outliers([{"price": p} for p in active_prices])
+        predicted, confidence = predict_price(sale_items, active_items)
+        analysis = analyze_market(sale_items, active_items)
+
+        assert card["predicted_price"] == predicted
+        assert card["confidence_score"] == confidence
+        for field in ("market_trend", "supply_level", "price_trend"):
+            assert card["market_analysis"][field] == analysis[field]
+        if sale_items or active_items:
+            assert card["market_analysis"]["recent_sales_count"] == analysis["recent_sales_count"]
+            assert card["market_analysis"]["avg_sale_price"] == analysis["avg_sale_price"]
+
+def test_mismatched_offsets_rejected():
+    with pytest.raises(ValueError):
+        price_cards_batch(np.zeros(0), np.array([0, 0]), np.zeros(0), np.array([0]))
+
+def test_sort_within_segments_is_exact_for_many_cards_and_wide_price_ranges():
+    # Cent differences near $1B across 100k cards are too fine for a card_index + fraction float key
+    n_cards = 100000
+    values = np.array([1e9 + 0.01, 1e9, 1e9 - 0.01] * n_cards + [0.01])
+    offsets = np.append(np.arange(0, 3 * n_cards + 1, 3), 3 * n_cards + 1)
+    result = sort_within_segments(values, offsets)
+    assert np.array_equal(result[:-1].reshape(n_cards, 3), np.sort(values[:-1].reshape(n_cards, 3), axis=1))
+    assert result[-1] == 0.01
@@ -0,0 +1,68 @@
+import json
+import pstats
+import asyncio
+import threading
+import tracemalloc
+import pytest
+import profiling as profiling_module
+from metrics import stage
+from profiling import ProfileBusyError, async_profiling, current_profile, profiling
+
+def test_profile_writes_cpu_and_memory_reports(tmp_path):
+    with profiling("Topps Chrome 2020", str(tmp_path)) as profile:
+        with stage("prediction"):
+            data = [str(i) * 10 for i in range(10000)]
+        with stage("prediction"):
+            pass
+    del data
+
+    assert not tracemalloc.is_tracing()
+    assert pstats.Stats(profile.paths["cpu"]).total_calls > 0
+    assert tracemalloc.Snapshot.load(profile.paths["snapshot"]).traces
+    with open(profile.paths["memory"]) as f:
+        report = json.load(f)
+    assert report["stages"]["prediction"]["calls"] == 2
+    assert report["stages"]["prediction"]["peak_bytes"] > 100000
+    assert report["peak_bytes"] >= report["stages"]["prediction"]["peak_bytes"]
+    assert report["top_allocations"]
+
+def test_profile_follows_tasks_and_allows_one_at_a_time(tmp_path):
+    async def current():
+        return current_profile()
+
+    async def run():
+        with profiling("batch", str(tmp_path)) as profile:
+            seen = await asyncio.ensure_future(current())
+            with pytest.raises(ProfileBusyError):
+                with profiling("other", str(tmp_path)):
+                    pass
+        return profile, seen
+
+    profile, seen = asyncio.run(run())
+    assert seen is profile
+    assert current_profile() is None
+
+def test_stages_do_not_trace_memory_when_not_profiling():
+    with stage("prediction"):
+        assert current_profile() is None
+        assert not tracemalloc.is_tracing()
+
+def test_async_profile_writes_files_off_the_event_loop(tmp_path, monkeypatch):
+    writers = []
+    write = profiling_module.Profile.write
+
+    def recording_write(self, snapshot, peak):
+        writers.append(threading.current_thread())
+        return write(self, snapshot, peak)
+
+    monkeypatch.setattr(profiling_module.Profile, "write", recording_write)
+
+    async def run():
+        async with async_profiling("card", str(tmp_path)) as profile:
+            await asyncio.sleep(0)
+        return profile
+
+    profile = asyncio.run(run())
+    assert writers and writers[0] is not threading.main_thread()
+    assert pstats.Stats(profile.paths["cpu"]).total_calls > 0
+    assert current_profile() is None
@@ -0,0 +1,59 @@
+import time
+import asyncio
+import pytest
+from rate_limiter import RateLimiter, TokenBucket
+
+@pytest.mark.asyncio
+async def test_burst_is_not_delayed():
+    limiter = RateLimiter(calls_per_second=10, burst=5)
+    start = time.monotonic()
+    waits = await asyncio.gather(*(limiter.acquire() for _ in range(5)))
+    assert time.monotonic() - start < 0.05
+    assert all(wait == 0 for wait in waits)
+
+@pytest.mark.asyncio
+async def test_calls_beyond_burst_are_paced():
+    limiter = RateLimiter(calls_per_second=20, burst=2)
+    start = time.monotonic()
+    await asyncio.gather(*(limiter.acquire() for _ in range(6)))
+    elapsed = time.monotonic() - start
+    # Two calls go through immediately, the other four wait 50ms each in turn
+    assert 0.18 <= elapsed < 0.4
+    assert limiter.bucket().total_wait > 0
+
+@pytest.mark.asyncio
+async def test_api_families_have_separate_buckets():
+    limiter = RateLimiter(calls_per_second=1, burst=1)
+    limiter.add_bucket("identity", calls_per_second=1, burst=1)
+    await limiter.acquire()
+    # The browse bucket is empty, but the identity bucket is not
+    assert await limiter.acquire("identity") == 0
+    with pytest.raises(KeyError):
+        await limiter.acquire("trading")
+
+def test_daily_quota_accounting():
+    bucket = TokenBucket(calls_per_second=100, burst=100, daily_quota=10)
+    for _ in range(4):
+        bucket.reserve()
+    assert bucket.calls_in_window() == 4
+    assert bucket.remaining_quota() == 6
+    assert bucket.stats()["remaining_quota"] == 6
+
+def test_no_quota_means_unlimited():
+    limiter = RateLimiter(calls_per_second=1)
+    assert limiter.remaining_quota() is None
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_returns_its_token():
+    limiter = RateLimiter(calls_per_second=1, burst=1, daily_quota=10)
+    await limiter.acquire()
+    task = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0.01)
+    assert limiter.bucket().waiting == 1
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert limiter.bucket().waiting == 0
+    assert limiter.bucket().tokens > -1
+    # ...and its call no longer counts against the daily quota
+    assert limiter.remaining_quota() == 9
@@ -0,0 +1,182 @@
+import os
+import sqlite3
+from datetime import datetime, timedelta, timezone
+import pytest
+from sales_store import CLI_SALES_SCOPE, SalesStore, SoldRefresh, api_sales_scope, normalize_sale_date, sale_item_id
+
+@pytest.fixture
+def store(tmp_path):
+    store = SalesStore(str(tmp_path / "sales.sqlite3"))
+    yield store
+    store.close()
+
+def days_ago(days):
+    return (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+def sale(item_id, days, price=10.0):
+    return {"item_id": item_id, "sale_date": days_ago(days), "price": price, "condition": "New", "title": f"card {item_id}"}
+
+def test_normalize_sale_date():
+    assert normalize_sale_date("2024-01-31T12:34:56Z") == "2024-01-31T12:34:56.000Z"
+    assert normalize_sale_date("2024-01-31T07:34:56-05:00") == "2024-01-31T12:34:56.000Z"
+    assert normalize_sale_date("2024-01-31T12:34:56.123456") == "2024-01-31T12:34:56.000Z"
+
+def test_synthetic_item_id_is_stable():
+    without_id = {"title": "a", "sale_date": "2024-01-01T00:00:00.000Z", "price": 1.0}
+    assert sale_item_id(without_id) == sale_item_id(dict(without_id))
+    assert sale_item_id(without_id).startswith("nohash:")
+    assert sale_item_id({"item_id": 123}) == "123"
+
+def test_repeat_sales_are_stored_once(store):
+    assert store.add_sales("Topps Chrome 2020", [sale("1", 1), sale("2", 2)]) == 2
+    # The next search returns one known item and one new one
+    assert store.add_sales("topps  chrome 2020", [sale("2", 2), sale("3", 3)]) == 1
+
+    sales = store.get_sales("Topps Chrome 2020")
+    assert [s["item_id"] for s in sales] == ["1", "2", "3"]
+    assert store.stats()["sales"] == 3
+
+def test_cards_are_separate(store):
+    store.add_sales("card a", [sale("1", 1)])
+    store.add_sales("card b", [sale("1", 1)])
+    assert len(store.get_sales("card a")) == 1
+    assert store.stats()["cards"] == 2
+
+def test_history_outlives_ebay_window(store):
+    store.add_sales("card", [sale("recent", 10), sale("old", 120)])
+
+    window = store.get_sales("card", since=datetime.now(timezone.utc) - timedelta(days=90))
+    assert [s["item_id"] for s in window] == ["recent"]
+
+    history = store.get_sales("card", since=datetime.now(timezone.utc) - timedelta(days=180))
+    assert [s["item_id"] for s in history] == ["recent", "old"]
+
+def test_store_persists_across_instances(tmp_path):
+    path = str(tmp_path / "sales.sqlite3")
+    first = SalesStore(path)
+    first.add_sales("card", [sale("1", 1)])
+    first.close()
+
+    second = SalesStore(path)
+    assert second.add_sales("card", [sale("1", 1)]) == 0
+    assert len(second.get_sales("card")) == 1
+    second.close()
+
+def raw_item(item_id, days, price="10.00"):
+    return {"itemId": item_id, "itemEndDate": days_ago(days), "price": {"value": price}, "condition": "New", "title": f"card {item_id}"}
+
+def test_first_refresh_scans_full_window(store):
+    refresh = SoldRefresh(store, "card")
+    window_start = datetime.now(timezone.utc) - timedelta(days=90)
+    assert not refresh.incremental
+    assert refresh.kind == "sold"
+    assert refresh.start_date(window_start) == window_start
+    assert refresh.page_options() == {}
+
+    assert refresh.see_page([raw_item("2", 2), raw_item("1", 1)]) is False
+    store.add_sales("card", [], watermark=refresh.advanced_watermark())
+    assert store.get_watermark("card")["item_id"] == "1"
+
+def test_refresh_starts_at_watermark_and_stops_at_known_item(store):
+    store.add_sales("card", [sale("1", 1)])
+    store.set_watermark("card", "", days_ago(1), "1")
+
+    refresh = SoldRefresh(store, "card")
+    assert refresh.incremental
+    assert refresh.kind == "sold_new"
+    assert refresh.page_options()["prefetch"] is False
+    start = refresh.start_date(datetime.now(timezone.utc) - timedelta(days=90))
+    assert datetime.now(timezone.utc) - start < timedelta(days=2)
+
+    assert refresh.see_page([raw_item("3", 0), raw_item("1", 1)]) is True
+    store.add_sales("card", [sale("3", 0)], watermark=refresh.advanced_watermark())
+    assert store.get_watermark("card")["item_id"] == "3"
+
+def test_watermarks_are_per_scope(store):
+    store.set_watermark("card", "Graded", days_ago(1), "1")
+    assert SoldRefresh(store, "card", scope="Graded").incremental
+    assert not SoldRefresh(store, "card").incremental
+
+def test_cli_and_api_scopes_are_distinct(store):
+    scopes = {CLI_SALES_SCOPE, api_sales_scope(None), api_sales_scope("New"), api_sales_scope("Used")}
+    assert len(scopes) == 4
+    store.set_watermark("card", CLI_SALES_SCOPE, days_ago(1), "1")
+    assert not SoldRefresh(store, "card", scope=api_sales_scope(None)).incremental
+
+def test_sales_stored_by_another_scope_do_not_stop_a_refresh(store):
+    store.add_sales("card", [sale("1", 3)], watermark=("", days_ago(3), "1"))
+    # A "New"-only refresh stores a newer sale than the unscoped watermark
+    store.add_sales("card", [sale("3", 1)], watermark=("New", days_ago(1), "3"))
+
+    refresh = SoldRefresh(store, "card")
+    assert refresh.see_page([raw_item("3", 1)]) is False
+    # ...so the unscoped refresh still reaches the Used sale between the two
+    assert refresh.see_page([raw_item("2", 2)]) is False
+    assert refresh.see_page([raw_item("1", 3)]) is True
+
+def test_watermark_only_advances_with_the_saved_sales(store, monkeypatch):
+    store.add_sales("card", [sale("1", 2)], watermark=("", days_ago(2), "1"))
+    refresh = SoldRefresh(store, "card")
+    refresh.see_page([raw_item("2", 1), raw_item("1", 2)])
+
+    def fail(*args):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(store, "_write_watermark", fail)
+    with pytest.raises(sqlite3.OperationalError):
+        store.add_sales("card", [sale("2", 1)], watermark=refresh.advanced_watermark())
+    assert store.get_watermark("card")["item_id"] == "1"
+    assert [s["item_id"] for s in store.get_sales("card")] == ["1"]
+
+def test_truncated_refresh_keeps_the_old_watermark(store):
+    store.add_sales("card", [sale("1", 5)], watermark=("", days_ago(5), "1"))
+    refresh = SoldRefresh(store, "card")
+    # The item cap cut pagination off before it got back to the watermark
+    assert refresh.see_page([raw_item("4", 1), raw_item("3", 2)]) is False
+    assert refresh.advanced_watermark(max_items=2) is None
+
+def test_refresh_that_reaches_the_watermark_advances_it(store):
+    store.add_sales("card", [sale("1", 5)], watermark=("", days_ago(5), "1"))
+    refresh = SoldRefresh(store, "card")
+    assert refresh.see_page([raw_item("2", 1), raw_item("1", 5)]) is True
+    assert refresh.advanced_watermark(max_items=2)[2] == "2"
+
+def test_refresh_that_runs_out_of_results_advances_the_watermark(store):
+    store.add_sales("card", [sale("1", 5)], watermark=("", days_ago(5), "1"))
+    refresh = SoldRefresh(store, "card")
+    refresh.see_page([raw_item("2", 1)])
+    assert refresh.advanced_watermark(max_items=2)[2] == "2"
+
+@pytest.mark.asyncio
+async def test_repeat_fetch_reads_one_page(store, monkeypatch):
+    import main
+
+    items = [raw_item(str(i), i) for i in range(1, 7)]
+    pages_read = []
+
+    async def fake_search(session, headers, kind, params, description, max_items=None, page_size=3, prefetch=True):
+        for offset in range(0, len(items), page_size):
+            pages_read.append(kind)
+            yield items[offset:offset + page_size]
+
+    monkeypatch.setattr(main, "search_ebay_pages", fake_search)
+    monkeypatch.setattr(main, "get_sales_store", lambda: store)
+    params = {"q": "card", "filter": ""}
+
+    first = await main.fetch_sold_sales(None, {}, params, None, SoldRefresh(store, "card"))
+    assert pages_read == ["sold", "sold"]
+
+    # A new sale closes; the refresh stops on the first page, which already holds known items
+    items.insert(0, raw_item("new", 0))
+    pages_read.clear()
+    second = await main.fetch_sold_sales(None, {}, params, None, SoldRefresh(store, "card"))
+    assert pages_read == ["sold_new"]
+    assert len(second) == len(first) + 1
+
+def test_store_path_expands_home_and_creates_its_directory(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("EBAY_SALES_DB", "~/.cache/card-pricer/sales.sqlite3")
+    store = SalesStore.from_env()
+    store.close()
+    assert store.path == str(tmp_path / ".cache" / "card-pricer" / "sales.sqlite3")
+    assert os.path.exists(store.path)
@@ -0,0 +1,97 @@
+import csv
+import os
+import pytest
+import card_pricer
+from rate_limiter import RateLimiter, SharedTokenBucket
+from shards import merge_shard_outputs, parse_shard, shard_output_path
+
+def test_parse_shard():
+    assert parse_shard("0/4") == (0, 4)
+    assert parse_shard("3/4") == (3, 4)
+    for bad in ("4/4", "-1/2", "1", "a/b", "0/0"):
+        with pytest.raises(ValueError):
+            parse_shard(bad)
+
+def test_shared_buckets_draw_from_one_balance(tmp_path):
+    path = str(tmp_path / "rate_browse.json")
+    # Two handles on the same file behave like two processes sharing it
+    first = SharedTokenBucket(path, calls_per_second=1, burst=2)
+    second = SharedTokenBucket(path, calls_per_second=1, burst=2)
+
+    assert first.reserve() == 0.0
+    assert second.reserve() == 0.0
+    # The shared burst is used up, so the next caller in either handle must wait
+    assert first.reserve() > 0.5
+    assert second.calls_in_window() == 3
+
+def test_rate_limiter_uses_shared_buckets_when_state_dir_set(tmp_path, monkeypatch):
+    monkeypatch.setenv("EBAY_SHARED_STATE_DIR", str(tmp_path))
+    limiter = RateLimiter.from_env()
+    assert isinstance(limiter.bucket(), SharedTokenBucket)
+    assert isinstance(limiter.bucket("identity"), SharedTokenBucket)
+    limiter.bucket().reserve()
+    assert (tmp_path / "rate_browse.json").exists()
+
+@pytest.mark.asyncio
+async def test_shared_buckets_lock_off_the_event_loop_in_private_files(tmp_path, monkeypatch):
+    import threading
+
+    monkeypatch.setenv("EBAY_SHARED_STATE_DIR", str(tmp_path / "state"))
+    limiter = RateLimiter.from_env()
+    bucket = limiter.bucket()
+    reserved_in = []
+    reserve = bucket.reserve
+
+    def tracked_reserve():
+        reserved_in.append(threading.current_thread())
+        return reserve()
+
+    monkeypatch.setattr(bucket, "reserve", tracked_reserve)
+    assert await limiter.acquire() == 0.0
+    assert reserved_in and reserved_in[0] is not threading.main_thread()
+    assert (tmp_path / "state" / "rate_browse.json").stat().st_mode & 0o777 == 0o600
+    assert (tmp_path / "state").stat().st_mode & 0o777 == 0o700
+
+@pytest.mark.asyncio
+async def test_shards_merge_back_into_input_order(tmp_path, fake_pricer):
+    input_path = str(tmp_path / "cards.csv")
+    output_path = str(tmp_path / "prices.csv")
+    players = [f"Player {i}" for i in range(11)]
+    with open(input_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["brand", "set_name", "year", "condition", "player_name"])
+        for player in players:
+            writer.writerow(["Topps", "Chrome", "2020", "Ungraded", player])
+
+    totals = []
+    for index in range(3):
+        results = await card_pricer.process_cards_from_csv(
+            input_path, shard_output_path(output_path, index, 3), max_concurrent=4, shard=(index, 3))
+        totals.append(results["total"])
+    assert totals == [4, 4, 3]
+
+    assert merge_shard_outputs(output_path, 3, remove=True) == 11
+    with open(output_path, newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == card_pricer.OUTPUT_COLUMNS
+    assert [row[3] for row in rows[1:]] == players
+    assert not (tmp_path / "prices.csv.shard-0-of-3").exists()
+
+def test_merge_sorts_large_shards_in_runs(tmp_path, monkeypatch):
+    import shards
+
+    monkeypatch.setattr(shards, "SORT_RUN_ROWS", 2)
+    output_path = str(tmp_path / "prices.csv")
+    # Rows in each shard are in completion order, not input order
+    for index, row_indexes in enumerate([[4, 0, 2, 8, 6], [7, 1, 5, 3]]):
+        with open(shard_output_path(output_path, index, 2), "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Row", "Card"])
+            writer.writerows([row, f"card {row}"] for row in row_indexes)
+
+    assert merge_shard_outputs(output_path, 2) == 9
+    with open(output_path, newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows == [["Card"]] + [[f"card {row}"] for row in range(9)]
+    # Sorted runs are temporary
+    assert sorted(os.listdir(tmp_path)) == ["prices.csv", "prices.csv.shard-0-of-2", "prices.csv.shard-1-of-2"]